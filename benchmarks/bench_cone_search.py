@@ -0,0 +1,46 @@
+'''
+Benchmark the throughput of batched cone searches with ConeSearcher.
+
+Usage:
+    python benchmarks/bench_cone_search.py [N_catalog] [N_queries]
+
+The catalog is indexed once, then the queries are run in one batch with a fixed radius and with
+per-query radii (some larger than max_radius). A full xmatch() of the query centers against the
+catalog is timed for comparison. The default sizes (10^8 objects, 10^6 queries) need about 20 GB
+of memory.
+'''
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+import numpy as np
+from pycorrelator import xmatch, generate_random_point, ConeSearcher
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(n_catalog=100_000_000, n_queries=1_000_000, max_radius=0.01):
+    catalog = np.ascontiguousarray(np.array(generate_random_point(n_catalog, seed=0)).T)
+    ra, dec = generate_random_point(n_queries, seed=1)
+    print(f"{n_catalog} objects in the catalog, {n_queries} queries, max_radius = {max_radius}")
+    searcher, t = timed(ConeSearcher, catalog, max_radius=max_radius)
+    print(f"Build the index: {t:.2f} s")
+    radii = {
+        'fixed radius': max_radius,
+        'per-query radii': np.random.default_rng(2).uniform(0, 2 * max_radius, n_queries),
+    }
+    for name, radius in radii.items():
+        result, t = timed(searcher.search, ra, dec, radius)
+        print(f"{name:>16}: {t:.2f} s ({n_queries / t:,.0f} queries/s, {len(result.indices)} matches)")
+    result, t = timed(xmatch, np.array([ra, dec]).T, catalog, max_radius, verbose=False)
+    print(f"{'xmatch()':>16}: {t:.2f} s ({len(result.indices)} matches)")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
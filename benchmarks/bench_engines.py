@@ -0,0 +1,49 @@
+'''
+Benchmark the chunk engines ('rotate' and 'chord') of xmatch() and fof(), and the 'global'
+engine of fof().
+
+Usage:
+    python benchmarks/bench_engines.py [N_objects]
+
+For several tolerances, the script reports the wall time of each engine and checks that
+the engines return the same result.
+'''
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+import numpy as np
+from pycorrelator import fof, xmatch, generate_random_point
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(n_objects=200_000):
+    catalog1 = np.array(generate_random_point(n_objects, seed=0)).T
+    catalog2 = np.array(generate_random_point(n_objects, seed=1)).T
+    print(f"{n_objects} objects per catalog")
+    for tolerance in [0.001, 0.01, 0.1]:
+        results = {}
+        for engine in ['rotate', 'chord']:
+            result, t = timed(xmatch, catalog1, catalog2, tolerance, verbose=False, engine=engine)
+            results[engine] = result
+            print(f"[xmatch] tolerance = {tolerance:<6} {engine:>6}: {t:.2f} s")
+        same = np.array_equal(results['rotate'].indices, results['chord'].indices)
+        print(f"[xmatch] tolerance = {tolerance:<6} identical results: {same}")
+        for engine in ['rotate', 'chord', 'global']:
+            result, t = timed(fof, catalog1, tolerance, engine=engine)
+            results[engine] = result
+            print(f"[fof]    tolerance = {tolerance:<6} {engine:>6}: {t:.2f} s")
+        same = (results['rotate'].get_group_sizes() == results['chord'].get_group_sizes()
+                == results['global'].get_group_sizes())
+        print(f"[fof]    tolerance = {tolerance:<6} identical results: {same}")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,62 @@
+'''
+Benchmark the peak memory (RSS) of the main steps of xmatch() and fof().
+
+Usage:
+    python benchmarks/bench_memory.py [N_objects]
+
+Each task runs in a fresh subprocess, which reports the peak RSS after the input catalogs are
+built (baseline) and after the task. Run it on two revisions to compare the memory footprint.
+'''
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import resource
+import subprocess
+import numpy as np
+from pycorrelator import fof, xmatch, generate_random_point, ChunkGeneratorByGrid
+from pycorrelator.catalog import Catalog
+
+TASKS = ['get_coordiantes', 'distribute', 'xmatch', 'fof', 'xmatch_dataframe']
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # ru_maxrss is in kB on Linux
+
+
+def run_task(task, n_objects):
+    catalog1 = np.ascontiguousarray(np.array(generate_random_point(n_objects, seed=0)).T)
+    catalog2 = np.ascontiguousarray(np.array(generate_random_point(n_objects, seed=1)).T)
+    tolerance = 0.01
+    baseline = peak_rss_mb()
+    if task == 'get_coordiantes':
+        catalog = Catalog(catalog1)
+        coordinates = [catalog.get_coordiantes() for _ in range(5)]
+    elif task == 'distribute':
+        ChunkGeneratorByGrid(margin=2*tolerance).distribute(Catalog(catalog1))
+    elif task == 'xmatch':
+        xmatch(catalog1, catalog2, tolerance, verbose=False)
+    elif task == 'fof':
+        fof(catalog1, tolerance)
+    elif task == 'xmatch_dataframe':
+        result = xmatch(catalog1, catalog2, tolerance, verbose=False)
+        result.get_dataframe1()
+        result.get_dataframe2()
+    print(f"{baseline:.0f} {peak_rss_mb():.0f}")
+
+
+def main(n_objects=2_000_000):
+    print(f"{n_objects} objects per catalog")
+    for task in TASKS:
+        output = subprocess.run([sys.executable, __file__, '--task', task, str(n_objects)],
+                                capture_output=True, text=True, check=True).stdout.split()
+        baseline, peak = float(output[-2]), float(output[-1])
+        print(f"{task:>18}: peak RSS {peak:7.0f} MB (+{peak - baseline:.0f} MB over the input catalogs)")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--task':
+        run_task(sys.argv[2], int(sys.argv[3]))
+    else:
+        args = [int(arg) for arg in sys.argv[1:2]]
+        main(*args)
@@ -0,0 +1,55 @@
+'''
+Benchmark the throughput of xmatch() and fof() against the number of workers.
+
+Usage:
+    python benchmarks/bench_parallel.py [N_objects] [max_workers]
+
+For each backend ('thread' and 'process') and for 1, 2, 4, ... up to max_workers workers,
+the script reports the wall time and the throughput (objects per second) relative to the
+serial run.
+'''
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+import numpy as np
+from pycorrelator import fof, xmatch, generate_random_point
+
+
+def timeit(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def worker_counts(max_workers):
+    n = 1
+    while n < max_workers:
+        yield n
+        n *= 2
+    yield max_workers
+
+
+def main(n_objects=1_000_000, max_workers=os.cpu_count()):
+    catalog1 = np.array(generate_random_point(n_objects, seed=0)).T
+    catalog2 = np.array(generate_random_point(n_objects, seed=1)).T
+    tolerance = 0.01
+    print(f"{n_objects} objects per catalog, tolerance = {tolerance} deg")
+    tasks = {
+        'xmatch': lambda **kw: xmatch(catalog1, catalog2, tolerance, verbose=False, **kw),
+        'fof': lambda **kw: fof(catalog1, tolerance, **kw),
+    }
+    for name, task in tasks.items():
+        t_serial = timeit(task)
+        print(f"[{name}] serial: {t_serial:.2f} s ({n_objects / t_serial:.0f} objects/s)")
+        for backend in ['thread', 'process']:
+            for n in worker_counts(max_workers):
+                t = timeit(task, executor=backend, n_workers=n)
+                print(f"[{name}] {backend:>7} x {n:<3}: {t:.2f} s ({n_objects / t:.0f} objects/s, "
+                      f"speedup {t_serial / t:.2f})")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
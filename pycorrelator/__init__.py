@@ -1,10 +1,14 @@
+from .catalog_index import CatalogIndex
 from .chunk_generator_grid import GridChunkGenerator, GridChunkConfig
 from .chunk_generator_grid import ChunkGeneratorByGrid, ChunkGeneratorByDenseGrid, ChunkGeneratorBySuperDenseGrid
+from .chunk_generator_healpix import HEALPixChunkGenerator, AdaptiveHEALPixChunkGenerator
+from .cone_search import ConeSearcher
 from .disjoint_set import DisjointSet
-from .fof import fof, group_by_quadtree
-from .result_fof import FoFResult
+from .duplicates import remove_duplicates
+from .fof import fof, fof_multi, group_by_quadtree
+from .result_fof import FoFHierarchy, FoFResult
 from .result_xmatch import XMatchResult
 from .utilities_spherical import *
-from .xmatch import xmatch
+from .xmatch import xmatch, xmatch_iter, self_xmatch
 
-__all__ = ['fof', 'group_by_quadtree', 'xmatch']
+__all__ = ['fof', 'fof_multi', 'group_by_quadtree', 'xmatch', 'xmatch_iter', 'self_xmatch', 'remove_duplicates']
@@ -1,7 +1,22 @@
-from typing import Optional
+import os
+import tempfile
+from typing import Iterator, Optional
 import numpy as np
 import pandas as pd
 from numpy.typing import NDArray
+from .utilities_spherical import radec_to_cartesian
+
+# Number of rows processed at once for memory-mapped catalogs (160 MB of coordinates)
+MEMMAP_BLOCK_SIZE = 10_000_000
+
+
+def allocate_buffer(shape, dtype, on_disk: bool) -> NDArray:
+    '''Allocate an array in memory, or in an anonymous temporary file (in the directory given by the
+    TMPDIR environment variable) that is removed once the array is released.'''
+    if not on_disk or shape[0] == 0:
+        return np.empty(shape, dtype=dtype)
+    with tempfile.TemporaryFile() as file:
+        return np.memmap(file, dtype=dtype, mode='w+', shape=shape)
 
 
 class Catalog:
@@ -9,24 +24,44 @@ class Catalog:
 
     Parameters
     ----------    
-    data : array-like
-        The input data can be either a numpy array or a pandas dataframe.
+    data : array-like or str
+        The input data can be either a numpy array, a pandas dataframe, or the path of a .npy file.
 
         * np.array: The array must have a shape of (N, 2), representing N points with
           two values: [ra (azimuth, longitude), dec (alltitude, latitude)].
         * pd.DataFrame: The dataframe must have two columns named 'Ra' and 'Dec' (or all the
           possible combinations with 'ra', 'dec'; 'RA', 'DEC').
+
+        * str or os.PathLike: The path of a .npy file (ending with '.npy') holding an array of shape (N, 2). The file is
+          memory-mapped (read-only) instead of being loaded into memory.
+
+        A C-contiguous float64 array of shape (N, 2) is used as the coordinate buffer without copying,
+        so it should not be modified while the catalog is in use.
+
+        A memory-mapped catalog (a .npy path or a np.memmap) is processed out of core: it is read in
+        blocks of `block_size` rows, and the chunks are written to temporary files. It must be a
+        float64 array of shape (N, 2).
+    block_size : int, optional
+        The number of rows read at once. Default is the whole catalog for in-memory data, and
+        MEMMAP_BLOCK_SIZE for memory-mapped data.
     
     '''
 
-    def __init__(self, data):
+    def __init__(self, data, block_size=None):
+        if isinstance(data, os.PathLike) or (isinstance(data, str) and data.endswith('.npy')):
+            data = np.load(data, mmap_mode='r')
         self.datatype = type(data)
         self.input_data = data
         self.ra = None # ra, longitude, azimuth
         self.dec = None # dec, latitude, alltitude
         self.ra_column: Optional[str] = None
         self.dec_column: Optional[str] = None
-        if self.datatype == np.ndarray:
+        self._coordinates: Optional[NDArray[np.float64]] = None # Built lazily by get_coordiantes()
+        self._indexes: Optional[NDArray[np.int64]] = None # Built lazily by get_indexes()
+        self._unit_vectors: Optional[NDArray[np.float64]] = None # Built lazily by get_unit_vectors()
+        self._cos_dec: Optional[NDArray[np.float64]] = None # Built lazily by get_cos_dec()
+        self.out_of_core = isinstance(data, np.memmap)
+        if isinstance(data, np.ndarray):
             self.__type_np_array()
         elif self.datatype == pd.DataFrame:
             self.__type_pd_dataframe()
@@ -38,31 +73,52 @@ class Catalog:
             raise NotImplementedError() # [TODO] Support dict input for Catalog
         else:
             raise TypeError("The input data must be either a numpy array or a pandas dataframe!")
+        if block_size is None:
+            block_size = MEMMAP_BLOCK_SIZE if self.out_of_core else max(len(self.ra), 1)
+        if block_size < 1:
+            raise ValueError("block_size must be a positive integer!")
+        self.block_size = block_size
         self._check_validity_range()
         
     def _check_validity_range(self):
         '''Check the validity of the input data. Warning if the data is out of range.
         '''
-        if np.any(self.ra < 0) or np.any(self.ra > 360):
-            print("Warning: Ra values are out of range [0, 360]!")
-        if np.any(self.dec < -90) or np.any(self.dec > 90):
-            print("Warning: Dec values are out of range [-90, 90]!")
-        if np.isnan(self.ra).any() or np.isnan(self.dec).any():
-            raise ValueError("Input data contains NaN values!")
-        if np.isinf(self.ra).any() or np.isinf(self.dec).any():
-            raise ValueError("Input data contains Inf values!")
         if len(self.ra) != len(self.dec):
             raise ValueError("The length of Ra and Dec must be the same!")
+        ra_out_of_range, dec_out_of_range = False, False
+        for start in range(0, len(self.ra), self.block_size):
+            ra = self.ra[start:start + self.block_size]
+            dec = self.dec[start:start + self.block_size]
+            ra_out_of_range = ra_out_of_range or np.any(ra < 0) or np.any(ra > 360)
+            dec_out_of_range = dec_out_of_range or np.any(dec < -90) or np.any(dec > 90)
+            if np.isnan(ra).any() or np.isnan(dec).any():
+                raise ValueError("Input data contains NaN values!")
+            if np.isinf(ra).any() or np.isinf(dec).any():
+                raise ValueError("Input data contains Inf values!")
+        if ra_out_of_range:
+            print("Warning: Ra values are out of range [0, 360]!")
+        if dec_out_of_range:
+            print("Warning: Dec values are out of range [-90, 90]!")
 
     def get_coordiantes(self) -> NDArray[np.float64]:
         '''Get the coordinate of the points in the catalog for xmatch and fof.
 
+        The array is built once and cached. A read-only view is returned, so no copy is made per call.
+        For a memory-mapped catalog, the memory map itself is returned and nothing is loaded.
+
         Returns
         -------
         numpy.ndarray
             The array of shape (N, 2) with [Ra, Dec].
         '''
-        return np.vstack([self.ra, self.dec], dtype=np.float64).T
+        if self._coordinates is None:
+            if self._is_coordinate_buffer(self.input_data) or self.out_of_core:
+                self._coordinates = self.input_data
+            else:
+                self._coordinates = np.empty((len(self.ra), 2), dtype=np.float64)
+                self._coordinates[:, 0] = self.ra
+                self._coordinates[:, 1] = self.dec
+        return self._read_only(self._coordinates)
     
     def get_indexes(self) -> NDArray[np.int64]:
         '''Get the indexes of the points in the catalog for xmatch and fof.
@@ -70,9 +126,66 @@ class Catalog:
         Returns
         -------
         numpy.ndarray
-            The array of indexes of shape (N,).
+            The array of indexes of shape (N,). It is cached and returned as a read-only view.
+        '''
+        if self._indexes is None:
+            self._indexes = np.arange(len(self.ra), dtype=np.int64)
+        return self._read_only(self._indexes)
+
+    def get_unit_vectors(self) -> NDArray[np.float64]:
+        '''Get the unit vectors [x, y, z] of the points in the catalog.
+
+        The vectors are computed once and cached, so the trigonometric functions of the coordinates are
+        evaluated only once, even if the same catalog is passed to several calls of xmatch and fof. For
+        a memory-mapped catalog, the vectors are computed block by block into a temporary file.
+
+        Returns
+        -------
+        numpy.ndarray
+            The read-only array of unit vectors. Shape: (N, 3).
         '''
-        return np.arange(len(self.ra), dtype=np.int64)
+        if self._unit_vectors is None:
+            vectors = allocate_buffer((len(self.ra), 3), np.float64, on_disk=self.out_of_core)
+            for start, coordinates in self.iter_blocks():
+                vectors[start:start + len(coordinates)] = \
+                    radec_to_cartesian(coordinates[:, 0], coordinates[:, 1]).reshape(-1, 3)
+            self._unit_vectors = vectors
+        return self._read_only(self._unit_vectors)
+
+    def get_cos_dec(self) -> NDArray[np.float64]:
+        '''Get the cosine of the Dec of the points in the catalog, computed from the cached unit vectors.
+
+        Returns
+        -------
+        numpy.ndarray
+            The read-only array of cos(Dec). Shape: (N,).
+        '''
+        if self._cos_dec is None:
+            vectors = self.get_unit_vectors()
+            self._cos_dec = np.hypot(vectors[:, 0], vectors[:, 1])
+        return self._read_only(self._cos_dec)
+
+    def iter_blocks(self) -> Iterator[tuple[int, NDArray[np.float64]]]:
+        '''Iterate over the coordinates in blocks of `block_size` rows.
+
+        Yields
+        ------
+        tuple[int, numpy.ndarray]
+            The index of the first row of the block, and the coordinates of the block. Shape: (M, 2).
+        '''
+        coordinates = self.get_coordiantes()
+        for start in range(0, len(coordinates), self.block_size):
+            yield start, np.ascontiguousarray(coordinates[start:start + self.block_size])
+
+    @staticmethod
+    def _is_coordinate_buffer(array) -> bool:
+        return isinstance(array, np.ndarray) and array.dtype == np.float64 and array.flags.c_contiguous
+
+    @staticmethod
+    def _read_only(array: NDArray) -> NDArray:
+        view = array.view()
+        view.flags.writeable = False
+        return view
     
     def get_appending_data(self, retain_all_columns=True, retain_columns=None,
                            invalid_key_error=True) -> pd.DataFrame:
@@ -125,6 +238,8 @@ class Catalog:
             raise ValueError("The input array must be two-dimensional!")
         if self.input_data.shape[1] != 2:
             raise ValueError("The input array must have two columns!")
+        if self.out_of_core and self.input_data.dtype != np.float64:
+            raise ValueError("A memory-mapped catalog must be a float64 array!")
         self.ra = self.input_data[:, 0]
         self.dec = self.input_data[:, 1]
             
@@ -0,0 +1,128 @@
+import os
+import pickle
+import numpy as np
+from numpy.typing import NDArray
+from scipy.spatial import KDTree
+from .catalog import Catalog
+from .chunk_generator import ChunkGenerator
+from .chunk_generator_grid import ChunkGeneratorByGrid
+
+INDEX_FORMAT_VERSION = 2
+
+
+class CatalogIndex:
+    '''A prebuilt index of a catalog, for repeated cross-matches against the same (reference) catalog.
+
+    The catalog is divided into chunks once, with the margin of `max_tolerance`, and a KD-tree of the
+    unit vectors of the objects of each chunk is built. Pass the index as `catalog2` of :func:`xmatch` or
+    :func:`xmatch_iter` to match any catalog against it with a tolerance up to `max_tolerance`. Only the
+    new catalog is then distributed (its central chunks only), so the cost of a match depends on the size
+    of the new catalog. The matching is done on the unit vectors, like the 'chord' engine.
+
+    The index can be saved with :meth:`save` and loaded with :meth:`load`.
+
+    Parameters
+    ----------
+    catalog : array-like, str or Catalog
+        The catalog to index. See :class:`Catalog` for the accepted inputs.
+    max_tolerance : float
+        The largest tolerance in degrees that the index can be used with.
+    chunk_generator : callable, optional
+        A :class:`ChunkGenerator` subclass, or any callable taking the margin in degrees and returning
+        a chunk generator. Default is ChunkGeneratorByGrid.
+    '''
+
+    def __init__(self, catalog, max_tolerance, chunk_generator=ChunkGeneratorByGrid):
+        if max_tolerance <= 0:
+            raise ValueError("max_tolerance must be positive!")
+        self.catalog = catalog if isinstance(catalog, Catalog) else Catalog(catalog)
+        self.max_tolerance = max_tolerance
+        self.generator: ChunkGenerator = chunk_generator(margin=2*max_tolerance)
+        self.generator.plan([self.catalog])
+        chunks = self.generator.distribute(self.catalog)
+        self.indexes = np.concatenate([np.empty(0, dtype=np.int64)] + [chunk.get_index() for chunk in chunks])
+        self.offsets = np.concatenate([[0], np.cumsum([len(chunk) for chunk in chunks])]).astype(np.int64)
+        # The central objects of each chunk come first in its tree
+        self.n_central = np.array([chunk.n_central for chunk in chunks], dtype=np.int64)
+        self.trees = [KDTree(chunk.get_vectors()) for chunk in chunks]
+        # The index keeps its own copies, so the chunk buffer is released.
+        for chunk in chunks:
+            chunk.set_data(np.empty((0, 2), dtype=np.float64), np.empty(0, dtype=np.int64), 0)
+
+    def __len__(self):
+        return len(self.catalog)
+
+    def get_chunk(self, chunk_id) -> tuple[KDTree, NDArray[np.int64]]:
+        '''Get the KD-tree of a chunk and the catalog indexes of its objects (in the order of the tree).
+
+        The first ``n_central[chunk_id]`` objects are the central objects of the chunk.
+        '''
+        return self.trees[chunk_id], self.indexes[self.offsets[chunk_id]:self.offsets[chunk_id + 1]]
+
+    def coor2id_central(self, ra: NDArray, dec: NDArray) -> NDArray[np.int64]:
+        '''Get the chunk id of the given coordinates in the chunks of the index.'''
+        return np.asarray(self.generator.coor2id_central(ra, dec), dtype=np.int64)
+
+    def check_tolerance(self, tolerance):
+        if tolerance > self.max_tolerance:
+            raise ValueError(f"The tolerance ({tolerance}) exceeds the max_tolerance of the index "
+                             f"({self.max_tolerance}). Please rebuild the index.")
+
+    def save(self, path):
+        '''Save the index into a directory.
+
+        The coordinates and the chunk layout are saved as .npy files, so they can be memory-mapped when
+        loaded. The chunk generator and the KD-trees are pickled.
+
+        Parameters
+        ----------
+        path : str or os.PathLike
+            The directory to save the index into. It is created if it does not exist.
+        '''
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'coordinates.npy'), self.catalog.get_coordiantes())
+        np.save(os.path.join(path, 'indexes.npy'), self.indexes)
+        np.save(os.path.join(path, 'offsets.npy'), self.offsets)
+        np.save(os.path.join(path, 'n_central.npy'), self.n_central)
+        state = {
+            'version': INDEX_FORMAT_VERSION,
+            'max_tolerance': self.max_tolerance,
+            'generator': self.generator,
+            'trees': self.trees,
+        }
+        with open(os.path.join(path, 'index.pkl'), 'wb') as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, mmap=True) -> 'CatalogIndex':
+        '''Load an index saved by :meth:`save`.
+
+        Only load indexes from a trusted source, since the KD-trees are unpickled.
+
+        Parameters
+        ----------
+        path : str or os.PathLike
+            The directory of the saved index.
+        mmap : bool, optional
+            Whether to memory-map the coordinates and the chunk layout instead of reading them into
+            memory. Default is True.
+
+        Returns
+        -------
+        CatalogIndex
+            The loaded index. Its catalog holds only the coordinates of the original catalog.
+        '''
+        with open(os.path.join(path, 'index.pkl'), 'rb') as file:
+            state = pickle.load(file)
+        if state.get('version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format version: {state.get('version')}")
+        mmap_mode = 'r' if mmap else None
+        index = cls.__new__(cls)
+        index.catalog = Catalog(np.load(os.path.join(path, 'coordinates.npy'), mmap_mode=mmap_mode))
+        index.max_tolerance = state['max_tolerance']
+        index.generator = state['generator']
+        index.trees = state['trees']
+        index.indexes = np.load(os.path.join(path, 'indexes.npy'), mmap_mode=mmap_mode)
+        index.offsets = np.load(os.path.join(path, 'offsets.npy'))
+        index.n_central = np.load(os.path.join(path, 'n_central.npy'))
+        return index
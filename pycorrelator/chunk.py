@@ -1,5 +1,7 @@
+from typing import Optional
 import numpy as np
 from numpy.typing import NDArray
+from .utilities_spherical import center_rotation_matrix, cartesian_to_radec, radec_to_cartesian
 
 
 class Chunk:
@@ -7,38 +9,141 @@ class Chunk:
     def __init__(self, chunk_id, ra, dec, discription=None):
         self.chunk_id = chunk_id
         self.discription = discription if discription != None else f"Chunk {chunk_id} ({ra:3f}, {dec:3f})"
-        self.central_data = np.empty((0, 2), dtype=np.float64)
-        self.boundary_data = np.empty((0, 2), dtype=np.float64)
-        self.central_index = np.empty((0), dtype=np.int64)
-        self.boundary_index = np.empty((0), dtype=np.int64)
+        # The central objects come first, followed by the boundary objects.
+        self.data = np.empty((0, 2), dtype=np.float64)
+        self.index = np.empty((0), dtype=np.int64)
+        self.n_central = 0
+        self.vectors = None # The unit vectors of the objects, computed lazily if not given to set_data()
         self.chunk_ra = ra
         self.chunk_dec = dec
         self.max_size = None
+        self._rotation_matrix = None # Built lazily by get_rotation_matrix()
+
+    def set_data(self, data: NDArray[np.float64], index: NDArray[np.int64], n_central: int,
+                 vectors: Optional[NDArray[np.float64]] = None):
+        '''Set all the objects of the chunk at once, central objects first.
+
+        The arrays are not copied, so they can be views into a buffer shared by all the chunks.
+
+        Parameters
+        ----------
+        data : numpy.ndarray
+            The coordinates of the objects. Shape: (N, 2).
+        index : numpy.ndarray
+            The indexes of the objects in the catalog. Shape: (N,).
+        n_central : int
+            The number of central objects, i.e. the first n_central rows.
+        vectors : numpy.ndarray, optional
+            The unit vectors of the objects. Shape: (N, 3). Computed from `data` when first needed if
+            not given.
+        '''
+        if len(data) != len(index) or not 0 <= n_central <= len(index):
+            raise ValueError("Inconsistent chunk data!")
+        if vectors is not None and len(vectors) != len(index):
+            raise ValueError("Inconsistent chunk data!")
+        self.data = data
+        self.index = index
+        self.n_central = n_central
+        self.vectors = vectors
 
     def add_central_data(self, data, index):
-        self.central_data = np.concatenate([self.central_data, data])
-        self.central_index = np.concatenate([self.central_index, index])
+        self.set_data(np.concatenate([self.central_data, data, self.boundary_data]),
+                      np.concatenate([self.central_index, index, self.boundary_index]),
+                      self.n_central + len(index))
 
     def add_boundary_data(self, data, index):
-        self.boundary_data = np.concatenate([self.boundary_data, data])
-        self.boundary_index = np.concatenate([self.boundary_index, index])
+        self.set_data(np.concatenate([self.data, data]), np.concatenate([self.index, index]), self.n_central)
+
+    @property
+    def central_data(self) -> NDArray[np.float64]:
+        return self.data[:self.n_central]
+
+    @property
+    def boundary_data(self) -> NDArray[np.float64]:
+        return self.data[self.n_central:]
+
+    @property
+    def central_index(self) -> NDArray[np.int64]:
+        return self.index[:self.n_central]
+
+    @property
+    def boundary_index(self) -> NDArray[np.int64]:
+        return self.index[self.n_central:]
+
+    def owns_pairs(self, i: NDArray, j: NDArray) -> NDArray[np.bool_]:
+        '''Tell which pairs of objects of the chunk belong to it.
+
+        A pair belongs to the chunk in which its object with the lower catalog index is a central object.
+        All the neighbours of a central object within the tolerance are in the margin of its chunk, so
+        every pair found inside the chunks belongs to exactly one of them.
+
+        Parameters
+        ----------
+        i : numpy.ndarray
+            The positions of the first objects of the pairs in the chunk. Shape: (N,).
+        j : numpy.ndarray
+            The positions of the second objects of the pairs in the chunk. Shape: (N,).
+
+        Returns
+        -------
+        numpy.ndarray
+            The boolean mask of the pairs that belong to the chunk. Shape: (N,).
+        '''
+        lower = np.where(self.index[i] < self.index[j], i, j)
+        return lower < self.n_central
 
     def get_data(self) -> NDArray[np.float64]:
-        return np.concatenate([self.central_data, self.boundary_data])
+        return self.data
+
+    def get_vectors(self) -> NDArray[np.float64]:
+        '''Get the unit vectors of the objects, in the order of :meth:`get_data`. Shape: (N, 3).'''
+        if self.vectors is None:
+            self.vectors = radec_to_cartesian(self.data[:, 0], self.data[:, 1]).reshape(-1, 3)
+        return self.vectors
+
+    @property
+    def central_vectors(self) -> NDArray[np.float64]:
+        return self.get_vectors()[:self.n_central]
 
     def get_index(self) -> NDArray[np.int64]:
-        return np.concatenate([self.central_index, self.boundary_index])
+        return self.index
 
     def get_center(self):
         return self.chunk_ra, self.chunk_dec
 
+    def get_rotation_matrix(self) -> NDArray[np.float64]:
+        '''Get the matrix of the rotation that brings the center of the chunk to (180, 0).
+
+        The matrix is computed once and cached.
+        '''
+        if self._rotation_matrix is None:
+            self._rotation_matrix = center_rotation_matrix(self.chunk_ra, self.chunk_dec)
+        return self._rotation_matrix
+
+    def rotate_to_center(self, vectors: NDArray[np.float64]) -> NDArray[np.float64]:
+        '''Rotate the objects with the rotation that brings the center of the chunk to (180, 0).
+
+        Parameters
+        ----------
+        vectors : numpy.ndarray
+            The unit vectors of the objects, e.g. from :meth:`get_vectors`. Shape: (N, 3).
+
+        Returns
+        -------
+        numpy.ndarray
+            The rotated coordinates [Ra, Dec] in degrees. Shape: (N, 2).
+        '''
+        # The rotated vectors are normalized by construction, so the check is skipped.
+        rot_ra, rot_dec = cartesian_to_radec(vectors @ self.get_rotation_matrix().T, check_normalization=False)
+        return np.column_stack((rot_ra, rot_dec))
+
     def farest_distance(self, distance=None):
         if distance == None:
             return self.max_size
         self.max_size = distance
 
     def __len__(self):
-        return len(self.get_index())
+        return len(self.index)
 
     def __repr__(self):
         return f"Chunk {self.chunk_id} ({self.chunk_ra:.1f}, {self.chunk_dec:.1f}): {len(self)} objects"
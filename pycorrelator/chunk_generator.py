@@ -1,4 +1,5 @@
-from .catalog import Catalog
+import numpy as np
+from .catalog import Catalog, allocate_buffer
 from .chunk import Chunk
 from numpy.typing import NDArray
 
@@ -14,9 +15,47 @@ class ChunkGenerator:
     def get_chunk(self, chunk_id):
         return self.chunks[chunk_id]
 
+    def plan(self, catalogs: list[Catalog]):
+        '''Adapt the chunks to the catalogs before they are distributed.
+
+        The default does nothing, since most generators divide the sky independently of the data.
+        Generators with data-dependent chunks override this method.
+
+        Parameters
+        ----------
+        catalogs : list[Catalog]
+            The catalogs that will be distributed.
+        '''
+        pass
+
+    def get_occupancy(self) -> NDArray[np.int64]:
+        '''Get the number of central objects in each chunk.
+
+        Returns
+        -------
+        numpy.ndarray
+            The array of object counts. Shape: (N_chunks,).
+        '''
+        return np.array([chunk.n_central for chunk in self.chunks], dtype=np.int64)
+
+    def describe_occupancy(self) -> str:
+        '''Summarize the occupancy distribution of the chunks, for the progress messages.'''
+        occupancy = self.get_occupancy()
+        if len(occupancy) == 0:
+            return "no chunks"
+        return (f"{len(occupancy)} chunks with {np.min(occupancy)} / {np.median(occupancy):.0f} / "
+                f"{np.max(occupancy)} (min / median / max) central objects")
+
     def distribute(self, catalog: Catalog) -> list[Chunk]:
         '''Distribute the data into chunks.
 
+        The objects of all the chunks are written into one contiguous buffer (chunk by chunk, central
+        objects first), and each chunk holds a view of its part. The catalog is read block by block
+        (see :meth:`Catalog.iter_blocks`): a first pass counts the objects of each chunk, and a second pass
+        fills the buffer. For an out-of-core catalog, the buffer is a temporary file mapped in memory.
+        The unit vectors cached by the catalog (see :meth:`Catalog.get_unit_vectors`) are distributed
+        in the same way, so the chunk kernels do not recompute them.
+
         Parameters
         ----------
         catalog : Catalog
@@ -27,22 +66,56 @@ class ChunkGenerator:
         chunks : list[Chunk]
             List of chunks with data.
         '''
-        coordiantes = catalog.get_coordiantes()
-        indexes = catalog.get_indexes()
-        ra, dec = coordiantes[:, 0], coordiantes[:, 1]
-
-        # Get chunk ids for central coordinates
-        central_chunk_ids = self.coor2id_central(ra, dec)
-        for i in range(len(self.chunks)):
-            mask = (central_chunk_ids == i)
-            self.chunks[i].add_central_data(coordiantes[mask], indexes[mask])
+        n_chunks = len(self.chunks)
+        central_counts = np.zeros(n_chunks, dtype=np.int64)
+        boundary_counts = np.zeros(n_chunks, dtype=np.int64)
+        single_block = catalog.block_size >= len(catalog)
+        assignments = []
+        for start, coordinates in catalog.iter_blocks():
+            assignment = self._assign_block(coordinates)
+            central_counts += np.bincount(assignment[0], minlength=n_chunks)
+            boundary_counts += np.bincount(assignment[1], minlength=n_chunks)
+            if single_block: # Keep the assignment for the second pass only when it does not cost memory
+                assignments.append(assignment)
+
+        offsets = np.concatenate([[0], np.cumsum(central_counts + boundary_counts)])
+        data_buffer = allocate_buffer((offsets[-1], 2), np.float64, catalog.out_of_core)
+        vector_buffer = allocate_buffer((offsets[-1], 3), np.float64, catalog.out_of_core)
+        index_buffer = allocate_buffer((offsets[-1],), np.int64, catalog.out_of_core)
+        unit_vectors = catalog.get_unit_vectors()
+        central_cursor = offsets[:-1].copy()
+        boundary_cursor = offsets[:-1] + central_counts
+        for k, (start, coordinates) in enumerate(catalog.iter_blocks()):
+            central_ids, boundary_ids, boundary_rows = assignments[k] if single_block \
+                else self._assign_block(coordinates)
+            rows = np.arange(len(coordinates), dtype=np.int64)
+            vectors = unit_vectors[start:start + len(coordinates)]
+            for ids, rows, cursor in [(central_ids, rows, central_cursor),
+                                      (boundary_ids, boundary_rows, boundary_cursor)]:
+                # Stable sort by chunk, so that each chunk keeps the objects in the catalog order
+                order = np.argsort(ids, kind='stable')
+                ids, rows = ids[order], rows[order]
+                counts = np.bincount(ids, minlength=n_chunks)
+                rank = np.arange(len(ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+                positions = cursor[ids] + rank
+                data_buffer[positions] = coordinates[rows]
+                vector_buffer[positions] = vectors[rows]
+                index_buffer[positions] = start + rows
+                cursor += counts
+
+        for chunk, start, end, n_central in zip(self.chunks, offsets[:-1], offsets[1:], central_counts):
+            chunk.set_data(data_buffer[start:end], index_buffer[start:end], n_central, vector_buffer[start:end])
+        return self.chunks
 
-        # Get chunk ids for boundary coordinates
+    def _assign_block(self, coordinates: NDArray[np.float64]):
+        '''Get the central chunk id of every object, and the (chunk id, object) boundary pairs.'''
+        ra, dec = coordinates[:, 0], coordinates[:, 1]
+        central_ids = np.asarray(self.coor2id_central(ra, dec), dtype=np.int64)
         boundary_chunk_indices = self.coor2id_boundary(ra, dec)
-        for boundary_chunk_id, indices in enumerate(boundary_chunk_indices):  # May be a bug here
-            self.chunks[boundary_chunk_id].add_boundary_data(coordiantes[indices], indexes[indices])
-
-        return self.chunks
+        counts = np.array([len(indices) for indices in boundary_chunk_indices], dtype=np.int64)
+        boundary_rows = np.concatenate([np.empty(0, dtype=np.int64)] + list(boundary_chunk_indices)).astype(np.int64)
+        boundary_ids = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+        return central_ids, boundary_ids, boundary_rows
 
     def generate(self):
         '''Generate the chunks.
@@ -87,7 +160,7 @@ class ChunkGenerator:
         
         Returns
         -------
-        list_of_chunk_of_list_of_object_index : list
-            A list of lists contain the index of the object.
+        list_of_chunk_of_list_of_object_index : list[numpy.ndarray]
+            A list with one array of object indexes per chunk.
         '''
         raise NotImplementedError()
@@ -2,7 +2,30 @@ from typing import Optional
 import numpy as np
 from .chunk import Chunk
 from .chunk_generator import ChunkGenerator
-from .utilities_spherical import great_circle_distance
+from .utilities_spherical import angular_separation
+
+
+def ra_margin(margin, dec):
+    '''The RA offset (in degrees) from a meridian within which a point at the given Dec can be
+    within `margin` of that meridian.
+
+    A point at Dec d and RA offset a is asin(sin(a) * cos(d)) away from the meridian, so a margin in
+    RA must grow as 1 / cos(d) towards the poles. Points within `margin` of a pole get 180 degrees.
+
+    Parameters
+    ----------
+    margin : float
+        Angular margin in degrees.
+    dec : float or numpy.ndarray
+        Declination in degrees.
+
+    Returns
+    -------
+    float or numpy.ndarray
+        The margin in RA in degrees, between `margin` and 180.
+    '''
+    ratio = np.sin(np.radians(margin)) / np.maximum(np.cos(np.radians(dec)), 1e-300)
+    return np.where(ratio >= 1, 180., np.degrees(np.arcsin(np.minimum(ratio, 1))))
 
 
 class GridChunkConfig:
@@ -58,9 +81,10 @@ class GridChunkConfig:
             ra, dec = self.config['center_ra'], self.config['center_dec']
             d_ra, d_dec = self.config['delta_ra'], self.config['delta_dec']
             m = self.margin
-            d1 = great_circle_distance(ra, dec, ra + d_ra + m, dec + d_dec + m)
-            d2 = great_circle_distance(ra, dec, ra + d_ra + m, dec - d_dec - m)
-            return max(d1, d2)
+            # The RA margin depends on the Dec, so the edge of the margin is sampled along the Dec.
+            decs = np.linspace(max(dec - d_dec - m, -90), min(dec + d_dec + m, 90), 361)
+            d_ras = np.minimum(d_ra + ra_margin(m, decs), 180)
+            return float(np.max(angular_separation(ra, dec, ra + d_ras, decs)))
         else:
             raise ValueError(f"Unknown chunk type: {self.config['chunk_type']}")
 
@@ -70,12 +94,17 @@ class GridChunkGenerator(ChunkGenerator):
         super().__init__(margin=margin)
         self.config_polar = []
         self.config_ring = []
+        # (polar_dec, Ns_horizontal_ring) if the grid is set by set_symmetric_ring_chunk(), which
+        # allows computing the chunk ids arithmetically instead of checking every config.
+        self.symmetric_layout: Optional[tuple[float, tuple[int, ...]]] = None
 
     def add_polar_config(self, center, dec_bound):
         self.config_polar.append(GridChunkConfig(center, self.margin, dec_bound=dec_bound))
+        self.symmetric_layout = None
 
     def add_ring_config(self, center, width):
         self.config_ring.append(GridChunkConfig(center, self.margin, width=width))
+        self.symmetric_layout = None
 
     def get_all_config(self):
         return self.config_polar + self.config_ring
@@ -96,6 +125,7 @@ class GridChunkGenerator(ChunkGenerator):
             for j in range(N_Ra):  # Iterate over right ascension values
                 pos_ra = width_ra / 2 + width_ra * j
                 self.add_ring_config((pos_ra, pos_dec), (width_ra, width_dec))
+        self.symmetric_layout = (polar_dec, tuple(Ns_horizontal_ring))
         self.generate()
 
     def generate(self):
@@ -109,6 +139,8 @@ class GridChunkGenerator(ChunkGenerator):
             chunk_id += 1
 
     def coor2id_central(self, ra, dec):
+        if self.symmetric_layout is not None:
+            return self._coor2id_central_symmetric(ra, dec)
         chunk_ids = np.zeros_like(ra, dtype=int)
         # Polar chunks
         chunk_ids[dec > self.config_polar[0]['dec_bound']] = 0
@@ -126,7 +158,10 @@ class GridChunkGenerator(ChunkGenerator):
         return chunk_ids
 
     def coor2id_boundary(self, ra, dec):
+        if self.symmetric_layout is not None:
+            return self._coor2id_boundary_symmetric(ra, dec)
         margin = self.margin
+        margin_ra = ra_margin(margin, dec)
         list_of_chunk_of_list_of_object_index = []
 
         # Polar chunks
@@ -136,23 +171,77 @@ class GridChunkGenerator(ChunkGenerator):
         south_polar_chunk = (dec > S_polar_bound) & (dec <= S_polar_bound + margin)
 
         # Append the indices of objects that belong to the polar chunk boundaries
-        list_of_chunk_of_list_of_object_index.append(list(np.where(north_polar_chunk)[0]))
-        list_of_chunk_of_list_of_object_index.append(list(np.where(south_polar_chunk)[0]))
+        list_of_chunk_of_list_of_object_index.append(np.flatnonzero(north_polar_chunk))
+        list_of_chunk_of_list_of_object_index.append(np.flatnonzero(south_polar_chunk))
 
         # Middle chunks
         for config in self.config_ring:
             ra_diff = np.abs(ra - config['center_ra'])
             ra_diff = np.minimum(ra_diff, 360 - ra_diff) # Necessary. The boundary parts DO cross the 0-360 boundary.
             dec_diff = np.abs(dec - config['center_dec'])
-            mask_ra = (ra_diff >= config['delta_ra']) & (ra_diff <= config['delta_ra'] + margin) & (
+            mask_ra = (ra_diff >= config['delta_ra']) & (ra_diff <= config['delta_ra'] + margin_ra) & (
                 dec_diff <= config['delta_dec'] + margin)
             mask_dec = (dec_diff >= config['delta_dec']) & (dec_diff <= config['delta_dec'] + margin) & (
-                ra_diff <= config['delta_ra'] + margin)
+                ra_diff <= config['delta_ra'] + margin_ra)
             mask = mask_ra | mask_dec
-            list_of_chunk_of_list_of_object_index.append(list(np.where(mask)[0]))
+            list_of_chunk_of_list_of_object_index.append(np.flatnonzero(mask))
 
         return list_of_chunk_of_list_of_object_index
 
+    def _band_geometry(self):
+        polar_dec, Ns = self.symmetric_layout
+        width_dec = 2 * polar_dec / len(Ns)
+        center_decs = polar_dec - width_dec * (0.5 + np.arange(len(Ns)))
+        first_ids = 2 + np.concatenate([[0], np.cumsum(Ns)[:-1]]).astype(np.int64)
+        return polar_dec, np.array(Ns, dtype=np.int64), width_dec, center_decs, first_ids
+
+    def _coor2id_central_symmetric(self, ra, dec):
+        polar_dec, Ns, width_dec, _, first_ids = self._band_geometry()
+        # Objects on the boundary of two chunks belong to the chunk to the right (or below)
+        band = np.clip(np.floor((polar_dec - dec) / width_dec).astype(np.int64), 0, len(Ns) - 1)
+        n_ra = Ns[band]
+        ra_slice = np.floor(ra / (360 / n_ra)).astype(np.int64) % n_ra
+        chunk_ids = first_ids[band] + ra_slice
+        chunk_ids[dec > polar_dec] = 0
+        chunk_ids[dec < -polar_dec] = 1
+        return chunk_ids
+
+    def _coor2id_boundary_symmetric(self, ra, dec):
+        margin = self.margin
+        polar_dec, Ns, width_dec, center_decs, first_ids = self._band_geometry()
+        central_ids = self._coor2id_central_symmetric(ra, dec)
+        object_list, chunk_list = [], []
+
+        # Polar chunks
+        north = np.flatnonzero((dec <= polar_dec) & (dec >= polar_dec - margin))
+        south = np.flatnonzero((dec >= -polar_dec) & (dec <= -polar_dec + margin))
+        object_list += [north, south]
+        chunk_list += [np.zeros(len(north), dtype=np.int64), np.ones(len(south), dtype=np.int64)]
+
+        # Ring chunks: only the RA slices around each object are tested, band by band
+        for band, (center_dec, n_ra, first_id) in enumerate(zip(center_decs, Ns, first_ids)):
+            in_band = np.flatnonzero(np.abs(dec - center_dec) <= width_dec / 2 + margin)
+            width_ra = 360 / n_ra
+            ra_band = ra[in_band]
+            margin_ra = ra_margin(margin, dec[in_band])
+            first_slice = np.floor((ra_band - margin_ra) / width_ra).astype(np.int64)
+            last_slice = np.floor((ra_band + margin_ra) / width_ra).astype(np.int64)
+            for offset in range(min(int(np.max(last_slice - first_slice, initial=0)) + 1, n_ra)):
+                ra_slice = first_slice + offset
+                ra_diff = np.abs(ra_band - width_ra * (ra_slice + 0.5)) % 360
+                ra_diff = np.minimum(ra_diff, 360 - ra_diff)
+                chunk_ids = first_id + ra_slice % n_ra
+                mask = (ra_slice <= last_slice) & (ra_diff <= width_ra / 2 + margin_ra)
+                mask &= chunk_ids != central_ids[in_band]
+                object_list.append(in_band[mask])
+                chunk_list.append(chunk_ids[mask])
+
+        objects = np.concatenate(object_list)
+        chunks = np.concatenate(chunk_list)
+        order = np.lexsort((objects, chunks))
+        counts = np.bincount(chunks, minlength=len(self.get_all_config()))
+        return np.split(objects[order], np.cumsum(counts)[:-1])
+
 
 class ChunkGeneratorByGrid(GridChunkGenerator):
     def __init__(self, margin):
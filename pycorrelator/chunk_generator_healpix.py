@@ -0,0 +1,423 @@
+from typing import Optional
+import numpy as np
+from numpy.typing import NDArray
+from scipy.spatial import KDTree
+from .catalog import Catalog
+from .chunk import Chunk
+from .chunk_generator import ChunkGenerator
+from .utilities_spherical import radec_to_cartesian, angle_to_chord, chord_to_angle
+
+
+def ang2pix_ring(nside: int, ra: NDArray, dec: NDArray) -> NDArray[np.int64]:
+    '''Get the HEALPix pixel (RING scheme) of the given coordinates.
+
+    Parameters
+    ----------
+    nside : int
+        The HEALPix resolution parameter. The sphere is divided into 12 * nside**2 equal-area pixels.
+    ra : numpy.ndarray
+        The array of RA in degrees. Shape: (N,).
+    dec : numpy.ndarray
+        The array of Dec in degrees. Shape: (N,).
+
+    Returns
+    -------
+    numpy.ndarray
+        The array of pixel ids. Shape: (N,).
+    '''
+    ra, dec = np.atleast_1d(ra), np.atleast_1d(dec)
+    z = np.sin(np.radians(dec))
+    za = np.abs(z)
+    tt = (np.radians(ra) % (2 * np.pi)) / (np.pi / 2) % 4 # in [0, 4)
+    pix = np.empty(len(z), dtype=np.int64)
+
+    # Equatorial region
+    eq = za <= 2 / 3
+    temp1 = nside * (0.5 + tt[eq])
+    temp2 = nside * z[eq] * 0.75
+    jp = np.floor(temp1 - temp2).astype(np.int64) # Index of the ascending edge line
+    jm = np.floor(temp1 + temp2).astype(np.int64) # Index of the descending edge line
+    ir = nside + 1 + jp - jm # Ring number counted from z = 2/3, in {1, 2 * nside + 1}
+    kshift = 1 - (ir & 1)
+    ip = ((jp + jm - nside + kshift + 1 + 8 * nside) >> 1) % (4 * nside)
+    pix[eq] = 2 * nside * (nside - 1) + (ir - 1) * 4 * nside + ip
+
+    # Polar caps
+    cap = ~eq
+    tp = tt[cap] - np.floor(tt[cap])
+    tmp = nside * np.sqrt(3 * (1 - za[cap]))
+    jp = np.floor(tp * tmp).astype(np.int64)
+    jm = np.floor((1 - tp) * tmp).astype(np.int64)
+    ir = jp + jm + 1 # Ring number counted from the closest pole
+    ip = np.floor(tt[cap] * ir).astype(np.int64) % (4 * ir)
+    pix[cap] = np.where(z[cap] > 0, 2 * ir * (ir - 1) + ip, 12 * nside**2 - 2 * ir * (ir + 1) + ip)
+    return pix
+
+
+def pix2ang_ring(nside: int, pix: NDArray) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    '''Get the center of the given HEALPix pixels (RING scheme).
+
+    Parameters
+    ----------
+    nside : int
+        The HEALPix resolution parameter.
+    pix : numpy.ndarray
+        The array of pixel ids. Shape: (N,).
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray]
+        (RA, Dec) arrays of the pixel centers in degrees.
+    '''
+    pix = np.atleast_1d(pix).astype(np.int64)
+    npix = 12 * nside**2
+    ncap = 2 * nside * (nside - 1)
+    z = np.empty(len(pix), dtype=np.float64)
+    phi = np.empty(len(pix), dtype=np.float64)
+
+    north = pix < ncap
+    iring = (1 + np.floor(np.sqrt(1 + 2 * pix[north])).astype(np.int64)) >> 1
+    iphi = pix[north] + 1 - 2 * iring * (iring - 1)
+    z[north] = 1 - iring**2 * 4 / npix
+    phi[north] = (iphi - 0.5) * np.pi / 2 / iring
+
+    south = pix >= npix - ncap
+    ip = npix - pix[south]
+    iring = (1 + np.floor(np.sqrt(2 * ip - 1)).astype(np.int64)) >> 1
+    iphi = 4 * iring + 1 - (ip - 2 * iring * (iring - 1))
+    z[south] = -1 + iring**2 * 4 / npix
+    phi[south] = (iphi - 0.5) * np.pi / 2 / iring
+
+    eq = ~north & ~south
+    ip = pix[eq] - ncap
+    iring = ip // (4 * nside) + nside
+    iphi = ip % (4 * nside) + 1
+    fodd = np.where((iring + nside) & 1, 1, 0.5)
+    z[eq] = (2 * nside - iring) * 2 / (3 * nside)
+    phi[eq] = (iphi - fodd) * np.pi / (2 * nside)
+    return np.degrees(phi) % 360, np.degrees(np.arcsin(z))
+
+
+# Row and column of the 12 base pixels, used by the NESTED scheme
+_JRLL = np.array([2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4], dtype=np.int64)
+_JPLL = np.array([1, 3, 5, 7, 0, 2, 4, 6, 1, 3, 5, 7], dtype=np.int64)
+
+
+def _spread_bits(v: NDArray[np.int64], order: int) -> NDArray[np.int64]:
+    result = np.zeros_like(v)
+    for bit in range(order):
+        result |= ((v >> bit) & 1) << (2 * bit)
+    return result
+
+
+def _compress_bits(v: NDArray[np.int64], order: int) -> NDArray[np.int64]:
+    result = np.zeros_like(v)
+    for bit in range(order):
+        result |= ((v >> (2 * bit)) & 1) << bit
+    return result
+
+
+def ang2pix_nest(order: int, ra: NDArray, dec: NDArray) -> NDArray[np.int64]:
+    '''Get the HEALPix pixel (NESTED scheme) of the given coordinates.
+
+    In the NESTED scheme, the 4 children of the pixel p at a given order are the pixels 4p to 4p + 3
+    at the next order.
+
+    Parameters
+    ----------
+    order : int
+        The HEALPix order. The resolution parameter is nside = 2**order.
+    ra : numpy.ndarray
+        The array of RA in degrees. Shape: (N,).
+    dec : numpy.ndarray
+        The array of Dec in degrees. Shape: (N,).
+
+    Returns
+    -------
+    numpy.ndarray
+        The array of pixel ids. Shape: (N,).
+    '''
+    nside = 2**order
+    ra, dec = np.atleast_1d(ra), np.atleast_1d(dec)
+    z = np.sin(np.radians(dec))
+    za = np.abs(z)
+    tt = (np.radians(ra) % (2 * np.pi)) / (np.pi / 2) % 4 # in [0, 4)
+    face = np.empty(len(z), dtype=np.int64)
+    ix = np.empty(len(z), dtype=np.int64)
+    iy = np.empty(len(z), dtype=np.int64)
+
+    # Equatorial region
+    eq = za <= 2 / 3
+    temp1 = nside * (0.5 + tt[eq])
+    temp2 = nside * z[eq] * 0.75
+    jp = np.floor(temp1 - temp2).astype(np.int64) # Index of the ascending edge line
+    jm = np.floor(temp1 + temp2).astype(np.int64) # Index of the descending edge line
+    ifp, ifm = jp >> order, jm >> order
+    face[eq] = np.where(ifp == ifm, ifp | 4, np.where(ifp < ifm, ifp, ifm + 8))
+    ix[eq] = jm & (nside - 1)
+    iy[eq] = nside - (jp & (nside - 1)) - 1
+
+    # Polar caps
+    cap = ~eq
+    ntt = np.minimum(np.floor(tt[cap]).astype(np.int64), 3)
+    tp = tt[cap] - ntt
+    tmp = nside * np.sqrt(3 * (1 - za[cap]))
+    jp = np.minimum(np.floor(tp * tmp).astype(np.int64), nside - 1)
+    jm = np.minimum(np.floor((1 - tp) * tmp).astype(np.int64), nside - 1)
+    north = z[cap] >= 0
+    face[cap] = np.where(north, ntt, ntt + 8)
+    ix[cap] = np.where(north, nside - jm - 1, jp)
+    iy[cap] = np.where(north, nside - jp - 1, jm)
+    return (face << (2 * order)) + _spread_bits(ix, order) + (_spread_bits(iy, order) << 1)
+
+
+def pix2ang_nest(order: int, pix: NDArray) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    '''Get the center of the given HEALPix pixels (NESTED scheme).
+
+    Parameters
+    ----------
+    order : int
+        The HEALPix order. The resolution parameter is nside = 2**order.
+    pix : numpy.ndarray
+        The array of pixel ids. Shape: (N,).
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray]
+        (RA, Dec) arrays of the pixel centers in degrees.
+    '''
+    nside = 2**order
+    pix = np.atleast_1d(pix).astype(np.int64)
+    face = pix >> (2 * order)
+    ipf = pix & (nside**2 - 1)
+    ix = _compress_bits(ipf, order)
+    iy = _compress_bits(ipf >> 1, order)
+
+    jr = _JRLL[face] * nside - ix - iy - 1 # Ring number counted from the north pole
+    nr = np.where(jr < nside, jr, np.where(jr > 3 * nside, 4 * nside - jr, nside))
+    z = np.where(jr < nside, 1 - nr**2 * 4 / (12 * nside**2),
+                 np.where(jr > 3 * nside, -1 + nr**2 * 4 / (12 * nside**2), (2 * nside - jr) * 2 / (3 * nside)))
+    kshift = np.where((jr < nside) | (jr > 3 * nside), 0, (jr - nside) & 1)
+    jp = (_JPLL[face] * nr + ix - iy + 1 + kshift) // 2
+    jp = np.where(jp > 4 * nside, jp - 4 * nside, jp)
+    jp = np.where(jp < 1, jp + 4 * nside, jp)
+    phi = (jp - (kshift + 1) * 0.5) * (np.pi / 2 / nr)
+    return np.degrees(phi) % 360, np.degrees(np.arcsin(z))
+
+
+def pixel_size(order: int) -> float:
+    '''The side length in degrees of a square with the area of a HEALPix pixel of the given order.'''
+    return np.degrees(np.sqrt(4 * np.pi / (12 * 4**order)))
+
+
+def _boundary_by_radius(object_tree: KDTree, central_ids: NDArray, centers: NDArray, radius: NDArray,
+                        chunk_ids: NDArray) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    '''Find the (object, chunk) pairs with the object within `radius` of the chunk center, but not
+    central in that chunk. `centers`, `radius` and `chunk_ids` describe the chunks to test.'''
+    if object_tree.n == 0 or len(centers) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pairs = object_tree.sparse_distance_matrix(
+        KDTree(centers), angle_to_chord(min(np.max(radius), 180)), output_type='ndarray')
+    objects, chunks = pairs['i'].astype(np.int64), pairs['j'].astype(np.int64)
+    mask = pairs['v'] <= angle_to_chord(np.minimum(radius[chunks], 180))
+    objects, chunks = objects[mask], chunk_ids[chunks[mask]]
+    mask = chunks != central_ids[objects]
+    return objects[mask], chunks[mask]
+
+
+def _sum_by_cell(cells: NDArray[np.int64], counts: NDArray[np.int64]) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    '''Sum the counts of identical cells. Returns the sorted unique cells and their total counts.'''
+    unique_cells, inverse = np.unique(cells, return_inverse=True)
+    total = np.zeros(len(unique_cells), dtype=np.int64)
+    np.add.at(total, inverse, counts)
+    return unique_cells, total
+
+
+def _group_by_chunk(objects: NDArray[np.int64], chunks: NDArray[np.int64], n_chunks: int) -> list[NDArray[np.int64]]:
+    order = np.lexsort((objects, chunks))
+    counts = np.bincount(chunks, minlength=n_chunks)
+    return np.split(objects[order], np.cumsum(counts)[:-1])
+
+
+class HEALPixChunkGenerator(ChunkGenerator):
+    '''Divide the sky into the 12 * 4**order equal-area pixels of HEALPix (RING scheme).
+
+    Every chunk has the same area, so the chunk costs are predictable for uniform catalogs and
+    the parallel work is balanced. The polar regions are not special cases.
+
+    Parameters
+    ----------
+    margin : float
+        Margin in degrees.
+    order : int, optional
+        The HEALPix order. The resolution parameter is nside = 2**order. Default is 1 (48 chunks).
+    '''
+
+    def __init__(self, margin, order=1):
+        super().__init__(margin=margin)
+        if order < 0:
+            raise ValueError("The order must be non-negative")
+        self.order = order
+        self.nside = 2**order
+        self.generate()
+
+    def generate(self):
+        npix = 12 * self.nside**2
+        center_ra, center_dec = pix2ang_ring(self.nside, np.arange(npix))
+        self.pixel_radius = self._pixel_radius(center_ra, center_dec)
+        self.center_tree = KDTree(radec_to_cartesian(center_ra, center_dec))
+        for chunk_id in range(npix):
+            chunk = Chunk(chunk_id, center_ra[chunk_id], center_dec[chunk_id])
+            chunk.farest_distance(distance=self.pixel_radius[chunk_id] + self.margin)
+            self.chunks.append(chunk)
+
+    def _pixel_radius(self, center_ra, center_dec):
+        '''Bound the angular distance from each pixel center to any point of the pixel.
+
+        The pixel is sampled with the centers of the pixels 3 orders finer. The largest distance to these
+        samples is padded by the size of a fine pixel.
+        '''
+        fine_nside = self.nside * 8
+        fine_ra, fine_dec = pix2ang_ring(fine_nside, np.arange(12 * fine_nside**2))
+        parent = ang2pix_ring(self.nside, fine_ra, fine_dec)
+        chord = np.linalg.norm(radec_to_cartesian(fine_ra, fine_dec) -
+                               radec_to_cartesian(center_ra[parent], center_dec[parent]), axis=1)
+        max_chord = np.zeros(len(center_ra), dtype=np.float64)
+        np.maximum.at(max_chord, parent, chord)
+        fine_size = np.degrees(np.sqrt(4 * np.pi / (12 * fine_nside**2)))
+        return chord_to_angle(max_chord) + 1.5 * fine_size
+
+    def coor2id_central(self, ra, dec):
+        return ang2pix_ring(self.nside, ra, dec)
+
+    def coor2id_boundary(self, ra, dec):
+        # An object within the margin of a pixel is within (pixel radius + margin) of the pixel center.
+        central_ids = self.coor2id_central(ra, dec)
+        object_tree = KDTree(radec_to_cartesian(ra, dec).reshape(-1, 3))
+        objects, chunks = _boundary_by_radius(object_tree, central_ids, self.center_tree.data,
+                                              self.pixel_radius + self.margin, np.arange(len(self.chunks)))
+        return _group_by_chunk(objects, chunks, len(self.chunks))
+
+
+class AdaptiveHEALPixChunkGenerator(ChunkGenerator):
+    '''Split the sky into HEALPix pixels (NESTED scheme) and recursively split the crowded ones.
+
+    Starting from the pixels of `base_order`, every pixel holding more than `max_objects` objects is
+    replaced by its 4 children at the next order, until `max_order` is reached or the children would be
+    smaller than the margin. The chunks are therefore small in crowded fields and large in sparse ones.
+
+    The chunks depend on the data, so :meth:`plan` must be called before :meth:`distribute`. Each chunk
+    gets its own margin geometry (pixel radius + margin around its center).
+
+    Parameters
+    ----------
+    margin : float
+        Margin in degrees.
+    max_objects : int, optional
+        The largest number of central objects in a chunk before it is split. Default is 100000.
+    base_order : int, optional
+        The HEALPix order of the initial pixels. Default is 1 (48 pixels).
+    max_order : int, optional
+        The deepest HEALPix order of a chunk. Default is 12.
+    '''
+
+    def __init__(self, margin, max_objects=100000, base_order=1, max_order=12):
+        super().__init__(margin=margin)
+        if max_objects < 1:
+            raise ValueError("max_objects must be positive")
+        if not 0 <= base_order <= max_order <= 29:
+            raise ValueError("The orders must satisfy 0 <= base_order <= max_order <= 29")
+        self.max_objects = max_objects
+        self.base_order = base_order
+        self.max_order = max_order
+        self.leaf_order: Optional[NDArray[np.int64]] = None
+        self.leaf_pix: Optional[NDArray[np.int64]] = None
+
+    def plan(self, catalogs: list[Catalog]):
+        # Histogram of the objects over the pixels of max_order, built block by block
+        deepest_cells, deepest_counts = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        for catalog in catalogs:
+            for _, coordinates in catalog.iter_blocks():
+                pix = ang2pix_nest(self.max_order, coordinates[:, 0], coordinates[:, 1])
+                deepest_cells, deepest_counts = _sum_by_cell(np.concatenate([deepest_cells, pix]),
+                    np.concatenate([deepest_counts, np.ones(len(pix), dtype=np.int64)]))
+        leaf_order, leaf_pix = [], []
+        cells = np.arange(12 * 4**self.base_order, dtype=np.int64)
+        for order in range(self.base_order, self.max_order + 1):
+            occupied, counts = _sum_by_cell(deepest_cells >> (2 * (self.max_order - order)), deepest_counts)
+            crowded = occupied[counts > self.max_objects]
+            if order == self.max_order or pixel_size(order + 1) < self.margin:
+                crowded = crowded[:0]
+            split = np.isin(cells, crowded)
+            leaf_order.append(np.full(np.count_nonzero(~split), order, dtype=np.int64))
+            leaf_pix.append(cells[~split])
+            cells = (cells[split][:, None] * 4 + np.arange(4)).ravel()
+            if len(cells) == 0:
+                break
+        self.leaf_order = np.concatenate(leaf_order)
+        self.leaf_pix = np.concatenate(leaf_pix)
+        self.generate()
+
+    def generate(self):
+        center_ra, center_dec = np.empty(len(self.leaf_pix)), np.empty(len(self.leaf_pix))
+        self.pixel_radius = np.empty(len(self.leaf_pix))
+        for order in np.unique(self.leaf_order):
+            mask = self.leaf_order == order
+            center_ra[mask], center_dec[mask] = pix2ang_nest(order, self.leaf_pix[mask])
+            self.pixel_radius[mask] = self._pixel_radius(order, self.leaf_pix[mask])
+        self.centers = radec_to_cartesian(center_ra, center_dec).reshape(-1, 3)
+        self.chunks = []
+        for chunk_id in range(len(self.leaf_pix)):
+            chunk = Chunk(chunk_id, center_ra[chunk_id], center_dec[chunk_id])
+            chunk.farest_distance(distance=self.pixel_radius[chunk_id] + self.margin)
+            self.chunks.append(chunk)
+
+    @staticmethod
+    def _pixel_radius(order, pix):
+        '''Bound the angular distance from each pixel center to any point of the pixel.
+
+        The pixel is sampled with its 64 descendants 3 orders finer. The largest distance to their centers
+        is padded by the size of a descendant.
+        '''
+        fine_pix = (pix[:, None] * 64 + np.arange(64)).ravel()
+        fine_ra, fine_dec = pix2ang_nest(order + 3, fine_pix)
+        center_ra, center_dec = pix2ang_nest(order, pix)
+        fine_vec = radec_to_cartesian(fine_ra, fine_dec).reshape(len(pix), 64, 3)
+        center_vec = radec_to_cartesian(center_ra, center_dec).reshape(len(pix), 1, 3)
+        max_chord = np.max(np.linalg.norm(fine_vec - center_vec, axis=-1), axis=1)
+        return chord_to_angle(max_chord) + 1.5 * pixel_size(order + 3)
+
+    def _check_planned(self):
+        if self.leaf_pix is None:
+            raise RuntimeError("The chunks are not planned yet. Call plan() with the catalogs first.")
+
+    def distribute(self, catalog: Catalog) -> list[Chunk]:
+        self._check_planned()
+        return super().distribute(catalog)
+
+    def coor2id_central(self, ra, dec):
+        self._check_planned()
+        deepest = int(np.max(self.leaf_order))
+        pix_deepest = ang2pix_nest(deepest, ra, dec)
+        chunk_ids = np.full(len(pix_deepest), -1, dtype=np.int64)
+        for order in np.unique(self.leaf_order):
+            leaf_ids = np.flatnonzero(self.leaf_order == order)
+            leaf_pix = self.leaf_pix[leaf_ids] # Sorted, since the leaves of each order are built in order
+            cells = pix_deepest >> (2 * (deepest - order))
+            position = np.minimum(np.searchsorted(leaf_pix, cells), len(leaf_pix) - 1)
+            found = leaf_pix[position] == cells
+            chunk_ids[found] = leaf_ids[position[found]]
+        return chunk_ids
+
+    def coor2id_boundary(self, ra, dec):
+        central_ids = self.coor2id_central(ra, dec)
+        object_tree = KDTree(radec_to_cartesian(ra, dec).reshape(-1, 3))
+        object_list, chunk_list = [], []
+        # Query the leaves order by order, so that small chunks are not queried with the radius of large ones
+        for order in np.unique(self.leaf_order):
+            leaf_ids = np.flatnonzero(self.leaf_order == order)
+            objects, chunks = _boundary_by_radius(object_tree, central_ids, self.centers[leaf_ids],
+                                                  self.pixel_radius[leaf_ids] + self.margin, leaf_ids)
+            object_list.append(objects)
+            chunk_list.append(chunks)
+        return _group_by_chunk(np.concatenate(object_list), np.concatenate(chunk_list), len(self.chunks))
@@ -0,0 +1,119 @@
+import itertools
+import numpy as np
+from numpy.typing import NDArray
+from scipy.spatial import KDTree
+from .catalog import Catalog
+from .catalog_index import CatalogIndex
+from .chunk_generator_grid import ChunkGeneratorByGrid
+from .parallel import map_chunks
+from .result_xmatch import XMatchResult
+from .utilities_spherical import angle_to_chord, angular_separation, chord_to_angle
+from .xmatch import concatenate_pairs
+
+
+class ConeSearcher:
+    '''Run batches of cone searches against one catalog.
+
+    The catalog is indexed once (see :class:`CatalogIndex`), and every batch of queries is routed to
+    the chunks of the index: a cone with a radius up to `max_radius` is answered by the chunk holding
+    its center alone, since the margin of the chunk covers it. A larger cone is answered by every chunk
+    it overlaps, each of them returning only its central objects, so no object is returned twice.
+
+    Parameters
+    ----------
+    catalog : array-like, str, Catalog or CatalogIndex
+        The catalog to search in. See :class:`Catalog` for the accepted inputs. An index is used as it is,
+        and its chunk margin sets `max_radius`.
+    max_radius : float, optional
+        The largest radius in degrees that is answered by a single chunk. Required unless `catalog` is
+        a CatalogIndex. Larger cones are still answered, only more slowly.
+    chunk_generator : callable, optional
+        The chunk generator of the index. See :class:`CatalogIndex`. Default is ChunkGeneratorByGrid.
+    '''
+
+    def __init__(self, catalog, max_radius=None, chunk_generator=ChunkGeneratorByGrid):
+        if isinstance(catalog, CatalogIndex):
+            self.index = catalog
+        else:
+            if max_radius is None:
+                raise ValueError("max_radius must be given to index the catalog!")
+            # The margin of the chunks is 2 * max_tolerance.
+            self.index = CatalogIndex(catalog, max_tolerance=max_radius / 2, chunk_generator=chunk_generator)
+        self.max_radius = self.index.generator.margin
+
+    def search(self, ra, dec, radius, executor=None, n_workers=None) -> XMatchResult:
+        '''Find the objects of the catalog within the given cones.
+
+        Parameters
+        ----------
+        ra : float or numpy.ndarray
+            The RA of the centers of the cones in degrees. Shape: (N_queries,).
+        dec : float or numpy.ndarray
+            The Dec of the centers of the cones in degrees. Shape: (N_queries,).
+        radius : float or numpy.ndarray
+            The radius of the cones in degrees, either one for all the queries or one per query.
+        executor : str or concurrent.futures.Executor, optional
+            See :func:`xmatch`.
+        n_workers : int, optional
+            See :func:`xmatch`.
+
+        Returns
+        -------
+        XMatchResult
+            The result with the queries as the first catalog and the searched catalog as the second one.
+            The matches of the query `i` are ``get_matches(i)``, with their separations from the center.
+            Its `tolerance` is the radius (or the array of radii).
+        '''
+        centers = Catalog(np.column_stack([np.atleast_1d(ra), np.atleast_1d(dec)]).astype(np.float64))
+        coordinates = centers.get_coordiantes()
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), (len(centers),))
+        if not np.all(radius >= 0):
+            raise ValueError("The radius must be non-negative!")
+        args = self._route(coordinates, centers.get_unit_vectors(), radius)
+        chunk_pairs = map_chunks(cone_search_chunk, args, executor, n_workers)
+        idx1, idx2, separations = concatenate_pairs(chunk_pairs)
+        return XMatchResult.from_pairs(centers, self.index.catalog, radius, idx1, idx2, separations)
+
+    def _route(self, coordinates: NDArray[np.float64], vectors: NDArray[np.float64],
+               radius: NDArray[np.float64]) -> list[tuple]:
+        '''Group the queries by the chunks that answer them, one argument tuple of cone_search_chunk() per group.'''
+        is_small = radius <= self.max_radius
+        args = []
+        # A small cone is answered by all the objects (central and boundary) of the chunk of its center.
+        rows = np.flatnonzero(is_small)
+        chunk_ids = self.index.coor2id_central(coordinates[rows, 0], coordinates[rows, 1])
+        order = np.argsort(chunk_ids, kind='stable')
+        counts = np.bincount(chunk_ids, minlength=len(self.index.trees))
+        for chunk_id, group in enumerate(np.split(rows[order], np.cumsum(counts)[:-1])):
+            if len(group) == 0:
+                continue
+            tree, indexes = self.index.get_chunk(chunk_id)
+            args.append((group, vectors[group], radius[group], tree, indexes, len(indexes)))
+        # A large cone is answered by every chunk it overlaps, each with its central objects only.
+        rows = np.flatnonzero(~is_small)
+        if len(rows) == 0:
+            return args
+        for chunk_id, chunk in enumerate(self.index.generator.chunks):
+            chunk_ra, chunk_dec = chunk.get_center()
+            distance = angular_separation(coordinates[rows, 0], coordinates[rows, 1], chunk_ra, chunk_dec)
+            group = rows[distance <= radius[rows] + chunk.farest_distance()]
+            if len(group) == 0:
+                continue
+            tree, indexes = self.index.get_chunk(chunk_id)
+            args.append((group, vectors[group], radius[group], tree, indexes, self.index.n_central[chunk_id]))
+        return args
+
+
+def cone_search_chunk(args: tuple[NDArray, NDArray, NDArray, KDTree, NDArray, int]):
+    rows, vectors, radius, tree, indexes, n_searched = args
+    # The same relative tolerance as chord_xmatching()
+    chord = angle_to_chord(np.minimum(radius, 180)) * (1 + 1e-8)
+    neighbours = tree.query_ball_point(vectors, chord)
+    counts = np.fromiter(map(len, neighbours), dtype=np.int64, count=len(neighbours))
+    j = np.fromiter(itertools.chain.from_iterable(neighbours), dtype=np.int64, count=np.sum(counts))
+    i = np.repeat(np.arange(len(rows), dtype=np.int64), counts)
+    # Only the first n_searched objects of the tree are searched (the central objects for large cones)
+    is_searched = j < n_searched
+    i, j = i[is_searched], j[is_searched]
+    separation = chord_to_angle(np.linalg.norm(tree.data[j] - vectors[i], axis=1))
+    return rows[i], indexes[j].astype(np.int64), separation
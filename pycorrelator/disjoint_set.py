@@ -1,32 +1,98 @@
+import numpy as np
+from numpy.typing import NDArray
+
+
 class DisjointSet:
+    '''Union-find structure backed by a NumPy array.
+
+    The root of every set is always its smallest element (the larger root is linked under the smaller
+    one), so ``parent[x] <= x`` holds for every element. This keeps the forest acyclic when many pairs
+    are merged at once in :meth:`union_pairs`.
+
+    Parameters
+    ----------
+    n : int
+        The number of elements, labelled from 0 to n - 1.
+    '''
+
     def __init__(self, n):
-        self.parent = list(range(n))
-        self.rank = [0] * n
+        dtype = np.int32 if n < np.iinfo(np.int32).max else np.int64
+        self.parent = np.arange(n, dtype=dtype)
 
     def find(self, x):
-        if self.parent[x] != x:
-            # Path compression
-            self.parent[x] = self.find(self.parent[x])
-        return self.parent[x]
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Full path compression
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
 
     def union(self, x, y):
         root_x = self.find(x)
         root_y = self.find(y)
+        if root_x < root_y:
+            self.parent[root_y] = root_x
+        elif root_y < root_x:
+            self.parent[root_x] = root_y
+
+    def union_pairs(self, i_array: NDArray, j_array: NDArray):
+        '''Merge the sets of every pair (i_array[k], j_array[k]) in bulk.
+
+        Parameters
+        ----------
+        i_array : numpy.ndarray
+            The first elements of the pairs. Shape: (M,).
+        j_array : numpy.ndarray
+            The second elements of the pairs. Shape: (M,).
+        '''
+        i_array = np.asarray(i_array, dtype=self.parent.dtype).ravel()
+        j_array = np.asarray(j_array, dtype=self.parent.dtype).ravel()
+        if i_array.shape != j_array.shape:
+            raise ValueError("i_array and j_array must have the same length!")
+        while len(i_array) > 0:
+            self.compress()
+            root_i, root_j = self.parent[i_array], self.parent[j_array]
+            unmerged = root_i != root_j
+            root_i, root_j = root_i[unmerged], root_j[unmerged]
+            # Link each larger root under the smallest root it is paired with
+            np.minimum.at(self.parent, np.maximum(root_i, root_j), np.minimum(root_i, root_j))
+            i_array, j_array = i_array[unmerged], j_array[unmerged]
+
+    def compress(self):
+        '''Point every element directly to its root (pointer jumping over the whole array).'''
+        while True:
+            grandparent = self.parent[self.parent]
+            if np.array_equal(grandparent, self.parent):
+                break
+            self.parent = grandparent
+
+    def labels(self) -> NDArray:
+        '''Get the dense group id of every element.
+
+        Groups are numbered from 0 in the order of their smallest element.
+
+        Returns
+        -------
+        numpy.ndarray
+            The array of group ids. Shape: (n,).
+        '''
+        self.compress()
+        is_root = self.parent == np.arange(len(self.parent), dtype=self.parent.dtype)
+        root_label = np.cumsum(is_root, dtype=self.parent.dtype) - 1
+        return root_label[self.parent]
+
+    def get_groups(self) -> list[NDArray]:
+        '''Get the elements of every group, in the order of :meth:`labels`.
 
-        if root_x != root_y:
-            # Union by rank
-            if self.rank[root_x] > self.rank[root_y]:
-                self.parent[root_y] = root_x
-            else:
-                self.parent[root_x] = root_y
-                if self.rank[root_x] == self.rank[root_y]:
-                    self.rank[root_y] += 1
-
-    def get_groups(self):
-        groups = {}
-        for i in range(len(self.parent)):
-            root = self.find(i)
-            if root not in groups:
-                groups[root] = []
-            groups[root].append(i)
-        return list(groups.values())
+        Returns
+        -------
+        list[numpy.ndarray]
+            A list of sorted arrays of element indexes, one array per group.
+        '''
+        labels = self.labels()
+        if len(labels) == 0:
+            return []
+        order = np.argsort(labels, kind='stable')
+        boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+        return np.split(order, boundaries)
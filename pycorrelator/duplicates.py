@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+from .catalog import Catalog
+from .chunk_generator_grid import ChunkGeneratorByGrid
+from .disjoint_set import DisjointSet
+from .xmatch import self_xmatch
+
+
+def remove_duplicates(catalog, tolerance, keep='first', verbose=True, executor=None, n_workers=None,
+                      engine='rotate', chunk_generator=ChunkGeneratorByGrid):
+    """Remove the duplicated objects from a catalog, keeping one object per group of duplicates.
+
+    The catalog is matched with itself by :func:`self_xmatch`, and the objects linked by the matched
+    pairs form the groups of duplicates (the same groups as :func:`fof`).
+
+    Parameters
+    ----------
+    catalog : array-like, str or Catalog
+        The catalog. See :class:`Catalog` for the accepted inputs.
+    tolerance : float
+        The tolerance for the duplicates in degrees.
+    keep : str or array-like, optional
+        Which object of each group to keep. Default is 'first'.
+
+        * 'first': The object with the lowest index.
+        * 'last': The object with the highest index.
+        * The name of a column of the input dataframe, or an array of shape (N,): The object with the
+          highest value. Ties are resolved by the lowest index.
+    verbose : bool, optional
+        See :func:`xmatch`.
+    executor : str or concurrent.futures.Executor, optional
+        See :func:`xmatch`.
+    n_workers : int, optional
+        See :func:`xmatch`.
+    engine : str, optional
+        See :func:`xmatch`.
+    chunk_generator : callable, optional
+        See :func:`xmatch`.
+
+    Returns
+    -------
+    pandas.DataFrame or numpy.ndarray
+        The rows of the input dataframe that are kept (with their original index), or the coordinates
+        of the kept objects with shape (M, 2) for other inputs. The objects stay in the input order.
+    """
+    _catalog = catalog if isinstance(catalog, Catalog) else Catalog(catalog)
+    result = self_xmatch(_catalog, tolerance, verbose=verbose, executor=executor, n_workers=n_workers,
+                         engine=engine, chunk_generator=chunk_generator)
+    ds = DisjointSet(len(_catalog))
+    ds.union_pairs(*result.get_pairs())
+    kept = select_group_members(ds.labels(), _ranking(_catalog, keep))
+    if _catalog.datatype == pd.DataFrame:
+        return _catalog.input_data.iloc[kept]
+    return np.array(_catalog.get_coordiantes()[kept])
+
+
+def select_group_members(labels: NDArray, ranking: NDArray) -> NDArray[np.int64]:
+    """Select the object with the highest ranking in each group (the lowest index in case of ties).
+
+    Returns
+    -------
+    numpy.ndarray
+        The sorted indexes of the selected objects, one per group.
+    """
+    order = np.lexsort((np.arange(len(labels)), -ranking, labels))
+    is_first = np.ones(len(order), dtype=bool)
+    is_first[1:] = labels[order[1:]] != labels[order[:-1]]
+    return np.sort(order[is_first])
+
+
+def _ranking(catalog: Catalog, keep) -> NDArray:
+    if isinstance(keep, str) and keep == 'first':
+        return -np.arange(len(catalog), dtype=np.float64)
+    if isinstance(keep, str) and keep == 'last':
+        return np.arange(len(catalog), dtype=np.float64)
+    if isinstance(keep, str):
+        if catalog.datatype != pd.DataFrame or keep not in catalog.input_data.columns:
+            raise KeyError(f"Column '{keep}' is not in the input DataFrame")
+        keep = catalog.input_data[keep]
+    ranking = np.asarray(keep)
+    if ranking.shape != (len(catalog),):
+        raise ValueError("The ranking must have one value per object in the catalog!")
+    return ranking
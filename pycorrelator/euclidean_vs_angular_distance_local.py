@@ -1,5 +1,5 @@
+from functools import lru_cache
 import numpy as np
-from scipy.spatial.distance import euclidean
 from .utilities_spherical import point_offset
 
 
@@ -72,10 +72,14 @@ pronounced error shifts, becoming predominantly horizontal (θ = 90°).
 '''
 
 
+@lru_cache(maxsize=1024)
 def compute_error(declination, distance):
     '''
     Purpose: Compute the relative error in Euclidean distance given declination and angular distance.
 
+    The result is memoized, since the chunks of a grid share a handful of (max radius, tolerance)
+    pairs and the same values are requested on every call of xmatch() and fof().
+
     Parameters:
     - declination: float, the declination in degrees
     - distance: float, the angular distance in degrees
@@ -91,10 +95,27 @@ def compute_error(declination, distance):
 
 def compute_max_relative_error(dec, distances, theta_values):
     origin = (180, dec)
-    offset_points_theta = np.array(point_offset(origin, distances, theta_values))
-    euclidean_distances_theta = np.array([euclidean(origin, offset_point)
-                                          for offset_point in offset_points_theta.T])
+    offset_ra, offset_dec = point_offset(origin, distances, theta_values)
+    euclidean_distances_theta = np.hypot(offset_ra - origin[0], offset_dec - origin[1])
     relative_errors = np.abs((euclidean_distances_theta - distances) / distances)
     max_relative_error = np.max(relative_errors)
     angle_of_max_error = theta_values[np.argmax(relative_errors)]
     return max_relative_error, angle_of_max_error
+
+
+def rejection_rate(n_candidates, n_accepted):
+    '''
+    Purpose: Compute the fraction of the KD-tree candidates rejected by the exact distance check.
+
+    A high rate means that the safety factors applied on top of compute_error() over-fetch candidates.
+
+    Parameters:
+    - n_candidates: int, the number of candidate pairs returned by the KD-tree
+    - n_accepted: int, the number of pairs within the tolerance
+
+    Returns:
+    - rate: float, the rejected fraction in [0, 1]. 0 if there is no candidate.
+    '''
+    if n_candidates == 0:
+        return 0.0
+    return (n_candidates - n_accepted) / n_candidates
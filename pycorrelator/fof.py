@@ -1,14 +1,18 @@
 import warnings
+from typing import Callable, Optional
 import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 from scipy.spatial import KDTree
 from .catalog import Catalog
 from .chunk import Chunk
-from .chunk_generator_grid import GridChunkGenerator
+from .chunk_generator_grid import ChunkGeneratorByGrid
 from .disjoint_set import DisjointSet
-from .euclidean_vs_angular_distance_local import compute_error
-from .result_fof import FoFResult
-from .utilities_spherical import radec_to_cartesian, cartesian_to_radec
-from .utilities_spherical import great_circle_distance, rotate_radec_about_axis
+from .euclidean_vs_angular_distance_local import compute_error, rejection_rate
+from .parallel import describe_executor, map_chunks
+from .result_fof import FoFHierarchy, FoFResult
+from .utilities_spherical import angle_to_chord, angular_separation
 
 def group_by_quadtree(catalog, tolerance, dec_bound=None, ring_chunk=None) -> FoFResult:
     warnings.warn("This function will be deprecated. Use fof() instead.", FutureWarning)
@@ -18,7 +22,8 @@ def group_by_quadtree(catalog, tolerance, dec_bound=None, ring_chunk=None) -> Fo
         raise ValueError("The ring_chunk parameter is no longer supported.")
     return fof(catalog, tolerance)
 
-def fof(catalog, tolerance) -> FoFResult:
+def fof(catalog, tolerance, executor=None, n_workers=None, engine='auto',
+        chunk_generator=ChunkGeneratorByGrid) -> FoFResult:
     """Perform the Friends-of-Friends (FoF) grouping algorithm on a catalog.
 
     This function applies the FoF algorithm to a given catalog. The algorithm works by linking objects
@@ -27,61 +32,231 @@ def fof(catalog, tolerance) -> FoFResult:
 
     Parameters
     ----------
-    catalog : array-like
-        The catalog to group.
+    catalog : array-like, str or Catalog
+        The catalog to group. See :class:`Catalog` for the accepted inputs, including memory-mapped .npy
+        files for catalogs larger than the memory.
     tolerance : float
         The tolerance for the grouping in degrees.
+    executor : str or concurrent.futures.Executor, optional
+        How to process the chunks: 'thread', 'process', or a user-supplied executor.
+        Default is None, which processes the chunks serially unless `n_workers` > 1.
+    n_workers : int, optional
+        The number of workers for the 'thread' and 'process' backends.
+    engine : str, optional
+        The pair-finding engine. Default is 'auto'.
+
+        * 'auto': 'global' if the catalog is in memory and the grouping is serial (no `executor` and
+          `n_workers` <= 1), otherwise 'rotate'. See :func:`select_fof_engine`.
+        * 'global': Search all the unit vectors with a single 3D KD-tree and label the groups with
+          ``scipy.sparse.csgraph.connected_components``. The catalog is not divided into chunks, so
+          there is no margin to duplicate, but the whole catalog is held in memory.
+        * 'rotate': Rotate each chunk to (180, 0) and search on (Ra, Dec) with a 2D KD-tree, followed
+          by an exact great-circle distance check.
+        * 'chord': Search the 3D unit vectors of each chunk with the exact chord radius
+          2 * sin(tolerance / 2). No rotation and no distortion correction are needed.
+    chunk_generator : callable, optional
+        A :class:`ChunkGenerator` subclass, or any callable taking the margin in degrees and returning
+        a chunk generator. Default is ChunkGeneratorByGrid. For example, ChunkGeneratorByDenseGrid or
+        ``functools.partial(HEALPixChunkGenerator, order=2)``. Use AdaptiveHEALPixChunkGenerator for
+        catalogs with a very uneven density. Not used by the 'global' engine.
 
     Returns
     -------
     FoFResult
         The result of the Friends-of-Friends grouping.
     """
-    DEC_BOUND = 60
-    RING_CHUNK = [6, 6]
-    dec_bound, ring_chunk = DEC_BOUND, RING_CHUNK
-
-    _catalog = Catalog(catalog)
-    cg = GridChunkGenerator(margin=2*tolerance)
-    cg.set_symmetric_ring_chunk(dec_bound, ring_chunk)
-    cg.distribute(_catalog)
-    
-    print(f"Using a single process to group {len(cg.chunks)} chunks.")
+    _catalog, engine = _prepare_catalog(catalog, engine, executor, n_workers)
+    if engine == 'global':
+        return FoFResult.from_labels(_catalog, tolerance, global_grouping(_catalog, tolerance))
+    pairs = find_chunk_pairs(_catalog, tolerance, executor, n_workers, engine, chunk_generator)
+    ds = DisjointSet(len(_catalog))
+    ds.union_pairs(pairs[:, 0], pairs[:, 1])
+    return FoFResult.from_labels(_catalog, tolerance, ds.labels())
+
+
+def fof_multi(catalog, tolerances, executor=None, n_workers=None, engine='auto',
+              chunk_generator=ChunkGeneratorByGrid) -> FoFHierarchy:
+    """Perform the Friends-of-Friends (FoF) grouping at several tolerances in one pass.
+
+    The pairs are found once at the largest tolerance and sorted by their separation. A union-find is
+    then swept through the sorted pairs, and the group labels are recorded at every tolerance, so the
+    cost is close to a single call of :func:`fof` at the largest tolerance. Below the largest
+    tolerance, the pairs are selected with the exact chord radius of the 'chord' engine, so the groups
+    at every tolerance are the same as those of :func:`fof`. Each group is contained in a group at
+    every larger tolerance (see :meth:`FoFHierarchy.get_merge_tree`).
+
+    Parameters
+    ----------
+    catalog : array-like, str or Catalog
+        The catalog to group. See :class:`Catalog` for the accepted inputs.
+    tolerances : array-like
+        The tolerances for the grouping in degrees. They are sorted in ascending order.
+    executor : str or concurrent.futures.Executor, optional
+        See :func:`fof`.
+    n_workers : int, optional
+        See :func:`fof`.
+    engine : str, optional
+        See :func:`fof`.
+    chunk_generator : callable, optional
+        See :func:`fof`.
+
+    Returns
+    -------
+    FoFHierarchy
+        The group labels at every tolerance.
+    """
+    tolerances = np.unique(np.asarray(tolerances, dtype=np.float64))
+    if len(tolerances) == 0 or tolerances[0] <= 0:
+        raise ValueError("tolerances must be a non-empty list of positive numbers!")
+    _catalog, engine = _prepare_catalog(catalog, engine, executor, n_workers)
+    if engine == 'global':
+        pairs = find_global_pairs(_catalog, tolerances[-1])
+    else:
+        pairs = find_chunk_pairs(_catalog, tolerances[-1], executor, n_workers, engine, chunk_generator)
+    vectors = _catalog.get_unit_vectors()
+    chords = np.linalg.norm(vectors[pairs[:, 0]] - vectors[pairs[:, 1]], axis=1)
+    order = np.argsort(chords, kind='stable')
+    pairs, chords = pairs[order], chords[order]
+    # The same chord radius as chord_grouping(). All the pairs are kept at the largest tolerance.
+    ends = np.searchsorted(chords, angle_to_chord(tolerances[:-1]) * (1 + 1e-8), side='right')
+    ends = np.append(ends, len(pairs))
     ds = DisjointSet(len(_catalog))
-    for chunk in cg.chunks:
-        groups_index = group_by_quadtree_chunk((chunk, tolerance))
-        for i, j in groups_index:
-            ds.union(i, j)
-    groups = ds.get_groups()
-    return FoFResult(_catalog, tolerance, groups)
+    labels = np.empty((len(tolerances), len(_catalog)), dtype=ds.parent.dtype)
+    start = 0
+    for level, end in enumerate(ends):
+        ds.union_pairs(pairs[start:end, 0], pairs[start:end, 1])
+        labels[level] = ds.labels()
+        start = end
+    return FoFHierarchy(_catalog, tolerances, labels)
+
+
+def _prepare_catalog(catalog, engine, executor, n_workers) -> tuple[Catalog, str]:
+    if engine not in FOF_ENGINES and engine not in ('auto', 'global'):
+        raise ValueError(f"Unknown engine: {engine}. Use one of {['auto', 'global'] + list(FOF_ENGINES)}.")
+    _catalog = catalog if isinstance(catalog, Catalog) else Catalog(catalog)
+    if engine == 'auto':
+        engine = select_fof_engine(_catalog, executor, n_workers)
+    return _catalog, engine
+
+
+def find_chunk_pairs(catalog: Catalog, tolerance, executor, n_workers, engine, chunk_generator) -> NDArray:
+    """Find the pairs of objects within the tolerance with a chunk engine.
+
+    Returns
+    -------
+    numpy.ndarray
+        The pairs of catalog indexes, each pair found once. Shape: (M, 2).
+    """
+    cg = chunk_generator(margin=2*tolerance)
+    cg.plan([catalog])
+    cg.distribute(catalog)
+    
+    print(f"Using {describe_executor(executor, n_workers)} to group {len(cg.chunks)} chunks.")
+    print(f"Chunk occupancy: {cg.describe_occupancy()}.")
+    args = [(chunk, tolerance) for chunk in cg.chunks]
+    chunk_results = map_chunks(FOF_ENGINES[engine], args, executor, n_workers)
+    pairs = np.concatenate([result[0] for result in chunk_results])
+    n_candidates = sum(result[1] for result in chunk_results)
+    print(f"Candidate rejection rate: {rejection_rate(n_candidates, len(pairs)):.2%} "
+          f"({n_candidates - len(pairs)} of {n_candidates} candidates).")
+    return pairs
+
+
+def select_fof_engine(catalog: Catalog, executor=None, n_workers=None) -> str:
+    """Select the engine used by ``fof(engine='auto')``.
+
+    A single KD-tree over the whole catalog avoids the duplicated margins and the merge of the chunks,
+    so 'global' is selected when the catalog fits in memory. The chunks are kept ('rotate') for
+    memory-mapped catalogs, to bound the memory, and when an executor or several workers are requested,
+    to spread the work.
+
+    Parameters
+    ----------
+    catalog : Catalog
+        The catalog to group.
+    executor : str or concurrent.futures.Executor, optional
+        The executor passed to :func:`fof`.
+    n_workers : int, optional
+        The number of workers passed to :func:`fof`.
+
+    Returns
+    -------
+    str
+        The name of the engine, 'global' or 'rotate'.
+    """
+    if catalog.out_of_core or executor is not None or (n_workers is not None and n_workers > 1):
+        return 'rotate'
+    return 'global'
+
+
+def global_grouping(catalog: Catalog, tolerance) -> NDArray:
+    """Group the whole catalog with a single KD-tree of its unit vectors.
+
+    Returns
+    -------
+    numpy.ndarray
+        The group label of every object. Shape: (N,).
+    """
+    n_objects = len(catalog)
+    pairs = find_global_pairs(catalog, tolerance)
+    graph = coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])),
+                       shape=(n_objects, n_objects))
+    _, labels = connected_components(graph, directed=False)
+    return labels
+
+
+def find_global_pairs(catalog: Catalog, tolerance) -> NDArray:
+    """Find the pairs of objects within the tolerance with a single KD-tree of the unit vectors.
+
+    Returns
+    -------
+    numpy.ndarray
+        The pairs of catalog indexes, each pair found once. Shape: (M, 2).
+    """
+    n_objects = len(catalog)
+    print(f"Using a single KD-tree to group {n_objects} objects.")
+    pairs, _ = chord_grouping(np.arange(n_objects, dtype=np.int64), catalog.get_unit_vectors(), tolerance)
+    return pairs
 
 
 def group_by_quadtree_chunk(args: tuple[Chunk, float]):
     chunk, tolerance = args
-    objects = chunk.get_data()
     # Rotate the center of the chunk to (180, 0) of the celestial sphere
-    ra, dec = chunk.get_center()
-    center_car = radec_to_cartesian(ra, dec)
-    normal_car = np.cross(center_car, np.array([-1., 0., 0.]))
-    normal_car /= np.linalg.norm(normal_car)
-    normal_ra, normal_dec = cartesian_to_radec(normal_car)
-    angle = great_circle_distance(ra, dec, 180, 0)
-    rot_ra, rot_dec = rotate_radec_about_axis(objects[:, 0], objects[:, 1], normal_ra, normal_dec, angle)
-    corrdinates_np = np.vstack((rot_ra, rot_dec)).T
+    corrdinates_np = chunk.rotate_to_center(chunk.get_vectors())
     index_np = chunk.get_index()
     SAFTY_FACTOR = 1.05
     A2E_factor = (1 + compute_error(chunk.farest_distance(), tolerance)) * SAFTY_FACTOR
-    groups_index = spherical_quadtree_grouping(index_np, corrdinates_np, tolerance, A2E_factor)
-    return groups_index
+    return spherical_quadtree_grouping(index_np, corrdinates_np, tolerance, A2E_factor, chunk.owns_pairs)
 
 
-def spherical_quadtree_grouping(original_indexes: np.array, coordinate: np.array, tolerance, A2E_factor):
+def spherical_quadtree_grouping(original_indexes: np.array, coordinate: np.array, tolerance, A2E_factor,
+                                owns_pairs: Optional[Callable] = None):
     qt = KDTree(coordinate)
-    indexes = qt.query_pairs(tolerance * A2E_factor)
-    rtn = []
-    for i in indexes:
-        distance = great_circle_distance(coordinate[i[0], 0], coordinate[i[0], 1],
-                                         coordinate[i[1], 0], coordinate[i[1], 1])
-        if distance < tolerance or np.isclose(distance, tolerance, rtol=1e-8):
-            rtn.append((original_indexes[i[0]], original_indexes[i[1]]))
-    return rtn
+    pairs = qt.query_pairs(tolerance * A2E_factor, output_type='ndarray')
+    if owns_pairs is not None:
+        # Only the pairs owned by the chunk are refined, so that every pair is computed exactly once.
+        pairs = pairs[owns_pairs(pairs[:, 0], pairs[:, 1])]
+    i, j = pairs[:, 0], pairs[:, 1]
+    distance = angular_separation(coordinate[i, 0], coordinate[i, 1], coordinate[j, 0], coordinate[j, 1])
+    is_close = (distance < tolerance) | np.isclose(distance, tolerance, rtol=1e-8)
+    return original_indexes[pairs[is_close]].astype(np.int64).reshape(-1, 2), len(pairs)
+
+
+def group_by_chord_chunk(args: tuple[Chunk, float]):
+    chunk, tolerance = args
+    return chord_grouping(chunk.get_index(), chunk.get_vectors(), tolerance, chunk.owns_pairs)
+
+
+def chord_grouping(original_indexes: np.array, vectors: np.array, tolerance, owns_pairs: Optional[Callable] = None):
+    # The same relative tolerance as the np.isclose() check in spherical_quadtree_grouping()
+    radius = angle_to_chord(tolerance) * (1 + 1e-8)
+    pairs = KDTree(vectors).query_pairs(radius, output_type='ndarray')
+    if owns_pairs is not None:
+        pairs = pairs[owns_pairs(pairs[:, 0], pairs[:, 1])]
+    return original_indexes[pairs].astype(np.int64).reshape(-1, 2), len(pairs)
+
+
+FOF_ENGINES = {
+    'rotate': group_by_quadtree_chunk,
+    'chord': group_by_chord_chunk,
+}
@@ -0,0 +1,75 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+EXECUTOR_BACKENDS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+
+def map_chunks(func: Callable, args: Iterable, executor: Optional[Union[str, Executor]] = None,
+               n_workers: Optional[int] = None) -> list:
+    '''Apply a chunk function to every argument tuple, serially or through an executor.
+
+    The results are always returned in the order of `args`, so the outcome does not depend
+    on the backend or on the number of workers.
+
+    Parameters
+    ----------
+    func : callable
+        The function applied to each element of `args`. Must be picklable (defined at module level)
+        for the 'process' backend.
+    args : iterable
+        The arguments passed to `func`, one element per call.
+    executor : str or concurrent.futures.Executor, optional
+        Either 'thread', 'process', or an executor instance supplied by the user. A user-supplied
+        executor is not shut down by this function. If None, the chunks are processed serially unless
+        `n_workers` is larger than 1, in which case the 'process' backend is used.
+    n_workers : int, optional
+        The number of workers for the 'thread' and 'process' backends. Default is None, which lets
+        `concurrent.futures` decide.
+
+    Returns
+    -------
+    list
+        The results of `func` for each element of `args`.
+    '''
+    return list(imap_chunks(func, args, executor, n_workers))
+
+
+def imap_chunks(func: Callable, args: Iterable, executor: Optional[Union[str, Executor]] = None,
+                n_workers: Optional[int] = None) -> Iterator:
+    '''Like :func:`map_chunks`, but yield the results one by one, as soon as each one is available.
+
+    The results are still yielded in the order of `args`. The arguments are validated immediately.
+    If the iteration is stopped early, the pending chunks of an executor created here are cancelled.
+    '''
+    if n_workers is not None and n_workers < 1:
+        raise ValueError("n_workers must be a positive integer!")
+    if executor is None:
+        if n_workers is None or n_workers == 1:
+            return (func(arg) for arg in args)
+        executor = 'process'
+    if isinstance(executor, Executor):
+        return executor.map(func, args)
+    if executor not in EXECUTOR_BACKENDS:
+        raise ValueError(f"Unknown executor: {executor}. Use one of {list(EXECUTOR_BACKENDS)} or an Executor.")
+    return _imap_with_pool(EXECUTOR_BACKENDS[executor](max_workers=n_workers), func, args)
+
+
+def _imap_with_pool(pool: Executor, func: Callable, args: Iterable) -> Iterator:
+    try:
+        yield from pool.map(func, args)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def describe_executor(executor: Optional[Union[str, Executor]] = None, n_workers: Optional[int] = None) -> str:
+    '''Describe how the chunks will be processed, for the progress messages.'''
+    if executor is None and (n_workers is None or n_workers == 1):
+        return "a single process"
+    if isinstance(executor, Executor):
+        return f"a user-supplied {type(executor).__name__}"
+    backend = executor if executor is not None else 'process'
+    workers = f"{n_workers} " if n_workers is not None else ""
+    return f"{workers}{backend} workers"
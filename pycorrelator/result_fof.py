@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
+from numpy.typing import NDArray
 from .catalog import Catalog
+from .utilities_spherical import cartesian_to_radec
 
 class FoFResult:
     
@@ -9,6 +11,46 @@ class FoFResult:
         self.tolerance = tolerance
         self.result_list = result_list
 
+    @classmethod
+    def from_labels(cls, catalog: Catalog, tolerance: float, labels) -> 'FoFResult':
+        """Build the result from the group label of every object.
+
+        The labels can be any integers, e.g. from ``scipy.sparse.csgraph.connected_components``. The
+        groups are ordered by their smallest object index and the objects of each group are sorted, as
+        in the result of the chunked engines.
+
+        Parameters
+        ----------
+        catalog : Catalog
+            The grouped catalog.
+        tolerance : float
+            The tolerance of the grouping in degrees.
+        labels : array-like
+            The group label of every object. Shape: (N,).
+
+        Returns
+        -------
+        FoFResult
+            The result with one group per distinct label.
+        """
+        labels = np.asarray(labels)
+        if labels.shape != (len(catalog),):
+            raise ValueError(f"Expected {len(catalog)} labels, got an array of shape {labels.shape}.")
+        if len(labels) == 0:
+            return cls(catalog, tolerance, [])
+        order = np.argsort(labels, kind='stable')
+        boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(order)]])
+        # The stable sort puts the smallest object index first in each group
+        first_objects = order[starts]
+        if np.any(np.diff(first_objects) < 0):
+            rank = np.argsort(first_objects)
+            starts, ends = starts[rank], ends[rank]
+        # Slicing is much faster than np.split() for millions of small groups
+        groups = [order[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+        return cls(catalog, tolerance, groups)
+
     def get_coordinates(self) -> list[list[tuple]]:
         """Returns the coordinates of objects grouped as lists of tuples.
 
@@ -23,14 +65,22 @@ class FoFResult:
     def get_group_coordinates(self) -> list[tuple]:
         """Returns the center coordinates of the groups.
 
+        The center is the normalized mean of the unit vectors of the objects (cached by the catalog),
+        so it is also correct for the groups across Ra = 0 and near the poles.
+
         Returns
         -------
         list[tuple]
             A list of tuples of coordinates of the center of each group.
         """
-        objects_coordinates = self.catalog.get_coordiantes()
+        if len(self.result_list) == 0:
+            return []
+        vectors = self.catalog.get_unit_vectors()
+        sizes = np.array([len(g) for g in self.result_list])
+        sums = np.add.reduceat(vectors[np.concatenate(self.result_list)], np.cumsum(sizes) - sizes, axis=0)
+        ra, dec = cartesian_to_radec(sums / np.linalg.norm(sums, axis=1, keepdims=True))
         # [FIXME] This return a list of NDArrays, not a list of tuples.
-        return [np.average(objects_coordinates[g, :], axis=0) for g in self.result_list]
+        return list(np.column_stack((ra, dec)))
     
     def get_group_sizes(self) -> list[int]:
         """Returns the object counts in each group.
@@ -79,3 +129,85 @@ class FoFResult:
         grouped_df = data_df.iloc[original_indices].copy()
         grouped_df.index = pd.MultiIndex.from_tuples(new_index_tuples, names=['Group', 'Object'])
         return grouped_df
+
+
+class FoFHierarchy:
+    """The groups of a Friends-of-Friends grouping at several tolerances, returned by :func:`fof_multi`.
+
+    The groups at each tolerance are numbered in the order of their smallest object index, as in
+    :class:`FoFResult`.
+    """
+
+    def __init__(self, catalog: Catalog, tolerances: NDArray, labels: NDArray):
+        self.catalog = catalog
+        self.tolerances = tolerances
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.tolerances)
+
+    def get_labels(self, tolerance=None) -> NDArray:
+        """Returns the group label of every object.
+
+        Parameters
+        ----------
+        tolerance : float, optional
+            One of the tolerances. Default is None, which returns the labels at every tolerance.
+
+        Returns
+        -------
+        numpy.ndarray
+            The group labels with shape (N,), or with shape (n_tolerances, N) if `tolerance` is None.
+        """
+        if tolerance is None:
+            return self.labels
+        return self.labels[self._level(tolerance)]
+
+    def get_result(self, tolerance) -> FoFResult:
+        """Returns the groups at one of the tolerances.
+
+        Parameters
+        ----------
+        tolerance : float
+            One of the tolerances.
+
+        Returns
+        -------
+        FoFResult
+            The same result as :func:`fof` with this tolerance.
+        """
+        return FoFResult.from_labels(self.catalog, tolerance, self.labels[self._level(tolerance)])
+
+    def get_group_counts(self) -> NDArray[np.int64]:
+        """Returns the number of groups at every tolerance.
+
+        Returns
+        -------
+        numpy.ndarray
+            The number of groups, in the order of the tolerances. Shape: (n_tolerances,).
+        """
+        if self.labels.shape[1] == 0:
+            return np.zeros(len(self.tolerances), dtype=np.int64)
+        return self.labels.max(axis=1).astype(np.int64) + 1
+
+    def get_merge_tree(self) -> list[NDArray[np.int64]]:
+        """Returns the group at the next tolerance that contains each group.
+
+        Returns
+        -------
+        list[numpy.ndarray]
+            One array per tolerance except the largest. The k-th element of the array at level l is the
+            label at level l + 1 of the group with the label k at level l.
+        """
+        tree = []
+        for level in range(len(self.tolerances) - 1):
+            # The labels follow the smallest object index, so the first objects come out in label order.
+            _, first_objects = np.unique(self.labels[level], return_index=True)
+            tree.append(self.labels[level + 1][first_objects].astype(np.int64))
+        return tree
+
+    def _level(self, tolerance) -> int:
+        level = np.flatnonzero(np.isclose(self.tolerances, tolerance, rtol=1e-12, atol=0))
+        if len(level) == 0:
+            raise ValueError(f"The tolerance {tolerance} is not one of {list(self.tolerances)}.")
+        return int(level[0])
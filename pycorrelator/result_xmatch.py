@@ -1,39 +1,161 @@
 from collections import Counter, defaultdict
+from typing import Optional
 import numpy as np
 import pandas as pd
+from numpy.typing import NDArray
 from .catalog import Catalog
+from .utilities_spherical import position_angle
 
 class XMatchResult:
+    '''The result of a cross-match, stored in the compressed sparse row (CSR) format.
 
-    def __init__(self, cat1: Catalog, cat2: Catalog, tolerance, result_dict: defaultdict):
+    The indexes in the second catalog matched to the object `i` in the first catalog are
+    ``indices[offsets[i]:offsets[i + 1]]``, sorted in ascending order.
+
+    Parameters
+    ----------
+    cat1 : Catalog
+        The first catalog.
+    cat2 : Catalog
+        The second catalog.
+    tolerance : float
+        The tolerance of the cross-match in degrees.
+    offsets : numpy.ndarray
+        The row offsets into `indices`. Shape: (len(cat1) + 1,).
+    indices : numpy.ndarray
+        The matched indexes in the second catalog. Shape: (N_pairs,).
+    separations : numpy.ndarray, optional
+        The angular separations of the matched pairs in degrees, aligned with `indices`. They are
+        computed by the matching itself, so :func:`xmatch` always provides them.
+    '''
+
+    def __init__(self, cat1: Catalog, cat2: Catalog, tolerance, offsets: NDArray[np.int64],
+                 indices: NDArray[np.int64], separations: Optional[NDArray[np.float64]] = None):
         self.cat1 = cat1
         self.cat2 = cat2
         self.tolerance = tolerance
-        self.result_dict = result_dict
-        self.result_dict_reserve = None
-    
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.separations = None if separations is None else np.asarray(separations, dtype=np.float64)
+        if self.separations is not None and len(self.separations) != len(self.indices):
+            raise ValueError("The separations must be aligned with the matched indexes!")
+        if len(self.offsets) != len(cat1) + 1:
+            raise ValueError("The length of offsets must be len(cat1) + 1!")
+        if self.offsets[-1] != len(self.indices):
+            raise ValueError("The last offset must be equal to the number of matched pairs!")
+        self._result_dict = None
+        self._reversed = None
+
+    @classmethod
+    def from_pairs(cls, cat1: Catalog, cat2: Catalog, tolerance, idx1: NDArray, idx2: NDArray,
+                   separations: Optional[NDArray] = None) -> 'XMatchResult':
+        '''Build the result from the matched pairs (idx1[k], idx2[k]), in any order and without duplicates.'''
+        idx1 = np.asarray(idx1, dtype=np.int64)
+        idx2 = np.asarray(idx2, dtype=np.int64)
+        order = np.lexsort((idx2, idx1))
+        offsets = np.zeros(len(cat1) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(idx1, minlength=len(cat1)), out=offsets[1:])
+        if separations is not None:
+            separations = np.asarray(separations, dtype=np.float64)[order]
+        return cls(cat1, cat2, tolerance, offsets, idx2[order], separations)
+
+    @classmethod
+    def from_dict(cls, cat1: Catalog, cat2: Catalog, tolerance, result_dict: dict) -> 'XMatchResult':
+        '''Build the result from a dictionary mapping the indexes in cat1 to the lists of matched indexes in cat2.'''
+        keys = np.array(list(result_dict.keys()), dtype=np.int64)
+        values = [np.asarray(v, dtype=np.int64) for v in result_dict.values()]
+        counts = np.array([len(v) for v in values], dtype=np.int64)
+        idx2 = np.concatenate(values) if len(values) > 0 else np.empty(0, dtype=np.int64)
+        return cls.from_pairs(cat1, cat2, tolerance, np.repeat(keys, counts), idx2)
+
     def __str__(self):
         return f"XMatchResult of cat1 with {len(self.cat1)} objects and cat2 with {len(self.cat2)} objects."
 
+    def get_counts(self) -> NDArray[np.int64]:
+        '''Get the number of matches in the second catalog for every object in the first catalog.
+
+        Returns
+        -------
+        numpy.ndarray
+            The array of the number of matches. Shape: (len(cat1),).
+        '''
+        return np.diff(self.offsets)
+
+    def get_matches(self, idx) -> NDArray[np.int64]:
+        '''Get the indexes in the second catalog matched to the object `idx` in the first catalog.'''
+        return self.indices[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def get_pairs(self) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+        '''Get all the matched pairs as two aligned arrays of indexes (idx1, idx2).'''
+        idx1 = np.repeat(np.arange(len(self.cat1), dtype=np.int64), self.get_counts())
+        return idx1, self.indices
+
+    def get_separations(self) -> NDArray[np.float64]:
+        '''Get the angular separations in degrees of all the matched pairs, aligned with :meth:`get_pairs`.'''
+        if self.separations is None:
+            raise ValueError("The separations of the matched pairs are not available in this result!")
+        return self.separations
+
+    def get_position_angles(self) -> NDArray[np.float64]:
+        '''Get the position angles of the matched objects in the second catalog as seen from the objects
+        in the first catalog, aligned with :meth:`get_pairs`.
+
+        Returns
+        -------
+        numpy.ndarray
+            The position angles in degrees in the range [0, 360), measured from the north towards the
+            east. Shape: (N_pairs,).
+        '''
+        idx1, idx2 = self.get_pairs()
+        coords1, coords2 = self.cat1.get_coordiantes(), self.cat2.get_coordiantes()
+        return position_angle(coords1[idx1, 0], coords1[idx1, 1], coords2[idx2, 0], coords2[idx2, 1])
+
+    def get_nearest(self) -> tuple[NDArray[np.int64], NDArray[np.float64]]:
+        '''Get the closest match in the second catalog for every object in the first catalog.
+
+        Returns
+        -------
+        nearest : numpy.ndarray
+            The index of the closest match, or -1 if there is no match. Shape: (len(cat1),).
+        separation : numpy.ndarray
+            The angular separation of the closest match in degrees, or NaN if there is no match.
+            Shape: (len(cat1),).
+        '''
+        separations = self.get_separations()
+        idx1, idx2 = self.get_pairs()
+        # Sorted by the separation within each row, so the closest match is at the start of the row
+        order = np.lexsort((idx2, separations, idx1))
+        has_match = self.get_counts() > 0
+        first = order[self.offsets[:-1][has_match]]
+        nearest = np.full(len(self.cat1), -1, dtype=np.int64)
+        separation = np.full(len(self.cat1), np.nan)
+        nearest[has_match] = idx2[first]
+        separation[has_match] = separations[first]
+        return nearest, separation
+
+    def reverse(self) -> 'XMatchResult':
+        '''Get the same result with the roles of the two catalogs swapped.'''
+        if self._reversed is None:
+            idx1, idx2 = self.get_pairs()
+            self._reversed = self.__class__.from_pairs(self.cat2, self.cat1, self.tolerance, idx2, idx1,
+                                                       self.separations)
+            self._reversed._reversed = self
+        return self._reversed
+
+    @property
+    def result_dict(self) -> defaultdict:
+        # Compatibility view of the CSR storage, built on the first access.
+        if self._result_dict is None:
+            rows = np.split(self.indices, self.offsets[1:-1]) if len(self.cat1) > 0 else []
+            self._result_dict = defaultdict(list, zip(range(len(self.cat1)), rows))
+        return self._result_dict
+
     def get_result_dict(self) -> defaultdict:
-        # [FIXME] Temporary fix for the potential issue of unsorted dictionary
-        # This solution impacts the performance of the code.
-        renormalization_dd = defaultdict(list)
-        for idx in self.cat1.get_indexes():
-            renormalization_dd[idx] = self.result_dict[idx]
-        return renormalization_dd
+        return self.result_dict
 
     def get_result_dict_reserve(self) -> defaultdict:
-        # if self.result_dict_reserve is None: # [TODO] Save the result_dict_reserve to improve performance
-        temp_dd = defaultdict(list) # Improve the performance after fixing the issue of unsorted dictionary
-        for k, v in self.result_dict.items():
-            for vv in v:
-                temp_dd[vv].append(k)
-        self.result_dict_reserve = defaultdict(list)
-        for idx in self.cat2.get_indexes():
-            self.result_dict_reserve[idx] = temp_dd[idx]
-        return self.result_dict_reserve
-    
+        return self.reverse().result_dict
+
     def get_dataframe1(self, min_match=0, coord_columns=['Ra', 'Dec'],
                        retain_all_columns=True, retain_columns=None) -> pd.DataFrame:
         '''Get the first catalog with the number of matches as a pandas dataframe.
@@ -58,7 +180,7 @@ class XMatchResult:
         idxes_array = self.cat1.get_indexes()
         coords_array = self.cat1.get_coordiantes()
         data_df = pd.DataFrame(coords_array, columns=coord_columns, index=idxes_array)
-        data_df['N_match'] = [len(v) for v in self.get_result_dict().values()]
+        data_df['N_match'] = self.get_counts()
         append_df = self.cat1.get_appending_data(retain_all_columns, retain_columns)
         if len(append_df.columns) > 0:
             data_df = pd.concat([data_df, append_df], axis=1)
@@ -74,7 +196,7 @@ class XMatchResult:
         idxes_array = self.cat2.get_indexes()
         coords_array = self.cat2.get_coordiantes()
         data_df = pd.DataFrame(coords_array, columns=coord_columns, index=idxes_array)
-        data_df['N_match'] = [len(v) for v in self.get_result_dict_reserve().values()]
+        data_df['N_match'] = self.reverse().get_counts()
         append_df = self.cat2.get_appending_data(retain_all_columns, retain_columns)
         if len(append_df.columns) > 0:
             data_df = pd.concat([data_df, append_df], axis=1)
@@ -86,7 +208,9 @@ class XMatchResult:
         '''Get a pandas dataframe with the information of the matching of the two catalogs in a serial manner.
 
         Each object from the first catalog with sufficient matches (as defined by min_match) appear first,
-        followed by their matched objects from the second catalog.
+        followed by their matched objects from the second catalog. If the separations are available, the
+        column 'Separation' gives the angular separation in degrees of each matched object from the object
+        it is matched to (NaN for the objects from the first catalog).
 
         Parameters
         ----------
@@ -107,35 +231,32 @@ class XMatchResult:
         pandas.DataFrame
             The serial dataframe of the two catalogs with the number of matches.
         '''
-        if reverse: # Create a new XMatchResult object with the reversed result_dict
-            reserve_result = self.__class__(self.cat2, self.cat1, self.tolerance, self.get_result_dict_reserve())
-            df = reserve_result.get_serial_dataframe(min_match, reverse=False, coord_columns=coord_columns,
+        if reverse:
+            df = self.reverse().get_serial_dataframe(min_match, reverse=False, coord_columns=coord_columns,
                                                      retain_all_columns=retain_all_columns,
                                                      retain_columns=retain_columns)
             df['is_cat1'] = ~df['is_cat1']
             return df
-        idxes1 = self.cat1.get_indexes()
         if len(self.cat1) == 0:
             return pd.DataFrame(columns=coord_columns)
-        idx_combine = []
-        is_df1 = []
-        n_match = []
-        for id in idxes1:
-            id2 = self.result_dict[id]
-            if len(id2) < min_match:
-                continue
-            idx_combine.append(id)
-            is_df1.append(True)
-            idx_combine.extend(id2)
-            is_df1 += [False] * len(id2)
-            n_match.append(len(id2))
-            n_match += [-1] * len(id2)
-        if len(idx_combine) == 0:
+        counts = self.get_counts()
+        selected = counts >= min_match
+        selected_idx = np.flatnonzero(selected)
+        if len(selected_idx) == 0:
             return pd.DataFrame(columns=coord_columns)
-        idx_combine = np.array(idx_combine, dtype=np.int64)
-        is_df1 = np.array(is_df1)
+        block_sizes = counts[selected_idx] + 1 # One row for the object in cat1 followed by its matches
+        block_starts = np.cumsum(block_sizes) - block_sizes
+        is_df1 = np.zeros(np.sum(block_sizes), dtype=bool)
+        is_df1[block_starts] = True
         n1 = len(self.cat1)
-        idx_combine[~is_df1] += n1
+        idx_combine = np.empty(len(is_df1), dtype=np.int64)
+        idx_combine[block_starts] = selected_idx
+        idx_combine[~is_df1] = self.indices[np.repeat(selected, counts)] + n1
+        n_match = np.full(len(is_df1), -1, dtype=np.int64)
+        n_match[block_starts] = counts[selected_idx]
+        if self.separations is not None:
+            separation = np.full(len(is_df1), np.nan)
+            separation[~is_df1] = self.separations[np.repeat(selected, counts)]
         idxes_array1 = self.cat1.get_indexes()
         idxes_array2 = self.cat2.get_indexes()
         df1 = pd.DataFrame(self.cat1.get_coordiantes(), columns=coord_columns, index=idxes_array1)
@@ -156,6 +277,8 @@ class XMatchResult:
                 raise KeyError(f"Columns {non_existent_columns} are not in the input DataFrame")
         data_df.insert(2, 'N_match', n_match)
         data_df.insert(3, 'is_cat1', is_df1)
+        if self.separations is not None:
+            data_df.insert(4, 'Separation', separation)
         return data_df
             
     def number_distribution(self) -> Counter:
@@ -166,7 +289,6 @@ class XMatchResult:
         collections.Counter
             The distribution of the number of matches for each object in the first catalog.
         """
-        Ns = [len(v) for v in self.get_result_dict().values()]
-        unique_counts = Counter(Ns)
+        unique_counts = Counter(self.get_counts().tolist())
         return unique_counts
         
\ No newline at end of file
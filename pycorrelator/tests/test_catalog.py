@@ -2,6 +2,7 @@ import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
+import tempfile
 import unittest
 import numpy as np
 import pandas as pd
@@ -30,6 +31,80 @@ class TestCatalog_RandomCheckInputOutput(unittest.TestCase):
             code_output = catalog.get_coordiantes()
             self.assertEqual(code_output.tolist(), expected_output.tolist())
 
+class TestCatalog_CoordinateBuffer(unittest.TestCase):
+
+    def test_contiguous_input_not_copied(self):
+        data = np.ascontiguousarray(np.vstack(generate_random_point(100)).T)
+        coordinates = Catalog(data).get_coordiantes()
+        self.assertTrue(np.shares_memory(coordinates, data))
+        self.assertFalse(coordinates.flags.writeable)
+        self.assertTrue(data.flags.writeable)
+
+    def test_cached(self):
+        ra, dec = generate_random_point(100)
+        for data in [np.vstack([ra, dec]).T, pd.DataFrame({'Ra': ra, 'Dec': dec})]:
+            catalog = Catalog(data)
+            self.assertTrue(np.shares_memory(catalog.get_coordiantes(), catalog.get_coordiantes()))
+            self.assertTrue(np.shares_memory(catalog.get_indexes(), catalog.get_indexes()))
+            self.assertTrue(catalog.get_coordiantes().flags.c_contiguous)
+            with self.assertRaises(ValueError):
+                catalog.get_indexes()[0] = 1
+
+class TestCatalog_UnitVectors(unittest.TestCase):
+
+    def setUp(self):
+        ra, dec = generate_random_point(1000, seed=0)
+        self.coordinates = np.vstack([ra, dec]).T
+        self.expected = np.vstack([np.cos(np.radians(dec)) * np.cos(np.radians(ra)),
+                                   np.cos(np.radians(dec)) * np.sin(np.radians(ra)), np.sin(np.radians(dec))]).T
+
+    def test_unit_vectors(self):
+        catalog = Catalog(pd.DataFrame({'Ra': self.coordinates[:, 0], 'Dec': self.coordinates[:, 1]}))
+        vectors = catalog.get_unit_vectors()
+        np.testing.assert_allclose(vectors, self.expected, atol=1e-15)
+        self.assertFalse(vectors.flags.writeable)
+        self.assertTrue(np.shares_memory(vectors, catalog.get_unit_vectors())) # Cached
+        np.testing.assert_allclose(catalog.get_cos_dec(), np.cos(np.radians(self.coordinates[:, 1])), atol=1e-15)
+
+    def test_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'catalog.npy')
+            np.save(path, self.coordinates)
+            catalog = Catalog(path, block_size=300)
+            vectors = catalog.get_unit_vectors()
+            self.assertIsInstance(vectors.base, np.memmap)
+            np.testing.assert_allclose(vectors, self.expected, atol=1e-15)
+            del catalog, vectors
+
+
+class TestCatalog_MemoryMapped(unittest.TestCase):
+
+    def setUp(self):
+        self.data = np.ascontiguousarray(np.vstack(generate_random_point(1000, seed=0)).T)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'catalog.npy')
+        np.save(self.path, self.data)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_npy_path(self):
+        catalog = Catalog(self.path)
+        self.assertTrue(catalog.out_of_core)
+        self.assertEqual(len(catalog), 1000)
+        np.testing.assert_array_equal(catalog.get_coordiantes(), self.data)
+
+    def test_iter_blocks(self):
+        catalog = Catalog(np.load(self.path, mmap_mode='r'), block_size=300)
+        blocks = list(catalog.iter_blocks())
+        self.assertEqual([start for start, _ in blocks], [0, 300, 600, 900])
+        np.testing.assert_array_equal(np.concatenate([block for _, block in blocks]), self.data)
+
+    def test_non_float64_memmap(self):
+        np.save(self.path, self.data.astype(np.float32))
+        with self.assertRaises(ValueError):
+            Catalog(self.path)
+
 class TestCatalog_ValidInput(unittest.TestCase):
 
     def setUp(self):
@@ -0,0 +1,71 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import tempfile
+import unittest
+from functools import partial
+import numpy as np
+from pycorrelator import xmatch, xmatch_iter, CatalogIndex, HEALPixChunkGenerator, AdaptiveHEALPixChunkGenerator
+from pycorrelator.utilities_spherical import generate_random_point
+
+
+class TestCatalogIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.reference = np.array(generate_random_point(5000, seed=0)).T
+        self.batch = np.array(generate_random_point(1000, seed=1)).T
+        self.tolerance = 1
+
+    def check_same_as_xmatch(self, index, tolerance):
+        expected = xmatch(self.batch, self.reference, tolerance, verbose=False)
+        result = xmatch(self.batch, index, tolerance, verbose=False)
+        np.testing.assert_array_equal(result.offsets, expected.offsets)
+        np.testing.assert_array_equal(result.indices, expected.indices)
+
+    def test_same_as_xmatch(self):
+        index = CatalogIndex(self.reference, max_tolerance=2)
+        for tolerance in [0.5, 1, 2]:
+            self.check_same_as_xmatch(index, tolerance)
+
+    def test_chunk_generators(self):
+        for chunk_gen in [partial(HEALPixChunkGenerator, order=2),
+                          partial(AdaptiveHEALPixChunkGenerator, max_objects=300)]:
+            index = CatalogIndex(self.reference, max_tolerance=1, chunk_generator=chunk_gen)
+            self.check_same_as_xmatch(index, self.tolerance)
+
+    def test_tolerance_too_large(self):
+        index = CatalogIndex(self.reference, max_tolerance=0.5)
+        with self.assertRaises(ValueError):
+            xmatch(self.batch, index, self.tolerance, verbose=False)
+
+    def test_xmatch_iter(self):
+        index = CatalogIndex(self.reference, max_tolerance=1)
+        expected = set(zip(*xmatch(self.batch, self.reference, self.tolerance, verbose=False).get_pairs()))
+        chunk_results = list(xmatch_iter(self.batch, index, self.tolerance, executor='thread', n_workers=2))
+        pairs = list(zip(np.concatenate([r[0] for r in chunk_results]),
+                         np.concatenate([r[1] for r in chunk_results])))
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertEqual(set(pairs), expected)
+
+    def test_nearest(self):
+        index = CatalogIndex(self.reference, max_tolerance=1)
+        expected = xmatch(self.batch, self.reference, self.tolerance, verbose=False, mode='nearest')
+        result = xmatch(self.batch, index, self.tolerance, verbose=False, mode='nearest')
+        for actual, desired in zip(result.get_nearest(), expected.get_nearest()):
+            np.testing.assert_array_equal(actual, desired)
+
+    def test_save_and_load(self):
+        index = CatalogIndex(self.reference, max_tolerance=1)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            index.save(tmpdir)
+            loaded = CatalogIndex.load(tmpdir)
+            self.assertTrue(loaded.catalog.out_of_core)
+            self.assertEqual(len(loaded), len(self.reference))
+            self.check_same_as_xmatch(loaded, self.tolerance)
+            self.check_same_as_xmatch(CatalogIndex.load(tmpdir, mmap=False), self.tolerance)
+            del loaded # Release the memory maps before the directory is removed
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
+import tempfile
 import unittest
 import numpy as np
 import pandas as pd
@@ -10,8 +11,77 @@ from pycorrelator import ChunkGeneratorByDenseGrid, ChunkGeneratorBySuperDenseGr
 from pycorrelator import GridChunkGenerator
 from pycorrelator import DisjointSet
 from pycorrelator.catalog import Catalog
+from pycorrelator.chunk import Chunk
 from pycorrelator.result_fof import FoFResult 
 from pycorrelator.fof import group_by_quadtree_chunk
+from pycorrelator import HEALPixChunkGenerator, AdaptiveHEALPixChunkGenerator
+from pycorrelator.chunk_generator_healpix import ang2pix_ring, pix2ang_ring, ang2pix_nest, pix2ang_nest
+from pycorrelator.utilities_spherical import generate_random_point, distances_to_target, radec_to_cartesian
+
+
+class TestChunk(unittest.TestCase):
+
+    def test_add_data(self):
+        chunk = Chunk(0, 10, 20)
+        chunk.add_boundary_data(np.array([[1., 2.]]), np.array([7]))
+        chunk.add_central_data(np.array([[3., 4.], [5., 6.]]), np.array([1, 2]))
+        np.testing.assert_array_equal(chunk.get_index(), [1, 2, 7])
+        np.testing.assert_array_equal(chunk.get_data(), [[3., 4.], [5., 6.], [1., 2.]])
+        np.testing.assert_array_equal(chunk.central_index, [1, 2])
+        np.testing.assert_array_equal(chunk.boundary_index, [7])
+        self.assertEqual(len(chunk), 3)
+
+    def test_owns_pairs(self):
+        chunk = Chunk(0, 10, 20)
+        chunk.set_data(np.zeros((4, 2)), np.array([5, 9, 2, 7]), n_central=2)
+        # (5, 9): 5 is central; (9, 2): 2 is a boundary object; (7, 5): 5 is central; (2, 7): 2 is a boundary object
+        owned = chunk.owns_pairs(np.array([0, 1, 3, 2]), np.array([1, 2, 0, 3]))
+        np.testing.assert_array_equal(owned, [True, False, True, False])
+
+    def test_rotation_cached(self):
+        chunk = Chunk(0, 30, -40)
+        matrix = chunk.get_rotation_matrix()
+        self.assertIs(chunk.get_rotation_matrix(), matrix)
+        rotated = chunk.rotate_to_center(radec_to_cartesian(np.array([30., 31.]), np.array([-40., -40.])))
+        np.testing.assert_allclose(rotated[0], [180, 0], atol=1e-10)
+        self.assertAlmostEqual(distances_to_target(rotated[0], rotated[1:])[0],
+                               distances_to_target(np.array([30, -40]), np.array([[31, -40]]))[0])
+
+    def test_vectors(self):
+        chunk = Chunk(0, 10, 20)
+        chunk.add_central_data(np.array([[3., 4.], [5., 6.]]), np.array([1, 2]))
+        np.testing.assert_allclose(chunk.get_vectors(), radec_to_cartesian(np.array([3., 5.]), np.array([4., 6.])))
+        np.testing.assert_array_equal(chunk.central_vectors, chunk.get_vectors()[:2])
+        with self.assertRaises(ValueError):
+            chunk.set_data(np.zeros((2, 2)), np.arange(2), 2, vectors=np.zeros((3, 3)))
+
+    def test_distribute_shares_buffer(self):
+        ra, dec = generate_random_point(2000, seed=0)
+        catalog = Catalog(np.vstack([ra, dec]).T)
+        chunks = ChunkGeneratorByGrid(margin=2).distribute(catalog)
+        base = chunks[0].get_data().base
+        for chunk in chunks:
+            self.assertIs(chunk.get_data().base, base)
+            self.assertTrue(np.shares_memory(chunk.get_data(), chunk.central_data))
+            np.testing.assert_array_equal(chunk.get_data(), catalog.get_coordiantes()[chunk.get_index()])
+            np.testing.assert_array_equal(chunk.get_vectors(), catalog.get_unit_vectors()[chunk.get_index()])
+        self.assertEqual(sum(chunk.n_central for chunk in chunks), 2000)
+
+
+class TestChunkGenerator_Streaming(unittest.TestCase):
+
+    def test_blocks_match_single_pass(self):
+        data = np.ascontiguousarray(np.vstack(generate_random_point(3000, seed=1)).T)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'catalog.npy')
+            np.save(path, data)
+            streamed = ChunkGeneratorByGrid(margin=2).distribute(Catalog(path, block_size=700))
+            expected = ChunkGeneratorByGrid(margin=2).distribute(Catalog(data))
+            self.assertIsInstance(streamed[0].get_data().base, np.memmap)
+            for chunk, expected_chunk in zip(streamed, expected):
+                self.assertEqual(chunk.n_central, expected_chunk.n_central)
+                np.testing.assert_array_equal(chunk.get_index(), expected_chunk.get_index())
+                np.testing.assert_array_equal(chunk.get_data(), expected_chunk.get_data())
 
 
 class TestChunkGeneratorByGrid_coor2id_central(unittest.TestCase):
@@ -52,7 +122,7 @@ class TestChunkGeneratorByGrid_coor2id_boundary(unittest.TestCase):
         dec = np.array([58, -58])  # Near the polar chunk boundaries
         chunk_gen = ChunkGeneratorByGrid(margin=2.5)
         expected_result = [[0], [1], [], [], [], [], [], [], [], [], [], [], [], []]
-        result = chunk_gen.coor2id_boundary(ra, dec)
+        result = [list(r) for r in chunk_gen.coor2id_boundary(ra, dec)]
         self.assertEqual(result, expected_result)
 
     def test_middle_chunks_boundaries(self):
@@ -61,17 +131,149 @@ class TestChunkGeneratorByGrid_coor2id_boundary(unittest.TestCase):
         dec = np.array([58.9, 58.9, 58.9, 58.9, 58.9, 58.9])
         chunk_gen = ChunkGeneratorByGrid(margin=1)
         expected_result = [[], [], [1], [2], [3], [4], [5], [0], [], [], [], [], [], []]
-        result = chunk_gen.coor2id_boundary(ra, dec)
+        result = [list(r) for r in chunk_gen.coor2id_boundary(ra, dec)]
         self.assertEqual(result, expected_result)
 
+    def test_ra_margin_widens_with_dec(self):
+        # 1.5 degrees of RA from the meridian RA = 60 are only 0.77 degrees of arc at Dec = 59
+        ra, dec = np.array([61.5, 61.5]), np.array([59, 0])
+        for chunk_gen in [ChunkGeneratorByGrid(margin=1), GridChunkGenerator(margin=1)]:
+            if chunk_gen.symmetric_layout is None:
+                chunk_gen.set_symmetric_ring_chunk(60, [6, 6])
+                chunk_gen.symmetric_layout = None # Use the generic path
+            result = [list(r) for r in chunk_gen.coor2id_boundary(ra, dec)]
+            self.assertEqual(result[2], [0])
+
     def test_objects_outside_tolerance_boundary(self):
         ra = np.array([4])
         dec = np.array([56])  # Outside the tolerance for polar chunk boundaries
         chunk_gen = ChunkGeneratorByGrid(margin=1.5)
         expected_result = [[], [], [], [], [], [], [], [], [], [], [], [], [], []]
-        result = chunk_gen.coor2id_boundary(ra, dec)
+        result = [list(r) for r in chunk_gen.coor2id_boundary(ra, dec)]
         self.assertEqual(result, expected_result)
 
+class TestGridChunkGenerator_SymmetricLayout(unittest.TestCase):
+
+    def assert_same_as_generic(self, chunk_gen, ra, dec):
+        central = chunk_gen.coor2id_central(ra, dec)
+        boundary = chunk_gen.coor2id_boundary(ra, dec)
+        chunk_gen.symmetric_layout = None # Fall back to checking every config
+        np.testing.assert_array_equal(central, chunk_gen.coor2id_central(ra, dec))
+        expected_boundary = chunk_gen.coor2id_boundary(ra, dec)
+        self.assertEqual(len(boundary), len(expected_boundary))
+        for result, expected in zip(boundary, expected_boundary):
+            np.testing.assert_array_equal(result, expected)
+
+    def test_grids(self):
+        ra, dec = generate_random_point(20000, seed=0)
+        for chunk_gen_class in [ChunkGeneratorByGrid, ChunkGeneratorByDenseGrid, ChunkGeneratorBySuperDenseGrid]:
+            for margin in [0.05, 2, 40]:
+                self.assert_same_as_generic(chunk_gen_class(margin=margin), ra, dec)
+
+    def test_wraparound(self):
+        ra = np.array([0.01, 359.99, 0.5, 359.5])
+        dec = np.array([10, -10, 59.5, -59.5])
+        self.assert_same_as_generic(ChunkGeneratorByGrid(margin=1), ra, dec)
+
+
+class TestHEALPixChunkGenerator(unittest.TestCase):
+
+    def test_pixel_centers_round_trip(self):
+        for order in range(4):
+            nside = 2**order
+            pix = np.arange(12 * nside**2)
+            ra, dec = pix2ang_ring(nside, pix)
+            np.testing.assert_array_equal(ang2pix_ring(nside, ra, dec), pix)
+
+    def test_equal_area(self):
+        ra, dec = generate_random_point(480000, seed=0)
+        chunk_gen = HEALPixChunkGenerator(margin=0, order=1)
+        counts = np.bincount(chunk_gen.coor2id_central(ra, dec), minlength=48)
+        self.assertEqual(len(chunk_gen.chunks), 48)
+        self.assertLess(np.max(np.abs(counts - 10000)), 500)
+
+    def test_poles_and_wraparound(self):
+        chunk_gen = HEALPixChunkGenerator(margin=0, order=2)
+        ids = chunk_gen.coor2id_central(np.array([0, 360, 0, 123]), np.array([0, 0, 90, -90]))
+        self.assertEqual(ids[0], ids[1])
+        self.assertTrue(np.all((ids >= 0) & (ids < 192)))
+
+    def test_boundary_contains_neighbours(self):
+        # Every pair closer than the margin must share at least one chunk
+        ra, dec = generate_random_point(5000, seed=1)
+        margin = 3
+        chunk_gen = HEALPixChunkGenerator(margin=margin, order=2)
+        central = chunk_gen.coor2id_central(ra, dec)
+        members = [set(np.flatnonzero(central == i)) for i in range(len(chunk_gen.chunks))]
+        for i, boundary in enumerate(chunk_gen.coor2id_boundary(ra, dec)):
+            self.assertTrue(members[i].isdisjoint(boundary))
+            members[i].update(boundary)
+        for k in range(0, 5000, 50):
+            close = np.flatnonzero(distances_to_target((ra[k], dec[k]), np.vstack([ra, dec]).T) < margin)
+            self.assertTrue(set(close) <= members[central[k]])
+
+
+class TestAdaptiveHEALPixChunkGenerator(unittest.TestCase):
+
+    def setUp(self):
+        # A uniform background with a crowded cluster around (10, 20)
+        rng = np.random.default_rng(0)
+        ra, dec = generate_random_point(5000, seed=2)
+        self.ra = np.concatenate([ra, 10 + rng.normal(0, 0.5, 5000)])
+        self.dec = np.concatenate([dec, 20 + rng.normal(0, 0.5, 5000)])
+        self.catalog = Catalog(np.vstack([self.ra, self.dec]).T)
+
+    def test_nested_pixel_centers(self):
+        for order in range(4):
+            pix = np.arange(12 * 4**order)
+            ra, dec = pix2ang_nest(order, pix)
+            np.testing.assert_array_equal(ang2pix_nest(order, ra, dec), pix)
+            # Same pixel centers as the RING scheme
+            ring_ra, ring_dec = pix2ang_ring(2**order, pix)
+            self.assertEqual(set(zip(np.round(ra, 8), np.round(dec, 8))),
+                             set(zip(np.round(ring_ra, 8), np.round(ring_dec, 8))))
+
+    def test_nested_children(self):
+        ra, dec = generate_random_point(10000, seed=3)
+        np.testing.assert_array_equal(ang2pix_nest(5, ra, dec) >> 4, ang2pix_nest(3, ra, dec))
+
+    def test_max_objects(self):
+        chunk_gen = AdaptiveHEALPixChunkGenerator(margin=0.01, max_objects=500)
+        chunk_gen.plan([self.catalog])
+        chunk_gen.distribute(self.catalog)
+        occupancy = chunk_gen.get_occupancy()
+        self.assertEqual(np.sum(occupancy), len(self.ra))
+        self.assertLessEqual(np.max(occupancy), 500)
+        self.assertGreater(np.max(chunk_gen.leaf_order), 1)
+        self.assertIn("chunks with", chunk_gen.describe_occupancy())
+
+    def test_stops_at_margin(self):
+        # The chunks are not split below the margin, even if they are crowded
+        chunk_gen = AdaptiveHEALPixChunkGenerator(margin=10, max_objects=10)
+        chunk_gen.plan([self.catalog])
+        self.assertTrue(np.all(chunk_gen.leaf_order <= 2))
+
+    def test_not_planned(self):
+        chunk_gen = AdaptiveHEALPixChunkGenerator(margin=1)
+        with self.assertRaises(RuntimeError):
+            chunk_gen.distribute(self.catalog)
+
+    def test_boundary_contains_neighbours(self):
+        margin = 0.2
+        chunk_gen = AdaptiveHEALPixChunkGenerator(margin=margin, max_objects=200)
+        chunk_gen.plan([self.catalog])
+        central = chunk_gen.coor2id_central(self.ra, self.dec)
+        self.assertTrue(np.all(central >= 0))
+        members = [set(np.flatnonzero(central == i)) for i in range(len(chunk_gen.chunks))]
+        for i, boundary in enumerate(chunk_gen.coor2id_boundary(self.ra, self.dec)):
+            self.assertTrue(members[i].isdisjoint(boundary))
+            members[i].update(boundary)
+        coordinates = np.vstack([self.ra, self.dec]).T
+        for k in range(0, len(self.ra), 50):
+            close = np.flatnonzero(distances_to_target((self.ra[k], self.dec[k]), coordinates) < margin)
+            self.assertTrue(set(close) <= members[central[k]])
+
+
 class TestChunkIntegratingFoF(unittest.TestCase):
 
     def group_by_quadtree_scipy(self, objects_df: pd.DataFrame, tolerance, chunk_gen):
@@ -80,9 +282,8 @@ class TestChunkIntegratingFoF(unittest.TestCase):
         catalog = Catalog(objects_df)
         chunk_gen.distribute(catalog)
         for chunk in chunk_gen.chunks:
-            groups_index = group_by_quadtree_chunk((chunk, tolerance))
-            for i, j in groups_index:
-                ds.union(i, j)
+            groups_index, _ = group_by_quadtree_chunk((chunk, tolerance))
+            ds.union_pairs(groups_index[:, 0], groups_index[:, 1])
         groups = ds.get_groups()
         return FoFResult(catalog, tolerance, groups)
 
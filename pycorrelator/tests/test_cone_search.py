@@ -0,0 +1,61 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import unittest
+from functools import partial
+import numpy as np
+from pycorrelator import ConeSearcher, CatalogIndex, AdaptiveHEALPixChunkGenerator
+from pycorrelator.utilities_spherical import angular_separation, generate_random_point
+
+
+class TestConeSearcher(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = np.array(generate_random_point(5000, seed=0)).T
+        self.centers = np.array(generate_random_point(300, seed=1)).T
+
+    def check_brute_force(self, result, radius):
+        radius = np.broadcast_to(radius, (len(self.centers),))
+        for i, (ra, dec) in enumerate(self.centers):
+            distance = angular_separation(ra, dec, self.catalog[:, 0], self.catalog[:, 1])
+            expected = np.flatnonzero(distance <= radius[i])
+            np.testing.assert_array_equal(result.get_matches(i), expected)
+            separations = result.get_separations()[result.offsets[i]:result.offsets[i + 1]]
+            np.testing.assert_allclose(separations, distance[expected], atol=1e-8)
+
+    def test_fixed_radius(self):
+        searcher = ConeSearcher(self.catalog, max_radius=2)
+        self.check_brute_force(searcher.search(self.centers[:, 0], self.centers[:, 1], 2), 2)
+
+    def test_per_query_radius(self):
+        # Some of the cones are larger than max_radius and are answered by several chunks
+        radius = np.random.default_rng(2).uniform(0, 8, len(self.centers))
+        for chunk_gen in [None, partial(AdaptiveHEALPixChunkGenerator, max_objects=300)]:
+            kwargs = {} if chunk_gen is None else {'chunk_generator': chunk_gen}
+            searcher = ConeSearcher(self.catalog, max_radius=2, **kwargs)
+            result = searcher.search(self.centers[:, 0], self.centers[:, 1], radius)
+            self.check_brute_force(result, radius)
+
+    def test_from_index(self):
+        searcher = ConeSearcher(CatalogIndex(self.catalog, max_tolerance=1))
+        self.assertEqual(searcher.max_radius, 2)
+        result = searcher.search(self.centers[:, 0], self.centers[:, 1], 1.5, executor='thread', n_workers=2)
+        self.check_brute_force(result, 1.5)
+
+    def test_single_query(self):
+        searcher = ConeSearcher(self.catalog, max_radius=2)
+        result = searcher.search(*self.centers[0], 3)
+        distance = angular_separation(*self.centers[0], self.catalog[:, 0], self.catalog[:, 1])
+        np.testing.assert_array_equal(result.get_matches(0), np.flatnonzero(distance <= 3))
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            ConeSearcher(self.catalog)
+        searcher = ConeSearcher(self.catalog, max_radius=2)
+        with self.assertRaises(ValueError):
+            searcher.search(self.centers[:, 0], self.centers[:, 1], -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import unittest
+import numpy as np
+from pycorrelator import DisjointSet
+
+
+class TestDisjointSet(unittest.TestCase):
+
+    def test_union_and_find(self):
+        ds = DisjointSet(6)
+        ds.union(4, 5)
+        ds.union(1, 4)
+        ds.union(2, 3)
+        self.assertEqual(ds.find(5), 1)
+        self.assertEqual(ds.find(3), 2)
+        self.assertEqual(ds.find(0), 0)
+
+    def test_long_chain(self):
+        # A chain longer than the recursion limit
+        n = 100000
+        ds = DisjointSet(n)
+        for i in range(n - 1, 0, -1):
+            ds.parent[i] = i - 1
+        self.assertEqual(ds.find(n - 1), 0)
+        self.assertEqual(ds.parent[n - 1], 0)
+
+    def test_union_pairs_matches_union(self):
+        rng = np.random.default_rng(0)
+        n = 2000
+        i_array = rng.integers(0, n, 1500)
+        j_array = rng.integers(0, n, 1500)
+        ds_scalar = DisjointSet(n)
+        for i, j in zip(i_array, j_array):
+            ds_scalar.union(i, j)
+        ds_bulk = DisjointSet(n)
+        ds_bulk.union_pairs(i_array, j_array)
+        np.testing.assert_array_equal(ds_bulk.labels(), ds_scalar.labels())
+
+    def test_labels_and_groups(self):
+        ds = DisjointSet(7)
+        ds.union_pairs(np.array([6, 3, 5]), np.array([3, 1, 0]))
+        np.testing.assert_array_equal(ds.labels(), [0, 1, 2, 1, 3, 0, 1])
+        groups = [list(g) for g in ds.get_groups()]
+        self.assertEqual(groups, [[0, 5], [1, 3, 6], [2], [4]])
+
+    def test_empty(self):
+        ds = DisjointSet(0)
+        ds.union_pairs(np.array([], dtype=int), np.array([], dtype=int))
+        self.assertEqual(len(ds.labels()), 0)
+        self.assertEqual(ds.get_groups(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import unittest
+import numpy as np
+import pandas as pd
+from pycorrelator import remove_duplicates, fof
+from pycorrelator.duplicates import select_group_members
+from pycorrelator.utilities_spherical import generate_random_point
+
+
+class TestRemoveDuplicates(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = pd.DataFrame([[80.894, 41.269, 1200], [120.689, -41.269, 1500],
+                                     [10.689, -41.269, 3600], [10.688, -41.270, 300],
+                                     [10.689, -41.270, 1800], [10.690, -41.269, 2400],
+                                     [120.690, -41.270, 900], [10.689, -41.269, 2700]],
+                                    columns=['ra', 'dec', 'exp_time'])
+        self.tolerance = 0.01
+
+    def test_keep_first(self):
+        df = remove_duplicates(self.catalog, self.tolerance, verbose=False)
+        self.assertListEqual(list(df.index), [0, 1, 2])
+        self.assertListEqual(list(df.columns), ['ra', 'dec', 'exp_time'])
+
+    def test_keep_last(self):
+        df = remove_duplicates(self.catalog, self.tolerance, keep='last', verbose=False)
+        self.assertListEqual(list(df.index), [0, 6, 7])
+
+    def test_keep_column(self):
+        df = remove_duplicates(self.catalog, self.tolerance, keep='exp_time', verbose=False)
+        self.assertListEqual(list(df.index), [0, 1, 2])
+        df = remove_duplicates(self.catalog, self.tolerance, keep=-self.catalog['exp_time'].values, verbose=False)
+        self.assertListEqual(list(df.index), [0, 3, 6])
+
+    def test_array_input(self):
+        coordinates = self.catalog[['ra', 'dec']].values
+        unique = remove_duplicates(coordinates, self.tolerance, keep='last', verbose=False)
+        np.testing.assert_array_equal(unique, coordinates[[0, 6, 7]])
+
+    def test_same_groups_as_fof(self):
+        ra, dec = generate_random_point(3000, seed=0)
+        catalog = np.array([ra, dec]).T
+        unique = remove_duplicates(catalog, 2, verbose=False)
+        groups = fof(catalog, 2).get_group_coordinates()
+        self.assertEqual(len(unique), len(groups))
+
+    def test_invalid_keep(self):
+        with self.assertRaises(KeyError):
+            remove_duplicates(self.catalog, self.tolerance, keep='mag', verbose=False)
+        with self.assertRaises(ValueError):
+            remove_duplicates(self.catalog, self.tolerance, keep=np.arange(3), verbose=False)
+
+    def test_select_group_members(self):
+        labels = np.array([0, 1, 0, 2, 1, 0])
+        ranking = np.array([1, 5, 3, 0, 5, 3])
+        np.testing.assert_array_equal(select_group_members(labels, ranking), [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,12 +2,17 @@ import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
+import tempfile
 import unittest
+from functools import partial
 import numpy as np
 from numpy.typing import NDArray
-from pycorrelator import point_offset, generate_random_point
+from pycorrelator import point_offset, generate_random_point, angular_separation
 # from pycorrelator import group_by_disjoint_set, group_by_DFS
-from pycorrelator import fof
+from pycorrelator import fof, fof_multi, HEALPixChunkGenerator, AdaptiveHEALPixChunkGenerator, ChunkGeneratorBySuperDenseGrid
+from pycorrelator.fof import FOF_ENGINES, select_fof_engine
+from pycorrelator.result_fof import FoFResult
+from pycorrelator.catalog import Catalog
 
 
 def generate_celestial_grid(**kwargs) -> list[tuple[float, float]]:
@@ -149,7 +154,7 @@ class TestCelestialGrouping_RandomGrid(unittest.TestCase):
     #     self.assertEqual(len(problematic_groups), 0, f"Failed groups: {problematic_groups}")
 
     def test_group_by_quadtree(self):
-        output_groups = fof(self.all_points, self.tolerance).get_coordinates()
+        output_groups = fof(self.all_points, self.tolerance, engine='rotate').get_coordinates()
         problematic_groups = check_group_match(self.expected_groups, output_groups)
         self.assertEqual(len(problematic_groups), 0, f"Failed groups: {problematic_groups}")
 
@@ -189,7 +194,7 @@ class TestCelestialGrouping(unittest.TestCase):
         grid = generate_celestial_grid(ra_step=1, dec_step=1, dec_bounds=70)
         tolerance = 0.1
         expected_groups, all_points = create_groups_from_grid(grid, tolerance, fraction=0.1, ring_radius=(0.9999, 1.0))
-        output_groups = fof(all_points, tolerance).get_coordinates()
+        output_groups = fof(all_points, tolerance, engine='rotate').get_coordinates()
         problematic_groups = check_group_match(expected_groups, output_groups)
         self.assertEqual(len(problematic_groups), 0, f"Failed groups: {problematic_groups}")
 
@@ -197,7 +202,7 @@ class TestCelestialGrouping(unittest.TestCase):
         grid = generate_celestial_grid(ra_step=60, dec_step=5, dec_bounds=60)
         tolerance = 0.2
         expected_groups, all_points = create_groups_from_grid(grid, tolerance, fraction=1)
-        output_groups = fof(all_points, tolerance).get_coordinates()
+        output_groups = fof(all_points, tolerance, engine='rotate').get_coordinates()
         problematic_groups = check_group_match(expected_groups, output_groups)
         self.assertEqual(len(problematic_groups), 0, f"Failed groups: {problematic_groups}")
 
@@ -211,9 +216,41 @@ class TestCelestialGrouping(unittest.TestCase):
         grid = generate_celestial_grid(ra_step=2, dec_step=5, dec_bounds=dec_range, ra_offset=0)
         tolerance = 2
         all_points = np.array(grid)
-        output_groups = fof(all_points, tolerance).get_coordinates()
+        output_groups = fof(all_points, tolerance, engine='rotate').get_coordinates()
         self.assertEqual(len(output_groups), (dec_range//5)*2+1, f"Number of groups obtained: {len(output_groups)}")
 
+    def test_chord_long_chain(self):
+        dec_range = 15
+        grid = generate_celestial_grid(ra_step=2, dec_step=5, dec_bounds=dec_range, ra_offset=0)
+        tolerance = 2
+        all_points = np.array(grid)
+        output_groups = fof(all_points, tolerance, engine='chord').get_coordinates()
+        self.assertEqual(len(output_groups), (dec_range//5)*2+1, f"Number of groups obtained: {len(output_groups)}")
+
+    def test_chord_grid_boundary(self):
+        grid = generate_celestial_grid(ra_step=60, dec_step=5, dec_bounds=60)
+        tolerance = 0.2
+        expected_groups, all_points = create_groups_from_grid(grid, tolerance, fraction=1)
+        output_groups = fof(all_points, tolerance, engine='chord').get_coordinates()
+        problematic_groups = check_group_match(expected_groups, output_groups)
+        self.assertEqual(len(problematic_groups), 0, f"Failed groups: {problematic_groups}")
+
+    def test_global_long_chain(self):
+        dec_range = 15
+        grid = generate_celestial_grid(ra_step=2, dec_step=5, dec_bounds=dec_range, ra_offset=0)
+        tolerance = 2
+        all_points = np.array(grid)
+        output_groups = fof(all_points, tolerance, engine='global').get_coordinates()
+        self.assertEqual(len(output_groups), (dec_range//5)*2+1, f"Number of groups obtained: {len(output_groups)}")
+
+    def test_global_grid_boundary(self):
+        grid = generate_celestial_grid(ra_step=60, dec_step=5, dec_bounds=60)
+        tolerance = 0.2
+        expected_groups, all_points = create_groups_from_grid(grid, tolerance, fraction=1)
+        output_groups = fof(all_points, tolerance, engine='global').get_coordinates()
+        problematic_groups = check_group_match(expected_groups, output_groups)
+        self.assertEqual(len(problematic_groups), 0, f"Failed groups: {problematic_groups}")
+
     def test_qt_random_walk(self):
         ra_now = np.random.uniform(0, 360)
         dec_now = np.random.uniform(-90, 90)
@@ -224,7 +261,7 @@ class TestCelestialGrouping(unittest.TestCase):
             all_points.append(point_now)
         all_points = np.array(all_points)
         tolerance = 1
-        output_groups = fof(all_points, tolerance).get_coordinates()
+        output_groups = fof(all_points, tolerance, engine='rotate').get_coordinates()
         self.assertEqual(len(output_groups), 1, f"Number of groups obtained: {len(output_groups)}")
 
     def test_qt_random_tree(self):
@@ -238,9 +275,151 @@ class TestCelestialGrouping(unittest.TestCase):
             all_points.append(point_now)
         all_points = np.array(all_points)
         tolerance = 1
-        output_groups = fof(all_points, tolerance).get_coordinates()
+        output_groups = fof(all_points, tolerance, engine='rotate').get_coordinates()
         self.assertEqual(len(output_groups), 1, f"Number of groups obtained: {len(output_groups)}")
 
+    def test_group_coordinates_across_ra_zero(self):
+        catalog = np.array([[359.999, 10.0], [0.001, 10.0], [180.0, 89.999], [0.0, 89.999]])
+        centers = fof(catalog, 0.01).get_group_coordinates()
+        self.assertEqual(len(centers), 2)
+        for center in centers:
+            self.assertLess(angular_separation(center[0], center[1], 0.0, 10.0 if center[1] < 45 else 90.0), 1e-6)
+
+
+class TestCelestialGrouping_Ownership(unittest.TestCase):
+
+    def test_pairs_found_once(self):
+        ra, dec = generate_random_point(3000, seed=3)
+        catalog = Catalog(np.array([ra, dec]).T)
+        distance = angular_separation(ra[:, None], dec[:, None], ra[None, :], dec[None, :])
+        i, j = np.nonzero(np.triu(distance <= 2, k=1))
+        expected = set(zip(i, j))
+        for engine in FOF_ENGINES:
+            cg = ChunkGeneratorBySuperDenseGrid(margin=4)
+            cg.distribute(catalog)
+            pairs = np.concatenate([FOF_ENGINES[engine]((chunk, 2))[0] for chunk in cg.chunks])
+            pairs = np.sort(pairs, axis=1)
+            self.assertEqual(len(pairs), len(set(map(tuple, pairs))))
+            self.assertEqual(set(map(tuple, pairs)), expected)
+
+
+class TestCelestialGrouping_Global(unittest.TestCase):
+
+    def test_same_as_chunks(self):
+        ra, dec = generate_random_point(5000, seed=1)
+        all_points = np.array([ra, dec]).T
+        expected = fof(all_points, 1.5, engine='rotate').result_list
+        result = fof(all_points, 1.5, engine='global').result_list
+        self.assertEqual(len(result), len(expected))
+        for group, expected_group in zip(result, expected):
+            np.testing.assert_array_equal(group, expected_group)
+
+    def test_select_engine(self):
+        catalog = Catalog(np.array([[10., 20.], [30., 40.]]))
+        self.assertEqual(select_fof_engine(catalog), 'global')
+        self.assertEqual(select_fof_engine(catalog, n_workers=1), 'global')
+        self.assertEqual(select_fof_engine(catalog, executor='thread'), 'rotate')
+        self.assertEqual(select_fof_engine(catalog, n_workers=4), 'rotate')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'catalog.npy')
+            np.save(path, catalog.get_coordiantes())
+            self.assertEqual(select_fof_engine(Catalog(path)), 'rotate')
+
+    def test_invalid_engine(self):
+        with self.assertRaises(ValueError):
+            fof(np.array([[10., 20.]]), 1, engine='dfs')
+
+    def test_from_labels(self):
+        catalog = Catalog(np.array([[0., 0.]] * 6))
+        result = FoFResult.from_labels(catalog, 1, np.array([7, 3, 7, 0, 3, 5]))
+        self.assertEqual([list(g) for g in result.result_list], [[0, 2], [1, 4], [3], [5]])
+        self.assertEqual(FoFResult.from_labels(Catalog(np.empty((0, 2))), 1, []).result_list, [])
+        with self.assertRaises(ValueError):
+            FoFResult.from_labels(catalog, 1, np.zeros(5))
+
+
+class TestCelestialGrouping_Multi(unittest.TestCase):
+
+    def setUp(self):
+        ra, dec = generate_random_point(5000, seed=2)
+        self.all_points = np.array([ra, dec]).T
+        self.tolerances = [2, 0.5, 1, 1.5]
+
+    def test_same_as_fof(self):
+        for engine in ['global', 'rotate', 'chord']:
+            hierarchy = fof_multi(self.all_points, self.tolerances, engine=engine)
+            np.testing.assert_array_equal(hierarchy.tolerances, sorted(self.tolerances))
+            for tolerance in self.tolerances:
+                expected = fof(self.all_points, tolerance, engine=engine).result_list
+                result = hierarchy.get_result(tolerance).result_list
+                self.assertEqual(len(result), len(expected))
+                for group, expected_group in zip(result, expected):
+                    np.testing.assert_array_equal(group, expected_group)
+
+    def test_merge_tree(self):
+        hierarchy = fof_multi(self.all_points, self.tolerances)
+        labels = hierarchy.get_labels()
+        self.assertEqual(labels.shape, (4, 5000))
+        counts = hierarchy.get_group_counts()
+        self.assertTrue(np.all(np.diff(counts) <= 0))
+        tree = hierarchy.get_merge_tree()
+        self.assertEqual(len(tree), 3)
+        for level, parents in enumerate(tree):
+            self.assertEqual(len(parents), counts[level])
+            # Every object is in the parent group of its group
+            np.testing.assert_array_equal(parents[labels[level]], labels[level + 1])
+
+    def test_invalid_tolerances(self):
+        with self.assertRaises(ValueError):
+            fof_multi(self.all_points, [])
+        with self.assertRaises(ValueError):
+            fof_multi(self.all_points, [0, 1])
+        with self.assertRaises(ValueError):
+            fof_multi(self.all_points, [1, 2]).get_result(1.5)
+
+
+class TestCelestialGrouping_Parallel(unittest.TestCase):
+
+    def setUp(self):
+        ra, dec = generate_random_point(5000, seed=0)
+        self.all_points = np.array([ra, dec]).T
+        self.tolerance = 1.5
+        self.expected_groups = fof(self.all_points, self.tolerance).get_coordinates()
+
+    def test_thread_backend(self):
+        output_groups = fof(self.all_points, self.tolerance, executor='thread', n_workers=4).get_coordinates()
+        self.assertEqual(output_groups, self.expected_groups)
+
+    def test_process_backend(self):
+        output_groups = fof(self.all_points, self.tolerance, executor='process', n_workers=2).get_coordinates()
+        self.assertEqual(output_groups, self.expected_groups)
+
+    def test_chord_engine(self):
+        output_groups = fof(self.all_points, self.tolerance, engine='chord').get_coordinates()
+        self.assertEqual(output_groups, self.expected_groups)
+
+    def test_healpix_chunks(self):
+        chunk_generator = partial(HEALPixChunkGenerator, order=1)
+        output_groups = fof(self.all_points, self.tolerance, chunk_generator=chunk_generator,
+                            engine='rotate').get_coordinates()
+        self.assertEqual(output_groups, self.expected_groups)
+
+    def test_adaptive_healpix_chunks(self):
+        chunk_generator = partial(AdaptiveHEALPixChunkGenerator, max_objects=200, base_order=0)
+        output_groups = fof(self.all_points, self.tolerance, chunk_generator=chunk_generator,
+                            engine='rotate').get_coordinates()
+        self.assertEqual(output_groups, self.expected_groups)
+
+    def test_memory_mapped_catalog(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'catalog.npy')
+            np.save(path, self.all_points)
+            chunk_generator = partial(AdaptiveHEALPixChunkGenerator, max_objects=200, base_order=0)
+            for chunk_gen in [None, chunk_generator]:
+                kwargs = {} if chunk_gen is None else {'chunk_generator': chunk_gen}
+                output_groups = fof(Catalog(path, block_size=700), self.tolerance, **kwargs).get_coordinates()
+                self.assertEqual(output_groups, self.expected_groups)
+
 
 def print_format_group(groups):
     """
@@ -6,7 +6,7 @@ import unittest
 import numpy as np
 import pandas as pd
 from numpy.typing import NDArray
-from pycorrelator import xmatch
+from pycorrelator import xmatch, XMatchResult, great_circle_distance, point_offset
 from pycorrelator.catalog import Catalog
 
 class TestXMatchResult_Methods(unittest.TestCase):
@@ -42,6 +42,63 @@ class TestXMatchResult_Methods(unittest.TestCase):
             for j in range(i // self.n1 * self.n2, (i // self.n1 + 1) * self.n2):
                 self.assertIn(j, result_dict[i])
 
+    def test_csr_storage(self):
+        result = xmatch(self.coords1, self.coords2, 2)
+        self.assertEqual(len(result.offsets), self.coords1.shape[0] + 1)
+        np.testing.assert_array_equal(result.get_counts(), np.full(self.coords1.shape[0], self.n2))
+        for i in range(self.coords1.shape[0]):
+            expected = np.arange(i // self.n1 * self.n2, (i // self.n1 + 1) * self.n2)
+            np.testing.assert_array_equal(result.get_matches(i), expected)
+        idx1, idx2 = result.get_pairs()
+        self.assertEqual(len(idx1), self.coords1.shape[0] * self.n2)
+        np.testing.assert_array_equal(idx1 // self.n1, idx2 // self.n2)
+
+    def test_reverse(self):
+        result = xmatch(self.coords1, self.coords2, 2)
+        reverse = result.reverse()
+        self.assertIs(reverse.cat1, result.cat2)
+        np.testing.assert_array_equal(reverse.get_counts(), np.full(self.coords2.shape[0], self.n1))
+        self.assertIs(reverse.reverse(), result)
+        result_dict_reserve = result.get_result_dict_reserve()
+        for j in range(self.coords2.shape[0]):
+            np.testing.assert_array_equal(result_dict_reserve[j], reverse.get_matches(j))
+
+    def test_from_pairs(self):
+        cat1, cat2 = Catalog(self.coords1), Catalog(self.coords2)
+        result = XMatchResult.from_pairs(cat1, cat2, 2, np.array([3, 0, 3, 1]), np.array([5, 2, 1, 2]))
+        np.testing.assert_array_equal(result.offsets[:5], [0, 1, 2, 2, 4])
+        np.testing.assert_array_equal(result.indices, [2, 2, 1, 5])
+        self.assertEqual(result.number_distribution()[0], self.coords1.shape[0] - 3)
+
+    def test_get_separations(self):
+        result = xmatch(self.coords1, self.coords2, 2)
+        idx1, idx2 = result.get_pairs()
+        expected = [great_circle_distance(*self.coords1[i], *self.coords2[j]) for i, j in zip(idx1, idx2)]
+        np.testing.assert_allclose(result.get_separations(), expected, atol=1e-10)
+        reverse_idx2, reverse_idx1 = result.reverse().get_pairs()
+        expected = [great_circle_distance(*self.coords1[i], *self.coords2[j]) for i, j in zip(reverse_idx1, reverse_idx2)]
+        np.testing.assert_allclose(result.reverse().get_separations(), expected, atol=1e-10)
+
+    def test_get_position_angles(self):
+        cat1 = np.array([[10, 20], [10, 20], [10, 20], [350, -60]])
+        cat2 = np.array([point_offset(tuple(cat1[i]), 0.5, theta) for i, theta in enumerate([0, 90, 200, 300])])
+        result = xmatch(cat1, cat2, 1, verbose=False)
+        idx1, idx2 = result.get_pairs()
+        expected = np.array([0, 90, 200, 300])[idx2]
+        is_own = idx1 == idx2 # The three points around (10, 20) match each other's offsets too
+        np.testing.assert_allclose(result.get_position_angles()[is_own], expected[is_own], atol=1e-8)
+
+    def test_get_nearest(self):
+        cat1, cat2 = Catalog(self.coords1), Catalog(self.coords2)
+        result = XMatchResult.from_pairs(cat1, cat2, 2, np.array([3, 0, 3, 1, 3]), np.array([5, 2, 1, 2, 4]),
+                                         np.array([0.5, 0.1, 0.2, 0.3, 0.2]))
+        nearest, separation = result.get_nearest()
+        np.testing.assert_array_equal(nearest[:4], [2, 2, -1, 1])
+        np.testing.assert_array_equal(separation[:4], [0.1, 0.3, np.nan, 0.2])
+        self.assertTrue(np.all(nearest[4:] == -1))
+        with self.assertRaises(ValueError):
+            XMatchResult.from_pairs(cat1, cat2, 2, np.array([0]), np.array([1])).get_nearest()
+
     def test_get_dataframe1(self):
         result = xmatch(self.coords1, self.coords2, 2)
         columns = ['Ra', 'Deccc']
@@ -116,26 +173,29 @@ class TestXMatchResult_Methods(unittest.TestCase):
         columns = ['Ra', 'Deccc']
         df = result.get_serial_dataframe(coord_columns=columns)
         self.assertEqual(len(df), self.coords1.shape[0] + self.coords2.shape[0] * self.n1)
-        self.assertListEqual(list(df.columns), columns + ['N_match', 'is_cat1'])
+        self.assertListEqual(list(df.columns), columns + ['N_match', 'is_cat1', 'Separation'])
         for i in range(self.coords1.shape[0]):
             idx = i * (self.n2 + 1)
             self.assertEqual(df.iloc[idx]['N_match'], self.n2)
             self.assertEqual(df.iloc[idx]['is_cat1'], True)
             self.assertAlmostEqual(df.iloc[idx][columns[0]], self.coords1[i, 0])
             self.assertAlmostEqual(df.iloc[idx][columns[1]], self.coords1[i, 1])
+            self.assertTrue(np.isnan(df.iloc[idx]['Separation']))
             for j in range(self.n2):
                 idx = i * (self.n2 + 1) + j + 1
                 self.assertEqual(df.iloc[idx]['N_match'], -1)
                 self.assertEqual(df.iloc[idx]['is_cat1'], False)
                 self.assertAlmostEqual(df.iloc[idx][columns[0]], self.coords2[i // self.n1 * self.n2 + j, 0])
                 self.assertAlmostEqual(df.iloc[idx][columns[1]], self.coords2[i // self.n1 * self.n2 + j, 1])
+                self.assertAlmostEqual(df.iloc[idx]['Separation'],
+                                       great_circle_distance(*self.coords1[i], *self.coords2[i // self.n1 * self.n2 + j]))
 
     def test_get_serial_dataframe_reverse(self):
         result = xmatch(self.coords1, self.coords2, 2)
         columns = ['Ra', 'Deccc']
         df = result.get_serial_dataframe(coord_columns=columns, reverse=True)
         self.assertEqual(len(df), self.coords2.shape[0] + self.coords1.shape[0] * self.n2)
-        self.assertListEqual(list(df.columns), columns + ['N_match', 'is_cat1'])
+        self.assertListEqual(list(df.columns), columns + ['N_match', 'is_cat1', 'Separation'])
         for i in range(self.coords2.shape[0]):
             idx = i * (self.n1 + 1)
             self.assertEqual(df.iloc[idx]['N_match'], self.n1)
@@ -163,7 +223,7 @@ class TestXMatchResult_Methods(unittest.TestCase):
         result = xmatch(df1, self.coords2, 2)
         df = result.get_serial_dataframe(coord_columns=columns, retain_all_columns=True)
         self.assertEqual(len(df), self.coords1.shape[0] + self.coords2.shape[0] * self.n1)
-        self.assertListEqual(list(df.columns), columns + ['N_match', 'is_cat1'] + retain_columns)
+        self.assertListEqual(list(df.columns), columns + ['N_match', 'is_cat1', 'Separation'] + retain_columns)
         for i in range(self.coords1.shape[0]):
             idx = i * (self.n2 + 1)
             for rc in retain_columns:
@@ -186,7 +246,7 @@ class TestXMatchResult_Methods(unittest.TestCase):
         result = xmatch(df1, df2, 2)
         df = result.get_serial_dataframe(coord_columns=columns, retain_columns=retain_columns)
         self.assertEqual(len(df), self.coords1.shape[0] + self.coords2.shape[0] * self.n1)
-        self.assertListEqual(list(df.columns), columns + ['N_match', 'is_cat1'] + retain_columns)
+        self.assertListEqual(list(df.columns), columns + ['N_match', 'is_cat1', 'Separation'] + retain_columns)
         for i in range(self.coords1.shape[0]):
             idx = i * (self.n2 + 1)
             self.assertAlmostEqual(df.iloc[idx]['A'], df1.loc[i, 'A'])
@@ -5,7 +5,10 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
 import unittest
 import numpy as np
 from pycorrelator import distances_to_target, point_offset, rotate_radec_about_axis
-from pycorrelator import great_circle_distance
+from pycorrelator import great_circle_distance, angle_to_chord, chord_to_angle
+from pycorrelator import radec_to_cartesian, angular_separation, cartesian_to_radec
+from pycorrelator import rodrigues_rotation, rotation_matrix, center_rotation_matrix, rotate_radec
+from pycorrelator.euclidean_vs_angular_distance_local import compute_error, rejection_rate
 
 
 class TestAngularDistance(unittest.TestCase):
@@ -41,6 +44,54 @@ class TestAngularDistance(unittest.TestCase):
         self.assertTrue(np.isclose(distances_to_target(point1, np.array([point2])), expected_distance)[0])
 
 
+class TestAngularSeparation(unittest.TestCase):
+
+    def test_matches_distances_to_target(self):
+        rng = np.random.default_rng(0)
+        points1 = np.vstack([rng.uniform(0, 360, 100), rng.uniform(-90, 90, 100)]).T
+        points2 = np.vstack([rng.uniform(0, 360, 100), rng.uniform(-90, 90, 100)]).T
+        separation = angular_separation(points1[:, 0], points1[:, 1], points2[:, 0], points2[:, 1])
+        expected = [distances_to_target(p1, p2)[0] for p1, p2 in zip(points1, points2)]
+        np.testing.assert_allclose(separation, expected, atol=1e-12)
+
+    def test_scalar(self):
+        self.assertTrue(np.isclose(angular_separation(0, 90, 0, -90), 180.0))
+
+
+class TestDistortionBound(unittest.TestCase):
+
+    def test_compute_error_is_memoized(self):
+        compute_error.cache_clear()
+        first = compute_error(45.0, 0.5)
+        second = compute_error(45.0, 0.5)
+        self.assertEqual(first, second)
+        self.assertEqual(compute_error.cache_info().hits, 1)
+
+    def test_compute_error_grows_with_radius(self):
+        self.assertLess(compute_error(10.0, 1.0), compute_error(60.0, 1.0))
+
+    def test_rejection_rate(self):
+        self.assertEqual(rejection_rate(0, 0), 0.0)
+        self.assertEqual(rejection_rate(10, 8), 0.2)
+
+
+class TestChordDistance(unittest.TestCase):
+
+    def test_known_values(self):
+        np.testing.assert_allclose(angle_to_chord(np.array([0, 60, 180])), [0, 1, 2], atol=1e-15)
+
+    def test_round_trip(self):
+        angles = np.linspace(0, 180, 1001)
+        np.testing.assert_allclose(chord_to_angle(angle_to_chord(angles)), angles, atol=1e-9)
+
+    def test_matches_great_circle_distance(self):
+        ra1, dec1, ra2, dec2 = 10, 20, 12, 21
+        v1 = radec_to_cartesian(ra1, dec1)
+        v2 = radec_to_cartesian(ra2, dec2)
+        distance = chord_to_angle(np.linalg.norm(v1 - v2))
+        self.assertAlmostEqual(distance, great_circle_distance(ra1, dec1, ra2, dec2), places=10)
+
+
 class TestPointOffset(unittest.TestCase):
 
     def setUp(self):
@@ -177,5 +228,35 @@ class TestRotateRADEC(unittest.TestCase):
                         and np.isclose(new_dec2, new_dec_combined, atol=1e-5))
 
 
+class TestRotationMatrix(unittest.TestCase):
+
+    def test_same_as_rodrigues(self):
+        ra, dec = np.array([1., 50, 300]), np.array([2., -30, 89])
+        vectors = radec_to_cartesian(ra, dec)
+        axis = radec_to_cartesian(np.array([30.]), np.array([40.]))
+        expected = rodrigues_rotation(vectors, axis, 25)
+        np.testing.assert_allclose(vectors @ rotation_matrix(30, 40, 25).T, expected, atol=1e-15)
+
+    def test_center_rotation(self):
+        for ra, dec in [(10, 20), (180, 0), (0, 0), (350, -89.5), (200, 45)]:
+            matrix = center_rotation_matrix(ra, dec)
+            new_ra, new_dec = rotate_radec(np.array([ra]), np.array([dec]), matrix)
+            self.assertAlmostEqual(new_ra[0], 180, places=10)
+            self.assertAlmostEqual(new_dec[0], 0, places=10)
+            np.testing.assert_allclose(matrix @ matrix.T, np.eye(3), atol=1e-15)
+
+    def test_rotation_keeps_distances(self):
+        ra, dec = np.array([10., 10.5, 200]), np.array([20., 20.2, -60])
+        new_ra, new_dec = rotate_radec(ra, dec, center_rotation_matrix(10, 20))
+        np.testing.assert_allclose(angular_separation(new_ra[:-1], new_dec[:-1], new_ra[1:], new_dec[1:]),
+                                   angular_separation(ra[:-1], dec[:-1], ra[1:], dec[1:]), atol=1e-10)
+
+    def test_normalization_check(self):
+        with self.assertRaises(ValueError):
+            cartesian_to_radec(np.array([[2., 0, 0]]))
+        ra, dec = cartesian_to_radec(np.array([[2., 0, 0]]), check_normalization=False)
+        self.assertEqual((ra[0], dec[0]), (0, 0))
+
+
 if __name__ == '__main__':
     unittest.main()
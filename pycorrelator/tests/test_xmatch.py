@@ -3,11 +3,16 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from collections import defaultdict
+from functools import partial
+import tempfile
 import unittest
 import numpy as np
 import pandas as pd
-from pycorrelator import point_offset, generate_random_point
-from pycorrelator import xmatch
+from pycorrelator import point_offset, generate_random_point, great_circle_distance, angular_separation
+from pycorrelator import ChunkGeneratorBySuperDenseGrid
+from pycorrelator import xmatch, xmatch_iter, self_xmatch, HEALPixChunkGenerator, ChunkGeneratorByDenseGrid, AdaptiveHEALPixChunkGenerator
+from pycorrelator.catalog import Catalog
+from pycorrelator.xmatch import concatenate_pairs
 from test_fof import generate_celestial_grid
 
 
@@ -145,6 +150,13 @@ class TestCelestialXMatching_RandomGrid(unittest.TestCase):
         print_format_match(problematic_matches, self.two_catalogs[0], self.two_catalogs[1])
         self.assertEqual(len(problematic_matches), 0, f"Failed groups: {problematic_matches}")
 
+    def test_match_by_chord(self):
+        output_matches = xmatch(self.two_catalogs[0], self.two_catalogs[1], self.tolerance,
+                                engine='chord').get_result_dict()
+        problematic_matches = check_Xmatching(self.expected_matching, output_matches)
+        print_format_match(problematic_matches, self.two_catalogs[0], self.two_catalogs[1])
+        self.assertEqual(len(problematic_matches), 0, f"Failed groups: {problematic_matches}")
+
     def test_self_match_by_quadtree(self):
         combine = np.concatenate([self.two_catalogs[1], self.two_catalogs[0]], axis=0)
         output_matches = xmatch(combine, combine, self.tolerance).get_result_dict()
@@ -169,6 +181,240 @@ class TestCelestialXMatching_RandomGrid(unittest.TestCase):
         self.assertEqual(len(problematic_matches), 0, err_msg)
 
 
+class TestConcatenatePairs(unittest.TestCase):
+
+    def test_concatenate(self):
+        chunk_pairs = [(np.array([3, 0, 1]), np.array([2, 5, 1]), np.array([0.1, 0.2, 0.3])),
+                       (np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([])),
+                       (np.array([0, 3]), np.array([4, 0]), np.array([0.2, 0.4]))]
+        idx1, idx2, separation = concatenate_pairs(chunk_pairs)
+        np.testing.assert_array_equal(idx1, [3, 0, 1, 0, 3])
+        np.testing.assert_array_equal(idx2, [2, 5, 1, 4, 0])
+        np.testing.assert_array_equal(separation, [0.1, 0.2, 0.3, 0.2, 0.4])
+        self.assertEqual(idx1.dtype, np.int64)
+
+    def test_no_duplicates_from_chunks(self):
+        # The chunks must never return the same pair twice, since the pairs are only concatenated
+        ra, dec = generate_random_point(3000, seed=8)
+        cat1, cat2 = np.array([ra[:1500], dec[:1500]]).T, np.array([ra[1500:], dec[1500:]]).T
+        for engine in ['rotate', 'chord']:
+            idx1, idx2 = xmatch(cat1, cat2, 3, verbose=False, engine=engine,
+                                chunk_generator=ChunkGeneratorBySuperDenseGrid).get_pairs()
+            pairs = set(zip(idx1, idx2))
+            self.assertEqual(len(pairs), len(idx1))
+            distance = angular_separation(cat1[:, None, 0], cat1[:, None, 1], cat2[None, :, 0], cat2[None, :, 1])
+            self.assertEqual(pairs, set(zip(*np.nonzero(distance <= 3))))
+
+
+class TestXMatchIter(unittest.TestCase):
+
+    def setUp(self):
+        ra1, dec1 = generate_random_point(3000, seed=2)
+        ra2, dec2 = generate_random_point(3000, seed=3)
+        self.cat1 = np.array([ra1, dec1]).T
+        self.cat2 = np.array([ra2, dec2]).T
+        self.tolerance = 2
+        result = xmatch(self.cat1, self.cat2, self.tolerance, verbose=False)
+        self.expected = set(zip(*result.get_pairs()))
+
+    def check_exactly_once(self, chunk_results):
+        idx1 = np.concatenate([r[0] for r in chunk_results])
+        idx2 = np.concatenate([r[1] for r in chunk_results])
+        separation = np.concatenate([r[2] for r in chunk_results])
+        pairs = list(zip(idx1, idx2))
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertEqual(set(pairs), self.expected)
+        expected_separation = [great_circle_distance(*self.cat1[i], *self.cat2[j]) for i, j in pairs[:200]]
+        np.testing.assert_allclose(separation[:200], expected_separation, atol=1e-8)
+
+    def test_exactly_once(self):
+        for engine in ['rotate', 'chord']:
+            self.check_exactly_once(list(xmatch_iter(self.cat1, self.cat2, self.tolerance, engine=engine)))
+
+    def test_exactly_once_near_poles(self):
+        # The RA margin of the grid chunks must widen towards the poles
+        ra, dec = generate_random_point(20000, seed=4)
+        cat1, cat2 = np.array([ra, dec]).T[dec > 70][:1500], np.array([ra, dec]).T[dec > 70][1500:]
+        for chunk_gen in [ChunkGeneratorBySuperDenseGrid, partial(AdaptiveHEALPixChunkGenerator, max_objects=100)]:
+            expected = set(zip(*xmatch(cat1, cat2, 1, verbose=False, engine='chord',
+                                       chunk_generator=HEALPixChunkGenerator).get_pairs()))
+            chunk_results = list(xmatch_iter(cat1, cat2, 1, chunk_generator=chunk_gen))
+            pairs = list(zip(np.concatenate([r[0] for r in chunk_results]),
+                             np.concatenate([r[1] for r in chunk_results])))
+            self.assertEqual(len(pairs), len(set(pairs)))
+            self.assertEqual(set(pairs), expected)
+
+    def test_process_backend(self):
+        chunk_results = xmatch_iter(self.cat1, self.cat2, self.tolerance, n_workers=2)
+        self.check_exactly_once(list(chunk_results))
+
+    def test_stop_early(self):
+        chunk_results = xmatch_iter(self.cat1, self.cat2, self.tolerance, executor='thread', n_workers=2)
+        next(chunk_results)
+        chunk_results.close()
+
+    def test_invalid_engine(self):
+        with self.assertRaises(ValueError):
+            xmatch_iter(self.cat1, self.cat2, self.tolerance, engine='brute')
+
+
+class TestNearestXMatch(unittest.TestCase):
+
+    def setUp(self):
+        ra1, dec1 = generate_random_point(2000, seed=5)
+        ra2, dec2 = generate_random_point(4000, seed=6)
+        self.cat1 = np.array([ra1, dec1]).T
+        self.cat2 = np.array([ra2, dec2]).T
+        self.tolerance = 3
+        # Brute force over all the pairs
+        distance = angular_separation(self.cat1[:, None, 0], self.cat1[:, None, 1],
+                                      self.cat2[None, :, 0], self.cat2[None, :, 1])
+        self.distance = np.where(distance <= self.tolerance, distance, np.inf)
+
+    def expected_nearest(self, k):
+        order = np.argsort(self.distance, axis=1, kind='stable')[:, :k]
+        distance = np.take_along_axis(self.distance, order, axis=1)
+        return order, distance
+
+    def test_nearest(self):
+        order, distance = self.expected_nearest(1)
+        for chunk_gen in [ChunkGeneratorByDenseGrid, partial(AdaptiveHEALPixChunkGenerator, max_objects=200)]:
+            result = xmatch(self.cat1, self.cat2, self.tolerance, verbose=False, mode='nearest',
+                            chunk_generator=chunk_gen)
+            nearest, separation = result.get_nearest()
+            found = np.isfinite(distance[:, 0])
+            self.assertTrue(np.any(~found))
+            np.testing.assert_array_equal(nearest[found], order[found, 0])
+            np.testing.assert_array_equal(nearest[~found], -1)
+            np.testing.assert_allclose(separation[found], distance[found, 0], atol=1e-8)
+            self.assertTrue(np.all(np.isnan(separation[~found])))
+
+    def test_k_nearest(self):
+        order, distance = self.expected_nearest(3)
+        result = xmatch(self.cat1, self.cat2, self.tolerance, verbose=False, mode='nearest', k=3)
+        np.testing.assert_array_equal(result.get_counts(), np.sum(np.isfinite(distance), axis=1))
+        for i in range(len(self.cat1)):
+            expected = order[i][np.isfinite(distance[i])]
+            self.assertEqual(sorted(result.get_matches(i)), sorted(expected))
+
+    def test_nearest_iter(self):
+        order, distance = self.expected_nearest(1)
+        chunk_results = list(xmatch_iter(self.cat1, self.cat2, self.tolerance, mode='nearest'))
+        idx1 = np.concatenate([r[0] for r in chunk_results])
+        idx2 = np.concatenate([r[1] for r in chunk_results])
+        self.assertEqual(len(idx1), len(np.unique(idx1)))
+        np.testing.assert_array_equal(idx2, order[idx1, 0])
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            xmatch(self.cat1, self.cat2, self.tolerance, mode='best')
+        with self.assertRaises(ValueError):
+            xmatch(self.cat1, self.cat2, self.tolerance, mode='nearest', k=0)
+
+
+class TestSelfXMatch(unittest.TestCase):
+
+    def setUp(self):
+        ra, dec = generate_random_point(4000, seed=7)
+        self.cat = np.array([ra, dec]).T
+        self.tolerance = 2
+
+    def expected_pairs(self, cat, tolerance):
+        idx1, idx2 = xmatch(cat, cat, tolerance, verbose=False, engine='chord').get_pairs()
+        return set(zip(idx1[idx1 < idx2], idx2[idx1 < idx2]))
+
+    def check_exactly_once(self, result, cat, tolerance):
+        idx1, idx2 = result.get_pairs()
+        pairs = list(zip(idx1, idx2))
+        self.assertTrue(np.all(idx1 < idx2))
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertEqual(set(pairs), self.expected_pairs(cat, tolerance))
+        np.testing.assert_allclose(result.get_separations(),
+                                   angular_separation(*cat[idx1].T, *cat[idx2].T), atol=1e-8)
+
+    def test_exactly_once(self):
+        for engine in ['rotate', 'chord']:
+            result = self_xmatch(self.cat, self.tolerance, verbose=False, engine=engine, n_workers=2)
+            self.assertIs(result.cat1, result.cat2)
+            self.check_exactly_once(result, self.cat, self.tolerance)
+
+    def test_chunk_generators(self):
+        cat = self.cat[self.cat[:, 1] > 60]
+        for chunk_gen in [ChunkGeneratorBySuperDenseGrid, partial(HEALPixChunkGenerator, order=2),
+                          partial(AdaptiveHEALPixChunkGenerator, max_objects=50)]:
+            result = self_xmatch(cat, 1, verbose=False, chunk_generator=chunk_gen)
+            self.check_exactly_once(result, cat, 1)
+
+    def test_invalid_engine(self):
+        with self.assertRaises(ValueError):
+            self_xmatch(self.cat, self.tolerance, engine='brute')
+
+
+class TestParallelXMatch(unittest.TestCase):
+
+    def setUp(self):
+        ra1, dec1 = generate_random_point(2000, seed=0)
+        ra2, dec2 = generate_random_point(2000, seed=1)
+        self.cat1 = np.array([ra1, dec1]).T
+        self.cat2 = np.array([ra2, dec2]).T
+        self.tolerance = 2
+        self.expected = xmatch(self.cat1, self.cat2, self.tolerance).get_result_dict()
+
+    def check_identical(self, result_dict):
+        self.assertEqual(len(result_dict), len(self.expected))
+        for key, value in self.expected.items():
+            self.assertEqual(sorted(result_dict[key]), sorted(value))
+
+    def test_thread_backend(self):
+        result = xmatch(self.cat1, self.cat2, self.tolerance, executor='thread', n_workers=4)
+        self.check_identical(result.get_result_dict())
+
+    def test_process_backend(self):
+        result = xmatch(self.cat1, self.cat2, self.tolerance, n_workers=2)
+        self.check_identical(result.get_result_dict())
+
+    def test_user_executor(self):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            result = xmatch(self.cat1, self.cat2, self.tolerance, executor=executor)
+        self.check_identical(result.get_result_dict())
+
+    def test_chord_engine(self):
+        result = xmatch(self.cat1, self.cat2, self.tolerance, engine='chord', n_workers=2)
+        self.check_identical(result.get_result_dict())
+
+    def test_healpix_chunks(self):
+        chunk_generator = partial(HEALPixChunkGenerator, order=2)
+        result = xmatch(self.cat1, self.cat2, self.tolerance, chunk_generator=chunk_generator)
+        self.check_identical(result.get_result_dict())
+
+    def test_adaptive_healpix_chunks(self):
+        chunk_generator = partial(AdaptiveHEALPixChunkGenerator, max_objects=200, base_order=0)
+        result = xmatch(self.cat1, self.cat2, self.tolerance, chunk_generator=chunk_generator)
+        self.check_identical(result.get_result_dict())
+
+    def test_memory_mapped_catalogs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            np.save(os.path.join(tmpdir, 'cat1.npy'), self.cat1)
+            np.save(os.path.join(tmpdir, 'cat2.npy'), self.cat2)
+            catalog1 = Catalog(os.path.join(tmpdir, 'cat1.npy'), block_size=300)
+            catalog2 = Catalog(os.path.join(tmpdir, 'cat2.npy'), block_size=500)
+            result = xmatch(catalog1, catalog2, self.tolerance, n_workers=2)
+            self.check_identical(result.get_result_dict())
+
+    def test_dense_grid_chunks(self):
+        result = xmatch(self.cat1, self.cat2, self.tolerance, chunk_generator=ChunkGeneratorByDenseGrid)
+        self.check_identical(result.get_result_dict())
+
+    def test_invalid_engine(self):
+        with self.assertRaises(ValueError):
+            xmatch(self.cat1, self.cat2, self.tolerance, engine='brute')
+
+    def test_invalid_executor(self):
+        with self.assertRaises(ValueError):
+            xmatch(self.cat1, self.cat2, self.tolerance, executor='gpu')
+
+
 class TestInputFormatXMatch(unittest.TestCase):
 
     def setUp(self):
@@ -62,6 +62,60 @@ def great_circle_distance(ra1, dec1, ra2, dec2):
     return distances_to_target(target, point)[0]
 
 
+def angular_separation(ra1, dec1, ra2, dec2):
+    """Compute the element-wise great-circle distances between two sets of points on a sphere.
+
+    Unlike :func:`great_circle_distance`, this function accepts arrays and returns the distance
+    between the k-th point of the first set and the k-th point of the second set.
+
+    Parameters
+    ----------
+    ra1 : float or numpy.ndarray
+        Right ascension of the first point(s) in degrees.
+    dec1 : float or numpy.ndarray
+        Declination of the first point(s) in degrees.
+    ra2 : float or numpy.ndarray
+        Right ascension of the second point(s) in degrees.
+    dec2 : float or numpy.ndarray
+        Declination of the second point(s) in degrees.
+
+    Returns
+    -------
+    distances : float or numpy.ndarray
+        Angular distances between the pairs of points in degrees.
+    """
+    ra1, dec1, ra2, dec2 = np.radians(ra1), np.radians(dec1), np.radians(ra2), np.radians(dec2)
+    # Haversine formula
+    a = np.sin((dec2 - dec1) / 2.0)**2 + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2.0)**2
+    return np.degrees(2 * np.arcsin(np.sqrt(a)))
+
+
+def position_angle(ra1, dec1, ra2, dec2):
+    """Compute the element-wise position angles of the second set of points as seen from the first set.
+
+    Parameters
+    ----------
+    ra1 : float or numpy.ndarray
+        Right ascension of the first point(s) in degrees.
+    dec1 : float or numpy.ndarray
+        Declination of the first point(s) in degrees.
+    ra2 : float or numpy.ndarray
+        Right ascension of the second point(s) in degrees.
+    dec2 : float or numpy.ndarray
+        Declination of the second point(s) in degrees.
+
+    Returns
+    -------
+    angles : float or numpy.ndarray
+        Position angles in degrees in the range [0, 360), measured from the north towards the east
+        (the `theta` of :func:`point_offset`).
+    """
+    ra1, dec1, ra2, dec2 = np.radians(ra1), np.radians(dec1), np.radians(ra2), np.radians(dec2)
+    y = np.sin(ra2 - ra1) * np.cos(dec2)
+    x = np.cos(dec1) * np.sin(dec2) - np.sin(dec1) * np.cos(dec2) * np.cos(ra2 - ra1)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+
 def point_offset(ra_dec, angular_distance, theta):
     """Give a point that is a given angular distance away from a specified point on the celestial sphere.
 
@@ -125,13 +179,16 @@ def radec_to_cartesian(ra, dec):
     return np.array([x, y, z]).T
 
 
-def cartesian_to_radec(cartesian_coords):
+def cartesian_to_radec(cartesian_coords, check_normalization=True):
     """Convert Cartesian coordinates to Right Ascension and Declination.
 
     Parameters
     ----------
     cartesian_coords : np.array
         Array of Cartesian coordinates [x, y, z] SHOULD BE NORMALIZED.
+    check_normalization : bool, optional
+        Whether to check that the vectors are normalized. Default is True. The check goes over all
+        the vectors, so it can be skipped for vectors that are normalized by construction.
 
     Returns
     -------
@@ -139,13 +196,45 @@ def cartesian_to_radec(cartesian_coords):
         (RA, DEC) in degrees.
     """
     x, y, z = cartesian_coords.T
-    if not np.allclose(np.linalg.norm(cartesian_coords, axis=-1), 1, atol=1e-9):
+    if check_normalization and not np.allclose(np.linalg.norm(cartesian_coords, axis=-1), 1, atol=1e-9):
         raise ValueError("[x, y, z] must be a normalized vector")
     ra = np.degrees(np.arctan2(y, x)) % 360
     dec = np.degrees(np.arcsin(z))
     return ra, dec
 
 
+def angle_to_chord(angle):
+    """Convert angular distances to the chord lengths between the points on the unit sphere.
+
+    Parameters
+    ----------
+    angle : float or np.array
+        Angular distance(s) in degrees.
+
+    Returns
+    -------
+    float or np.array
+        Chord length(s), i.e. the Euclidean distance between the unit vectors, 2 * sin(angle / 2).
+    """
+    return 2 * np.sin(np.radians(angle) / 2)
+
+
+def chord_to_angle(chord):
+    """Convert chord lengths between the points on the unit sphere to angular distances.
+
+    Parameters
+    ----------
+    chord : float or np.array
+        Chord length(s) between unit vectors. Must be in [0, 2].
+
+    Returns
+    -------
+    float or np.array
+        Angular distance(s) in degrees.
+    """
+    return np.degrees(2 * np.arcsin(np.minimum(chord, 2) / 2))
+
+
 def rodrigues_rotation(v, k, theta):
     """Rotate a vector using Rodrigues' rotation formula.
 
@@ -170,6 +259,78 @@ def rodrigues_rotation(v, k, theta):
     return v_rot
 
 
+def rotation_matrix(axis_ra, axis_dec, theta):
+    """Get the matrix of the rotation about a specified axis, as in :func:`rodrigues_rotation`.
+
+    Parameters
+    ----------
+    axis_ra : float
+        Right Ascension of the rotation axis in degrees.
+    axis_dec : float
+        Declination of the rotation axis in degrees.
+    theta : float
+        Angle of rotation in degrees.
+
+    Returns
+    -------
+    np.array
+        The rotation matrix R, such that ``R @ v`` is the rotated vector v. Shape: (3, 3).
+    """
+    k = radec_to_cartesian(axis_ra, axis_dec).reshape(3)
+    theta_rad = np.radians(theta)
+    cross = np.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+    return np.cos(theta_rad) * np.eye(3) + np.sin(theta_rad) * cross + (1 - np.cos(theta_rad)) * np.outer(k, k)
+
+
+def center_rotation_matrix(ra, dec):
+    """Get the matrix of the rotation that brings a point to (180, 0) along the great circle.
+
+    Parameters
+    ----------
+    ra : float
+        Right Ascension of the point in degrees.
+    dec : float
+        Declination of the point in degrees.
+
+    Returns
+    -------
+    np.array
+        The rotation matrix. Shape: (3, 3).
+    """
+    center_car = radec_to_cartesian(ra, dec)
+    normal_car = np.cross(center_car, np.array([-1., 0., 0.]))
+    norm = np.linalg.norm(normal_car)
+    if norm < 1e-12: # The point is (180, 0) or (0, 0), so any axis in the equatorial plane of x works.
+        normal_ra, normal_dec = 0, 90
+    else:
+        normal_ra, normal_dec = cartesian_to_radec(normal_car / norm)
+    angle = great_circle_distance(ra, dec, 180, 0)
+    return rotation_matrix(normal_ra, normal_dec, angle)
+
+
+def rotate_radec(ra, dec, matrix, check_normalization=False):
+    """Rotate points in celestial coordinates with a rotation matrix.
+
+    Parameters
+    ----------
+    ra : np.array
+        Right Ascension of the points in degrees.
+    dec : np.array
+        Declination of the points in degrees.
+    matrix : np.array
+        The rotation matrix, e.g. from :func:`rotation_matrix`. Shape: (3, 3).
+    check_normalization : bool, optional
+        Whether to check that the rotated vectors are normalized. Default is False.
+
+    Returns
+    -------
+    tuple[np.array]
+        The rotated (RA, DEC) arrays in degrees.
+    """
+    vectors = radec_to_cartesian(ra, dec).reshape(-1, 3)
+    return cartesian_to_radec(vectors @ matrix.T, check_normalization=check_normalization)
+
+
 def rotate_radec_about_axis(ra, dec, axis_ra, axis_dec, theta):
     """Rotate a point (or points) in celestial coordinates about a specified axis.
 
@@ -209,10 +370,7 @@ def rotate_radec_about_axis(ra, dec, axis_ra, axis_dec, theta):
         axis_dec = np.array([axis_dec])
     if not np.isscalar(theta):
         raise ValueError("theta must be a scalar")
-    v = radec_to_cartesian(ra, dec)
-    k = radec_to_cartesian(axis_ra, axis_dec)
-    v_rot = rodrigues_rotation(v, k, theta)
-    rotated = cartesian_to_radec(v_rot)
+    rotated = rotate_radec(ra, dec, rotation_matrix(axis_ra, axis_dec, theta), check_normalization=True)
     if scalar:
         return rotated[0][0], rotated[1][0]
     return rotated
@@ -1,56 +1,40 @@
-from collections import defaultdict
+from typing import Iterator, Optional
 import numpy as np
+from numpy.typing import NDArray
 from scipy.spatial import KDTree
 from .catalog import Catalog
+from .catalog_index import CatalogIndex
 from .chunk import Chunk
-from .chunk_generator_grid import GridChunkGenerator
-from .euclidean_vs_angular_distance_local import compute_error
+from .chunk_generator_grid import ChunkGeneratorByGrid
+from .euclidean_vs_angular_distance_local import compute_error, rejection_rate
+from .parallel import describe_executor, imap_chunks, map_chunks
 from .result_xmatch import XMatchResult
-from .utilities_spherical import radec_to_cartesian, cartesian_to_radec
-from .utilities_spherical import great_circle_distance, rotate_radec_about_axis
-from .utilities_spherical import distances_to_target
+from .utilities_spherical import angular_separation, angle_to_chord, chord_to_angle
 
 
-def unique_merge_defaultdicts(d1: defaultdict, d2: defaultdict):
-    """Joins two dictionaries, merging values for shared keys and preserving others.
+def concatenate_pairs(chunk_pairs: list[tuple]) -> tuple[NDArray, NDArray, NDArray]:
+    """Concatenates the matched pairs of all chunks.
 
-    When both dictionaries have the same key, this function makes a new list 
-    with every distinct value from either dictionary. If a key is only in one 
-    dictionary, it adds that key and its values directly to the result.
+    Every pair is owned by exactly one chunk (see :meth:`Chunk.owns_pairs`), so the chunks never
+    return the same pair twice and no duplicates need to be removed.
 
     Parameters
     ----------
-    d1 : defaultdict
-        A dictionary with list-type values.
-    d2 : defaultdict
-        Another dictionary with list-type values.
+    chunk_pairs : list[tuple]
+        A list of tuples starting with the (idx1, idx2, separation) arrays, one tuple per chunk.
 
     Returns
     -------
-    defaultdict
-        A dictionary with all keys from both d1 and d2. For shared keys, it has a list
-        of unique values. For unshared keys, it has the original list.
+    tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        The pairs (idx1, idx2) and their separations, in the order of the chunks.
     """
-    # Convert defaultdicts to arrays
-    keys1 = np.array(list(d1.keys()), dtype=np.int64)
-    keys2 = np.array(list(d2.keys()), dtype=np.int64)
-    # Find intersection and unique keys in both arrays
-    intersect_keys = np.intersect1d(keys1, keys2, assume_unique=True)
-    unique_keys_d1 = np.setdiff1d(keys1, intersect_keys, assume_unique=True)
-    unique_keys_d2 = np.setdiff1d(keys2, intersect_keys, assume_unique=True)
-    # Merge the arrays for intersecting keys
-    merged_values = [np.union1d(d1[key], d2[key]) for key in intersect_keys]
-    # Get the arrays for unique keys
-    values_unique_d1 = [d1[key] for key in unique_keys_d1]
-    values_unique_d2 = [d2[key] for key in unique_keys_d2]
-    # Combine all keys and values
-    all_keys = np.concatenate([intersect_keys, unique_keys_d1, unique_keys_d2])
-    all_values = merged_values + values_unique_d1 + values_unique_d2
-    # Convert back to defaultdict
-    result = defaultdict(list, {k: list(v) for k, v in zip(all_keys, all_values)})
-    return result
-
-def xmatch(catalog1, catalog2, tolerance, verbose=True) -> XMatchResult:
+    idx1 = np.concatenate([np.empty(0, dtype=np.int64)] + [pairs[0] for pairs in chunk_pairs]).astype(np.int64)
+    idx2 = np.concatenate([np.empty(0, dtype=np.int64)] + [pairs[1] for pairs in chunk_pairs]).astype(np.int64)
+    separation = np.concatenate([np.empty(0)] + [pairs[2] for pairs in chunk_pairs]).astype(np.float64)
+    return idx1, idx2, separation
+
+def xmatch(catalog1, catalog2, tolerance, verbose=True, executor=None, n_workers=None, engine='rotate',
+           chunk_generator=ChunkGeneratorByGrid, mode='all', k=1) -> XMatchResult:
     """Performs a cross-match between two catalogs.
 
     This function matches objects from two different catalogs based on their coordinates. Objects from
@@ -58,14 +42,44 @@ def xmatch(catalog1, catalog2, tolerance, verbose=True) -> XMatchResult:
 
     Parameters
     ----------
-    catalog1 : array-like
-        The first catalog.
-    catalog2 : array-like
-        The second catalog.
+    catalog1 : array-like, str or Catalog
+        The first catalog. See :class:`Catalog` for the accepted inputs, including memory-mapped .npy
+        files for catalogs larger than the memory.
+    catalog2 : array-like, str, Catalog or CatalogIndex
+        The second catalog. A prebuilt :class:`CatalogIndex` is reused as is: only `catalog1` is
+        distributed, the chunks and the matching are those of the index, and `engine` and
+        `chunk_generator` are ignored.
     tolerance : float
         The tolerance for the cross-match in degrees.
     verbose : bool, optional
         Whether to print the progress.
+    executor : str or concurrent.futures.Executor, optional
+        How to process the chunks: 'thread', 'process', or a user-supplied executor.
+        Default is None, which processes the chunks serially unless `n_workers` > 1.
+    n_workers : int, optional
+        The number of workers for the 'thread' and 'process' backends.
+    engine : str, optional
+        The matching engine applied to each chunk. Default is 'rotate'.
+
+        * 'rotate': Rotate the chunk to (180, 0) and match on (Ra, Dec) with a 2D KD-tree, followed by
+          an exact great-circle distance check.
+        * 'chord': Match on the 3D unit vectors with the exact chord radius 2 * sin(tolerance / 2).
+          No rotation and no distortion correction are needed.
+    chunk_generator : callable, optional
+        A :class:`ChunkGenerator` subclass, or any callable taking the margin in degrees and returning
+        a chunk generator. Default is ChunkGeneratorByGrid. For example, ChunkGeneratorByDenseGrid or
+        ``functools.partial(HEALPixChunkGenerator, order=2)``. Use AdaptiveHEALPixChunkGenerator for
+        catalogs with a very uneven density.
+    mode : str, optional
+        Which matches to keep. Default is 'all'.
+
+        * 'all': Every object of `catalog2` within the tolerance.
+        * 'nearest': Only the `k` closest objects of `catalog2` within the tolerance, found with
+          ``KDTree.query`` on the unit vectors (`engine` is ignored). The other neighbours are never
+          materialised, which saves time and memory in dense fields. Use
+          :meth:`XMatchResult.get_nearest` to get the closest match as arrays.
+    k : int, optional
+        The number of closest matches to keep in the 'nearest' mode. Default is 1.
 
     Returns
     -------
@@ -73,64 +87,289 @@ def xmatch(catalog1, catalog2, tolerance, verbose=True) -> XMatchResult:
         A XMatchResult object that contains the cross-match result.
     """
     # [ENH]: Add an option for sorting the output
-    _catalog1 = Catalog(catalog1)
-    _catalog2 = Catalog(catalog2)
-    cg1 = GridChunkGenerator(margin=2*tolerance)
-    cg2 = GridChunkGenerator(margin=2*tolerance)
-    cg1.set_symmetric_ring_chunk(60, [6, 6])
-    cg2.set_symmetric_ring_chunk(60, [6, 6])
+    _catalog1, _catalog2, func, args, generators = prepare_chunk_tasks(
+        catalog1, catalog2, tolerance, engine, chunk_generator, mode, k)
+    if verbose:
+        if generators is None:
+            print(f"Using {describe_executor(executor, n_workers)} to match {len(args)} chunks of the index.")
+        else:
+            print(f"Using {describe_executor(executor, n_workers)} to match {len(args)} chunks.")
+            print(f"Catalog 1: {generators[0].describe_occupancy()}.")
+            print(f"Catalog 2: {generators[1].describe_occupancy()}.")
+    chunk_pairs = map_chunks(func, args, executor, n_workers)
+    if verbose:
+        n_candidates = sum(pairs[3] for pairs in chunk_pairs)
+        n_accepted = sum(len(pairs[0]) for pairs in chunk_pairs)
+        print(f"Candidate rejection rate: {rejection_rate(n_candidates, n_accepted):.2%} "
+              f"({n_candidates - n_accepted} of {n_candidates} candidates).")
+    idx1, idx2, separations = concatenate_pairs(chunk_pairs)
+    return XMatchResult.from_pairs(_catalog1, _catalog2, tolerance, idx1, idx2, separations)
+
+def xmatch_iter(catalog1, catalog2, tolerance, executor=None, n_workers=None, engine='rotate',
+                chunk_generator=ChunkGeneratorByGrid, mode='all', k=1) -> Iterator[tuple[NDArray, NDArray, NDArray]]:
+    """Cross-match two catalogs chunk by chunk, yielding the matches of each chunk as soon as it is done.
+
+    Each pair is yielded exactly once: a pair belongs to the chunk in which its object of `catalog1` is
+    a central object. The matches are therefore never held in memory all together, and can be written
+    out incrementally. Concatenating all the yielded arrays gives the same pairs as :func:`xmatch`.
+
+    Parameters
+    ----------
+    catalog1 : array-like, str or Catalog
+        The first catalog.
+    catalog2 : array-like, str, Catalog or CatalogIndex
+        The second catalog. See :func:`xmatch`.
+    tolerance : float
+        The tolerance for the cross-match in degrees.
+    executor : str or concurrent.futures.Executor, optional
+        See :func:`xmatch`.
+    n_workers : int, optional
+        See :func:`xmatch`.
+    engine : str, optional
+        See :func:`xmatch`.
+    chunk_generator : callable, optional
+        See :func:`xmatch`.
+    mode : str, optional
+        See :func:`xmatch`.
+    k : int, optional
+        See :func:`xmatch`.
+
+    Yields
+    ------
+    tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        (idx1, idx2, separation) for each chunk: the indexes of the matched objects in `catalog1` and
+        `catalog2`, and their angular separations in degrees. The arrays may be empty.
+    """
+    _, _, func, args, _ = prepare_chunk_tasks(catalog1, catalog2, tolerance, engine, chunk_generator, mode, k)
+    chunk_results = imap_chunks(func, args, executor, n_workers)
+    return ((idx1, idx2, separation) for idx1, idx2, separation, _ in chunk_results)
+
+def self_xmatch(catalog, tolerance, verbose=True, executor=None, n_workers=None, engine='rotate',
+                chunk_generator=ChunkGeneratorByGrid) -> XMatchResult:
+    """Cross-match a catalog with itself, finding every pair of distinct objects within the tolerance.
+
+    Unlike ``xmatch(catalog, catalog, tolerance)``, the catalog is distributed only once, each chunk is
+    searched with a single tree, and each unordered pair is found once, without the self-matches.
+    A pair belongs to the chunk in which its object with the lower index is a central object.
+
+    Parameters
+    ----------
+    catalog : array-like, str or Catalog
+        The catalog. See :class:`Catalog` for the accepted inputs.
+    tolerance : float
+        The tolerance for the cross-match in degrees.
+    verbose : bool, optional
+        See :func:`xmatch`.
+    executor : str or concurrent.futures.Executor, optional
+        See :func:`xmatch`.
+    n_workers : int, optional
+        See :func:`xmatch`.
+    engine : str, optional
+        See :func:`xmatch`.
+    chunk_generator : callable, optional
+        See :func:`xmatch`.
+
+    Returns
+    -------
+    XMatchResult
+        The result with the catalog as both the first and the second catalog. Each pair is stored once,
+        as (i, j) with i < j, so ``reverse()`` holds the pairs with i > j.
+    """
+    if engine not in SELF_XMATCH_ENGINES:
+        raise ValueError(f"Unknown engine: {engine}. Use one of {list(SELF_XMATCH_ENGINES)}.")
+    _catalog = catalog if isinstance(catalog, Catalog) else Catalog(catalog)
+    cg = chunk_generator(margin=2*tolerance)
+    cg.plan([_catalog])
+    cg.distribute(_catalog)
+    if verbose:
+        print(f"Using {describe_executor(executor, n_workers)} to match {len(cg.chunks)} chunks.")
+        print(f"Chunk occupancy: {cg.describe_occupancy()}.")
+    args = [(chunk, tolerance) for chunk in cg.chunks]
+    chunk_pairs = map_chunks(SELF_XMATCH_ENGINES[engine], args, executor, n_workers)
+    if verbose:
+        n_candidates = sum(pairs[3] for pairs in chunk_pairs)
+        n_accepted = sum(len(pairs[0]) for pairs in chunk_pairs)
+        print(f"Candidate rejection rate: {rejection_rate(n_candidates, n_accepted):.2%} "
+              f"({n_candidates - n_accepted} of {n_candidates} candidates).")
+    idx1, idx2, separations = concatenate_pairs(chunk_pairs)
+    return XMatchResult.from_pairs(_catalog, _catalog, tolerance, idx1, idx2, separations)
+
+def prepare_chunk_tasks(catalog1, catalog2, tolerance, engine, chunk_generator, mode, k):
+    """Check the options, divide the catalogs into chunks, and select the chunk function.
+
+    Returns
+    -------
+    tuple[Catalog, Catalog, callable, list[tuple], Optional[tuple[ChunkGenerator, ChunkGenerator]]]
+        The two catalogs, the chunk function and its arguments (one tuple per chunk), and the chunk
+        generators (None if `catalog2` is a CatalogIndex).
+    """
+    if mode not in XMATCH_MODES:
+        raise ValueError(f"Unknown mode: {mode}. Use one of {list(XMATCH_MODES)}.")
+    if mode == 'nearest' and (int(k) != k or k < 1):
+        raise ValueError("k must be a positive integer!")
+    extra_args = (int(k),) if mode == 'nearest' else ()
+    if isinstance(catalog2, CatalogIndex):
+        _catalog1 = catalog1 if isinstance(catalog1, Catalog) else Catalog(catalog1)
+        args = [arg + extra_args for arg in index_chunk_args(_catalog1, catalog2, tolerance)]
+        func = nearest_index_chunk if mode == 'nearest' else xmatch_index_chunk
+        return _catalog1, catalog2.catalog, func, args, None
+    _catalog1, _catalog2, cg1, cg2 = distribute_catalogs(catalog1, catalog2, tolerance, engine, chunk_generator)
+    args = [(cg1.chunks[i], cg2.chunks[i], tolerance) + extra_args for i in range(len(cg1.chunks))]
+    func = nearest_xmatch_chunk if mode == 'nearest' else XMATCH_ENGINES[engine]
+    return _catalog1, _catalog2, func, args, (cg1, cg2)
+
+def distribute_catalogs(catalog1, catalog2, tolerance, engine, chunk_generator):
+    """Check the engine, then divide both catalogs into the same chunks.
+
+    Returns
+    -------
+    tuple[Catalog, Catalog, ChunkGenerator, ChunkGenerator]
+        The two catalogs and their chunk generators, which hold the distributed chunks.
+    """
+    if engine not in XMATCH_ENGINES:
+        raise ValueError(f"Unknown engine: {engine}. Use one of {list(XMATCH_ENGINES)}.")
+    _catalog1 = catalog1 if isinstance(catalog1, Catalog) else Catalog(catalog1)
+    _catalog2 = catalog2 if isinstance(catalog2, Catalog) else Catalog(catalog2)
+    cg1 = chunk_generator(margin=2*tolerance)
+    cg2 = chunk_generator(margin=2*tolerance)
+    # Both catalogs must be divided by the same chunks, so the generators are planned on both of them.
+    cg1.plan([_catalog1, _catalog2])
+    cg2.plan([_catalog1, _catalog2])
     cg1.distribute(_catalog1)
     cg2.distribute(_catalog2)
     if len(cg1.chunks) != len(cg2.chunks):
         raise BrokenPipeError("The two catalogs have different number of chunks! Please contact the developer.")
-    merged_dict = defaultdict(list) # [FIXME] Change to dict or sorted dict, or don't assume the order of the keys.
-    for i in range(len(cg1.chunks)):
-        if verbose:
-            print(f"Started Chunk {i}")
-        dd = xmatch_chunk((cg1.chunks[i], cg2.chunks[i], tolerance))
-        if i == 0:
-            merged_dict = dd
-        else:
-            merged_dict = unique_merge_defaultdicts(merged_dict, dd)
-    return XMatchResult(_catalog1, _catalog2, tolerance, merged_dict)
-
-def rotate_to_center(object_coor, chunk_ra, chunk_dec):
-    # Rotate the center of the chunk to (180, 0) of the celestial sphere
-    center_car = radec_to_cartesian(chunk_ra, chunk_dec)
-    normal_car = np.cross(center_car, np.array([-1., 0., 0.]))
-    normal_car /= np.linalg.norm(normal_car)
-    normal_ra, normal_dec = cartesian_to_radec(normal_car)
-    angle = great_circle_distance(chunk_ra, chunk_dec, 180, 0)
-    rot_ra, rot_dec = rotate_radec_about_axis(object_coor[:,0], object_coor[:,1], normal_ra, normal_dec, angle)
-    return rot_ra, rot_dec
+    return _catalog1, _catalog2, cg1, cg2
+
+def index_chunk_args(catalog1: Catalog, index: CatalogIndex, tolerance) -> list[tuple]:
+    """Split the central objects of `catalog1` over the chunks of the index.
+
+    Only the chunks holding objects of `catalog1` are returned. By the ownership rule of xmatch_chunk(),
+    the boundary objects of `catalog1` are not needed.
+    """
+    index.check_tolerance(tolerance)
+    args = []
+    unit_vectors = catalog1.get_unit_vectors()
+    for start, coordinates in catalog1.iter_blocks():
+        central_ids = index.coor2id_central(coordinates[:, 0], coordinates[:, 1])
+        order = np.argsort(central_ids, kind='stable')
+        counts = np.bincount(central_ids, minlength=len(index.trees))
+        for chunk_id, rows in enumerate(np.split(order, np.cumsum(counts)[:-1])):
+            if len(rows) == 0:
+                continue
+            tree, index2 = index.get_chunk(chunk_id)
+            args.append((start + rows, unit_vectors[start + rows], tree, index2, tolerance))
+    return args
+
+def xmatch_index_chunk(args: tuple[NDArray, NDArray, KDTree, NDArray, float]):
+    index1, vec1, tree2, index2, tolerance = args
+    return chord_xmatching(index1, vec1, index2, tree2.data, tolerance, tree2=tree2)
+
+def nearest_index_chunk(args: tuple[NDArray, NDArray, KDTree, NDArray, float, int]):
+    index1, vec1, tree2, index2, tolerance, k = args
+    return chord_nearest(index1, vec1, index2, tree2, tolerance, k)
 
 def xmatch_chunk(args: tuple[Chunk, Chunk, float]):
     chunk1, chunk2, tolerance = args
-    objects1, objects2 = chunk1.get_data(), chunk2.get_data()
-    index1, index2 = chunk1.get_index(), chunk2.get_index()
+    # Only the central objects of the first catalog are matched, so that every pair is found in
+    # exactly one chunk. All their neighbours are within the margin of the second chunk.
+    index1, index2 = chunk1.central_index, chunk2.get_index()
     if chunk1.get_center() != chunk2.get_center():
         raise ValueError("The two chunks have different centers!")
-    ra, dec = chunk1.get_center()
-    rot_coor1 = np.array(rotate_to_center(objects1, ra, dec)).T
-    rot_coor2 = np.array(rotate_to_center(objects2, ra, dec)).T
+    # The two chunks have the same center, so the rotation cached on the first one is used for both.
+    rot_coor1 = chunk1.rotate_to_center(chunk1.central_vectors)
+    rot_coor2 = chunk1.rotate_to_center(chunk2.get_vectors())
     if chunk1.farest_distance() != chunk2.farest_distance():
         raise ValueError("The two chunks have different farest distances!")
     SAFTY_FACTOR = 1.01
     A2E_factor = (1 + compute_error(chunk1.farest_distance(), tolerance)) * SAFTY_FACTOR
-    idx1, idxes2 = spherical_xmatching(index1, rot_coor1, index2, rot_coor2, tolerance, A2E_factor)
-    dd = defaultdict(list)
-    for key, value in zip(idx1, idxes2):
-        dd[key] = value
-    return dd
+    return spherical_xmatching(index1, rot_coor1, index2, rot_coor2, tolerance, A2E_factor)
 
 def spherical_xmatching(idx1: np.array, coor1: np.array, idx2: np.array, coor2: np.array, tolerance, A2E_factor):
     qt1 = KDTree(coor1)
     qt2 = KDTree(coor2)
-    list_of_indexes = qt1.query_ball_tree(qt2, tolerance * A2E_factor) # list of elements in idx2
-    keys, vals = [], []
-    for i, indexes in enumerate(list_of_indexes):
-        distance = distances_to_target(coor1[i, :], coor2[indexes, :])
-        is_close = (distance < tolerance) | np.isclose(distance, tolerance, rtol=1e-8)
-        keys.append(idx1[i])
-        vals.append(idx2[indexes][is_close])
-    return keys, vals
+    candidates = qt1.sparse_distance_matrix(qt2, tolerance * A2E_factor, output_type='ndarray')
+    i, j = candidates['i'], candidates['j']
+    distance = angular_separation(coor1[i, 0], coor1[i, 1], coor2[j, 0], coor2[j, 1])
+    is_close = (distance < tolerance) | np.isclose(distance, tolerance, rtol=1e-8)
+    return idx1[i[is_close]].astype(np.int64), idx2[j[is_close]].astype(np.int64), distance[is_close], len(i)
+
+def xmatch_chunk_chord(args: tuple[Chunk, Chunk, float]):
+    chunk1, chunk2, tolerance = args
+    if chunk1.get_center() != chunk2.get_center():
+        raise ValueError("The two chunks have different centers!")
+    # Only the central objects of the first catalog are matched, as in xmatch_chunk().
+    return chord_xmatching(chunk1.central_index, chunk1.central_vectors, chunk2.get_index(), chunk2.get_vectors(),
+                           tolerance)
+
+def chord_xmatching(idx1: np.array, vec1: np.array, idx2: np.array, vec2: np.array, tolerance,
+                    tree2: Optional[KDTree] = None):
+    # The same relative tolerance as the np.isclose() check in spherical_xmatching()
+    radius = angle_to_chord(tolerance) * (1 + 1e-8)
+    tree2 = KDTree(vec2) if tree2 is None else tree2 # A prebuilt tree of vec2 can be reused
+    pairs = KDTree(vec1).sparse_distance_matrix(tree2, radius, output_type='ndarray')
+    separation = chord_to_angle(np.minimum(pairs['v'], 2))
+    return idx1[pairs['i']].astype(np.int64), idx2[pairs['j']].astype(np.int64), separation, len(pairs)
+
+
+def nearest_xmatch_chunk(args: tuple[Chunk, Chunk, float, int]):
+    chunk1, chunk2, tolerance, k = args
+    if chunk1.get_center() != chunk2.get_center():
+        raise ValueError("The two chunks have different centers!")
+    # Only the central objects of the first catalog are matched, as in xmatch_chunk().
+    return chord_nearest(chunk1.central_index, chunk1.central_vectors, chunk2.get_index(),
+                         KDTree(chunk2.get_vectors()), tolerance, k)
+
+def chord_nearest(idx1: np.array, vec1: np.array, idx2: np.array, tree2: KDTree, tolerance, k):
+    if len(vec1) == 0 or tree2.n == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), 0
+    # The same relative tolerance as the np.isclose() check in spherical_xmatching()
+    radius = angle_to_chord(tolerance) * (1 + 1e-8)
+    distance, j = tree2.query(vec1, k=k, distance_upper_bound=radius)
+    distance, j = distance.reshape(len(vec1), -1), j.reshape(len(vec1), -1)
+    found = np.isfinite(distance) # Missing neighbours have an infinite distance
+    rows = np.nonzero(found)[0]
+    separation = chord_to_angle(np.minimum(distance[found], 2))
+    return idx1[rows].astype(np.int64), idx2[j[found]].astype(np.int64), separation, len(rows)
+
+
+def self_xmatch_chunk(args: tuple[Chunk, float]):
+    chunk, tolerance = args
+    rot_coor = chunk.rotate_to_center(chunk.get_vectors())
+    SAFTY_FACTOR = 1.01
+    A2E_factor = (1 + compute_error(chunk.farest_distance(), tolerance)) * SAFTY_FACTOR
+    pairs = KDTree(rot_coor).query_pairs(tolerance * A2E_factor, output_type='ndarray')
+    # Only the pairs owned by the chunk are refined, so that every pair is computed exactly once.
+    pairs = pairs[chunk.owns_pairs(pairs[:, 0], pairs[:, 1])]
+    i, j = pairs[:, 0], pairs[:, 1]
+    distance = angular_separation(rot_coor[i, 0], rot_coor[i, 1], rot_coor[j, 0], rot_coor[j, 1])
+    is_close = (distance < tolerance) | np.isclose(distance, tolerance, rtol=1e-8)
+    return ordered_pairs(chunk, i[is_close], j[is_close]) + (distance[is_close], len(pairs))
+
+def self_xmatch_chunk_chord(args: tuple[Chunk, float]):
+    chunk, tolerance = args
+    vectors = chunk.get_vectors()
+    # The same relative tolerance as chord_xmatching()
+    radius = angle_to_chord(tolerance) * (1 + 1e-8)
+    pairs = KDTree(vectors).query_pairs(radius, output_type='ndarray')
+    pairs = pairs[chunk.owns_pairs(pairs[:, 0], pairs[:, 1])]
+    i, j = pairs[:, 0], pairs[:, 1]
+    separation = chord_to_angle(np.linalg.norm(vectors[i] - vectors[j], axis=1))
+    return ordered_pairs(chunk, i, j) + (separation, len(pairs))
+
+def ordered_pairs(chunk: Chunk, i: NDArray, j: NDArray) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """Convert the pairs of positions (i, j) in the chunk to the catalog indexes (idx1, idx2) with idx1 < idx2."""
+    idx_i, idx_j = chunk.get_index()[i], chunk.get_index()[j]
+    return np.minimum(idx_i, idx_j).astype(np.int64), np.maximum(idx_i, idx_j).astype(np.int64)
+
+XMATCH_MODES = ('all', 'nearest')
+
+XMATCH_ENGINES = {
+    'rotate': xmatch_chunk,
+    'chord': xmatch_chunk_chord,
+}
+
+SELF_XMATCH_ENGINES = {
+    'rotate': self_xmatch_chunk,
+    'chord': self_xmatch_chunk_chord,
+}